@@ -35,6 +35,7 @@ class DailyMarketAnalyzer:
         # 檔案路徑
         self.global_indices_file = self.daily_dir / f"global-indices-{self.today}.md"
         self.prices_file = self.daily_dir / f"holdings-prices-{self.today}.md"
+        self.news_digest_file = self.daily_dir / f"news-digest-{self.today}.md"
         self.analysis_output = self.analysis_dir / f"market-analysis-{self.today}.md"
 
         # 初始化分析器
@@ -92,6 +93,21 @@ class DailyMarketAnalyzer:
 
         return True
 
+    def build_news_digest(self) -> str:
+        """由當天的新聞檔產生新聞彙整（合併相似報導），無法產生時返回空字串"""
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scrapers"))
+        try:
+            from fetch_market_news import format_news_digest
+            from news_dedup import articles_from_news_files
+        except ImportError as e:
+            print(f"⚠️  無法合併相似新聞: {e}")
+            return ""
+
+        articles = articles_from_news_files(self.today, self.output_dir.parent)
+        if not articles:
+            return ""
+        return format_news_digest(articles, self.today)
+
     def generate_market_analysis_prompt(self, news_files: List[Path]) -> str:
         """生成市場分析 Prompt"""
         print("📝 生成分析 Prompt...")
@@ -104,13 +120,18 @@ class DailyMarketAnalyzer:
         with open(self.prices_file, 'r', encoding='utf-8') as f:
             prices_data = f.read()
 
-        # 讀取新聞數據
+        # 讀取新聞數據（優先使用新聞彙整：同一篇文章只列一次、相似報導合併，並標示相關代碼）
         news_data = ""
-        for news_file in news_files:
-            symbol = news_file.stem.replace(f"-{self.today}", "")
-            with open(news_file, 'r', encoding='utf-8') as f:
-                news_content = f.read()
-            news_data += f"\n\n### {symbol} 新聞\n{news_content}"
+        if self.news_digest_file.exists():
+            news_data = self.news_digest_file.read_text(encoding='utf-8')
+        else:
+            news_data = self.build_news_digest()
+        if not news_data:
+            for news_file in news_files:
+                symbol = news_file.stem.replace(f"-{self.today}", "")
+                with open(news_file, 'r', encoding='utf-8') as f:
+                    news_content = f.read()
+                news_data += f"\n\n### {symbol} 新聞\n{news_content}"
 
         # 生成 Prompt
         prompt = f"""你是一位專業的市場情報分析師,擅長解讀全球市場數據和新聞,提供深度市場洞察。
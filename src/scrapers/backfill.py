@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+可續跑的歷史資料回補工具
+
+將 holdings.yaml 與 indices.yaml 中所有代碼的長期歷史日K線分段下載，
+多個代碼並行處理，寫入價格資料庫（market-data/{YEAR}/Prices/）。
+每完成一段就記錄到 checkpoint 檔，中斷後重新執行會從中斷處繼續，
+已完成的區段不會重新下載。
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_market_data_root,
+    get_rate_limiter,
+    get_shared_session,
+    print_error,
+    print_status,
+    print_success,
+    print_warning,
+    rate_limited_call,
+    run_bounded,
+    safe_exit,
+    validate_positive_int,
+    write_run_metrics,
+)
+from price_store import (
+    load_sync_state,
+    normalize_prices,
+    save_prices,
+    save_sync_state,
+)
+from symbol_universe import SYMBOL_TYPES, load_universe, query_symbols
+
+
+# checkpoint 格式版本，格式變更時遞增以捨棄舊進度
+CHECKPOINT_VERSION = 1
+
+_progress_lock = threading.Lock()
+
+
+def get_default_checkpoint_path() -> Path:
+    """取得預設的 checkpoint 檔路徑（與增量同步狀態放在一起）"""
+    return get_market_data_root() / "Prices" / "backfill-checkpoint.json"
+
+
+def split_date_range(start: datetime, end: datetime, months: int = 12) -> List[Tuple[datetime, datetime]]:
+    """
+    將日期區間切成數段
+
+    分段邊界對齊每 months 個月的月初（months=12 時對齊年初，與價格資料庫的
+    年份分區一致），第一段與最後一段可能較短。
+
+    Args:
+        start: 起始日期（含）
+        end: 結束日期（不含）
+        months: 每段的月數
+
+    Returns:
+        List[Tuple[datetime, datetime]]: [(段起始, 段結束)]，結束日期不含
+    """
+    chunks = []
+    current = start
+    while current < end:
+        # 下一個對齊的邊界：從 1 月起每 months 個月
+        month_index = (current.year * 12 + current.month - 1) // months * months + months
+        boundary = datetime(month_index // 12, month_index % 12 + 1, 1)
+        chunk_end = min(boundary, end)
+        chunks.append((current, chunk_end))
+        current = chunk_end
+    return chunks
+
+
+def chunk_key(chunk: Tuple[datetime, datetime]) -> str:
+    """區段在 checkpoint 中的鍵，例如 "2020-01-01/2021-01-01" """
+    return f"{chunk[0].strftime('%Y-%m-%d')}/{chunk[1].strftime('%Y-%m-%d')}"
+
+
+class BackfillCheckpoint:
+    """
+    回補進度紀錄
+
+    記錄每個代碼已完成的區段；每完成一段就以暫存檔改名的方式寫回，
+    程式中斷時最多只損失正在下載的區段。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_default_checkpoint_path()
+        self.done: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                if data.get('version') == CHECKPOINT_VERSION:
+                    self.done = data.get('done', {})
+            except (OSError, ValueError) as e:
+                print_warning(f"無法讀取回補進度，從頭開始: {e}")
+
+    def reset(self) -> None:
+        """清除所有進度（不立即寫回）"""
+        with self._lock:
+            self.done = {}
+
+    def is_done(self, symbol: str, key: str) -> bool:
+        """區段是否已完成"""
+        with self._lock:
+            return key in self.done.get(symbol, {})
+
+    def mark_done(self, symbol: str, key: str, rows: int) -> None:
+        """記錄區段完成（含筆數）並寫回檔案"""
+        with self._lock:
+            self.done.setdefault(symbol, {})[key] = rows
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(
+            json.dumps({'version': CHECKPOINT_VERSION, 'done': self.done}, ensure_ascii=False, indent=2),
+            encoding='utf-8',
+        )
+        tmp_path.replace(self.path)
+
+
+def download_chunk(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    下載單一區段的歷史資料（經過速率限制器，不寫入回應快取）
+
+    Args:
+        symbol: 代碼
+        start: 起始日期（含）
+        end: 結束日期（不含）
+
+    Returns:
+        pd.DataFrame: normalize_prices 後的資料
+    """
+    df = rate_limited_call(
+        'history',
+        lambda: yf.Ticker(symbol, session=get_shared_session()).history(start=start, end=end),
+        symbol=symbol,
+    )
+    return normalize_prices(df)
+
+
+def get_first_trade_date(symbol: str) -> Optional[datetime]:
+    """
+    取得代碼的第一個交易日（Yahoo Finance 的 history metadata）
+
+    Args:
+        symbol: 代碼
+
+    Returns:
+        Optional[datetime]: 第一個交易日，無法取得時為 None
+    """
+    try:
+        metadata = rate_limited_call(
+            'metadata',
+            lambda: yf.Ticker(symbol, session=get_shared_session()).get_history_metadata(),
+            symbol=symbol,
+        )
+    except Exception as e:
+        print_warning(f"{symbol} 無法取得第一個交易日: {e}")
+        return None
+
+    first_trade_date = (metadata or {}).get('firstTradeDate')
+    if first_trade_date is None:
+        return None
+    if isinstance(first_trade_date, (int, float)):
+        return datetime.fromtimestamp(first_trade_date)
+    timestamp = pd.Timestamp(first_trade_date)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp.to_pydatetime()
+
+
+def update_sync_state(symbol: str, start: datetime, end: datetime) -> None:
+    """
+    回補完整區間後更新增量同步狀態，讓 fetch_market_data -i 不再補抓同一段
+
+    Args:
+        symbol: 代碼
+        start: 回補起始日期
+        end: 回補結束日期（不含）
+    """
+    state = load_sync_state(symbol)
+    covered_from = state.get('covered_from')
+    if covered_from is None:
+        save_sync_state(symbol, {
+            'covered_from': start.strftime('%Y-%m-%d'),
+            'synced_at': min(end, datetime.now()).isoformat(timespec='seconds'),
+        })
+    elif start < datetime.fromisoformat(covered_from) <= end:
+        # 回補區間與既有資料相接，才能往前延伸 covered_from
+        save_sync_state(symbol, dict(state, covered_from=start.strftime('%Y-%m-%d')))
+
+
+def backfill_symbol(
+    symbol: str,
+    chunks: List[Tuple[datetime, datetime]],
+    checkpoint: BackfillCheckpoint,
+    progress: Dict[str, int],
+) -> bool:
+    """
+    依序回補單一代碼的所有區段
+
+    同一代碼的區段依序處理，避免同時改寫同一個年份分區。
+
+    Args:
+        symbol: 代碼
+        chunks: split_date_range 的結果
+        checkpoint: 回補進度
+        progress: 共用的進度計數（'done'、'total'）
+
+    Returns:
+        bool: 所有區段是否都已完成
+    """
+    complete = True
+    first_trade_date: Optional[datetime] = None
+    looked_up = False
+    for chunk in chunks:
+        key = chunk_key(chunk)
+        if checkpoint.is_done(symbol, key):
+            continue
+
+        try:
+            df = download_chunk(symbol, *chunk)
+            save_prices(symbol, df)
+        except Exception as e:
+            print_error(f"{symbol} {key}: {e}")
+            complete = False
+            continue
+
+        # yfinance 請求失敗（例如被限流）時也回傳空資料，只有整段在上市之前
+        # 才確定沒有資料；其他空區段不記錄為完成，下次執行重新下載
+        if df.empty:
+            if not looked_up:
+                first_trade_date = get_first_trade_date(symbol)
+                looked_up = True
+            if first_trade_date is None or chunk[1] > first_trade_date:
+                print_warning(f"{symbol} {key}: 沒有取得資料，下次重新下載")
+                complete = False
+                continue
+
+        checkpoint.mark_done(symbol, key, len(df))
+        with _progress_lock:
+            progress['done'] += 1
+            done, total = progress['done'], progress['total']
+        print_status(f"[{done}/{total}] {symbol} {key}: {len(df)} 筆")
+
+    if complete:
+        update_sync_state(symbol, chunks[0][0], chunks[-1][1])
+    return complete
+
+
+def backfill(
+    symbols: List[str],
+    start: datetime,
+    end: datetime,
+    chunk_months: int = 12,
+    workers: int = 4,
+    checkpoint_path: Optional[Path] = None,
+    restart: bool = False,
+) -> bool:
+    """
+    回補多個代碼的歷史資料
+
+    Args:
+        symbols: 代碼列表
+        start: 起始日期（含）
+        end: 結束日期（不含）
+        chunk_months: 每段的月數
+        workers: 同時處理的代碼數
+        checkpoint_path: checkpoint 檔路徑，None 表示使用預設路徑
+        restart: 是否忽略既有進度從頭開始
+
+    Returns:
+        bool: 所有代碼的所有區段是否都已完成
+    """
+    chunks = split_date_range(start, end, chunk_months)
+    if not chunks:
+        print_error("起始日期必須早於結束日期")
+        return False
+
+    checkpoint = BackfillCheckpoint(checkpoint_path)
+    if restart:
+        checkpoint.reset()
+
+    pending = sum(
+        1 for symbol in symbols for chunk in chunks
+        if not checkpoint.is_done(symbol, chunk_key(chunk))
+    )
+    total = len(symbols) * len(chunks)
+    print_status(
+        f"回補 {len(symbols)} 個代碼 {chunk_key((start, end))}，共 {total} 段，"
+        f"已完成 {total - pending} 段，待下載 {pending} 段"
+    )
+    print_status(f"進度檔: {checkpoint.path}")
+
+    progress = {'done': total - pending, 'total': total}
+    results = run_bounded(
+        lambda symbol: backfill_symbol(symbol, chunks, checkpoint, progress),
+        symbols,
+        workers=workers,
+    )
+
+    failed = [symbol for symbol, ok in zip(symbols, results) if not ok]
+    if failed:
+        print_warning(f"{len(failed)} 個代碼有未完成的區段，重新執行即可續跑: {', '.join(failed)}")
+        return False
+
+    print_success(f"回補完成：{len(symbols)} 個代碼，{total} 段")
+    return True
+
+
+def main():
+    parser = create_argument_parser(
+        description='回補 holdings.yaml 與 indices.yaml 中所有代碼的長期歷史日K線（可中斷續跑）',
+        epilog="""
+使用範例:
+  # 回補所有代碼最近 5 年的資料
+  python backfill.py --years 5
+
+  # 從 2015 年開始回補指數，每段 6 個月，8 個代碼並行
+  python backfill.py -t index --start 2015-01-01 --chunk-months 6 --workers 8
+
+  # 只回補指定代碼
+  python backfill.py -s AAPL TSLA --start 2018-01-01
+
+說明:
+  進度記錄於 market-data/Prices/backfill-checkpoint.json，中斷後以相同參數
+  重新執行即可從中斷處繼續；已完成的區段不會重新下載。
+        """
+    )
+
+    parser.add_argument(
+        '-s', '--symbols',
+        nargs='+',
+        help='要回補的代碼（不指定則使用代碼總表）'
+    )
+
+    parser.add_argument(
+        '-t', '--types',
+        nargs='+',
+        choices=SYMBOL_TYPES,
+        help='只回補這些類型的代碼（可多選），不指定則全部'
+    )
+
+    parser.add_argument(
+        '--start',
+        type=str,
+        help='起始日期 YYYY-MM-DD（預設依 --years 計算）'
+    )
+
+    parser.add_argument(
+        '--end',
+        type=str,
+        help='結束日期 YYYY-MM-DD（不含，預設為明天，即包含今天）'
+    )
+
+    parser.add_argument(
+        '--years',
+        type=int,
+        default=5,
+        help='未指定 --start 時回補的年數 (預設: 5)'
+    )
+
+    parser.add_argument(
+        '--chunk-months',
+        type=int,
+        default=12,
+        help='每段的月數 (預設: 12，對齊年份分區)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='同時處理的代碼數 (預設: 4)'
+    )
+
+    parser.add_argument(
+        '--checkpoint',
+        type=str,
+        help='進度檔路徑 (預設: market-data/Prices/backfill-checkpoint.json)'
+    )
+
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='忽略既有進度，重新下載所有區段'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        validate_positive_int(args.years, "年數")
+        validate_positive_int(args.chunk_months, "每段月數")
+        validate_positive_int(args.workers, "並行數")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else today + timedelta(days=1)
+        if args.start:
+            start = datetime.strptime(args.start, '%Y-%m-%d')
+        else:
+            start = datetime(today.year - args.years, 1, 1)
+
+        if args.symbols:
+            symbols = list(dict.fromkeys(args.symbols))
+        else:
+            symbols = [entry['symbol'] for entry in query_symbols(load_universe(), types=args.types)]
+    except ValueError as e:
+        print_error(f"日期格式錯誤（應為 YYYY-MM-DD）: {e}")
+        safe_exit(False)
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    if not symbols:
+        print_error("沒有需要回補的代碼")
+        safe_exit(False)
+
+    success = backfill(
+        symbols,
+        start,
+        end,
+        chunk_months=args.chunk_months,
+        workers=args.workers,
+        checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+        restart=args.restart,
+    )
+
+    print_status(get_rate_limiter().summary())
+    paths = write_run_metrics()
+    if paths is not None:
+        print_status(f"請求指標: {paths[0]}")
+    safe_exit(success)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,14 +6,36 @@
 - 輸出處理（檔案/stdout）
 - 錯誤處理
 - 路徑管理
+- 有限並行執行
+- 共用 HTTP session
+- Yahoo Finance 回應快取
+- 請求速率限制與重試
+- 失效代碼的負向快取與斷路器
+- 請求延遲與結果指標（JSON / Prometheus textfile）
+- 效能分析（--profile）
+- 結構化（JSON/NDJSON）輸出
 """
 
 import argparse
+import atexit
+import hashlib
+import json
+import math
+import pickle
+import queue
+import random
+import re
+import sqlite3
 import sys
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from profiling import add_profile_argument, profile_iter, profile_phase, profile_thread
 
 
 class ScraperError(Exception):
@@ -21,6 +43,74 @@ class ScraperError(Exception):
     pass
 
 
+# 各端點的快取有效秒數
+CACHE_TTL = {
+    'info': 12 * 60 * 60,     # 名稱、市值、本益比等變動緩慢
+    'history': 15 * 60,       # 盤中價格
+    'news': 30 * 60,
+}
+
+# 未列在 CACHE_TTL 的端點使用此有效秒數
+DEFAULT_CACHE_TTL = 15 * 60
+
+# 快取最多保留的筆數，超過時淘汰最久未使用的項目
+DEFAULT_CACHE_MAX_ENTRIES = 5000
+
+# 各端點的速率上限：(每秒請求數, 突發容量)
+# 可用環境變數 YF_RATE_LIMITS 覆寫，例如 "history=8,info=1.5"
+RATE_LIMITS = {
+    'info': (2.0, 4),
+    'history': (5.0, 10),
+    'news': (3.0, 6),
+    'download': (1.0, 2),
+}
+
+# 未列在 RATE_LIMITS 的端點使用此速率
+DEFAULT_RATE_LIMIT = (4.0, 8)
+
+# 可重試錯誤的最大重試次數與退避秒數（指數成長，加上隨機抖動）
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# 結構化輸出的格式版本，欄位變更時遞增
+SIDECAR_SCHEMA_VERSION = 1
+
+# 結構化輸出格式 → 副檔名
+SIDECAR_FORMATS = {'json': '.json', 'ndjson': '.ndjson'}
+
+# 判斷內容是否變動時忽略的部分：報告的更新時間與結構化輸出的產生時間
+VOLATILE_CONTENT = re.compile(r'更新時間\**: [^\n]*|"generated_at": ?"[^"]*"')
+
+# 代碼取得資料失敗後，在此秒數內不再重試（負向快取）
+NEGATIVE_CACHE_TTL = 15 * 60
+
+# 連續失敗達此次數時斷路，之後的冷卻時間從 BREAKER_BASE_COOLDOWN 開始倍增
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_COOLDOWN = 60 * 60
+BREAKER_MAX_COOLDOWN = 7 * 24 * 60 * 60
+
+# 請求指標的格式名稱與版本，欄位變更時遞增
+METRICS_SCHEMA = 'scraper-metrics'
+METRICS_SCHEMA_VERSION = 1
+
+# 每次執行的請求指標 JSON 檔保留天數，超過的在下次輸出時刪除
+METRICS_RETENTION_DAYS = 30
+METRICS_FILE_STAMP = re.compile(r'-(\d{8}-\d{6})\.json$')
+
+# 請求結果：成功、失敗、快取命中、斷路器略過
+METRIC_OUTCOMES = ('ok', 'error', 'cache_hit', 'skipped')
+
+# 不屬於單一代碼的批次請求（例如 yf.download）在指標中的代碼名稱
+BATCH_SYMBOL = '*'
+
+# 延遲直方圖的桶上限（秒），對應 Prometheus histogram 的 le 標籤
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 輸出的延遲百分位數：(欄位名稱, Prometheus quantile 標籤)
+METRIC_QUANTILES = (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99'))
+
+
 def get_project_root() -> Path:
     """
     取得專案根目錄路徑
@@ -32,6 +122,20 @@ def get_project_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
+def get_market_data_root() -> Path:
+    """
+    取得市場資料根目錄路徑（不含年份）
+
+    Returns:
+        Path: market-data 目錄的路徑
+    """
+    # 支援從環境變數讀取輸出目錄,預設為 /app/output (Docker 環境) 或專案根目錄的 output
+    output_base = os.environ.get('OUTPUT_DIR')
+    if output_base:
+        return Path(output_base) / "market-data"
+    return get_project_root() / "output" / "market-data"
+
+
 def get_data_directory(year: Optional[int] = None, subdir: str = "") -> Path:
     """
     取得資料目錄路徑
@@ -46,12 +150,7 @@ def get_data_directory(year: Optional[int] = None, subdir: str = "") -> Path:
     if year is None:
         year = datetime.now().year
 
-    # 支援從環境變數讀取輸出目錄,預設為 /app/output (Docker 環境) 或專案根目錄的 output
-    output_base = os.environ.get('OUTPUT_DIR')
-    if output_base:
-        data_dir = Path(output_base) / "market-data" / str(year)
-    else:
-        data_dir = get_project_root() / "output" / "market-data" / str(year)
+    data_dir = get_market_data_root() / str(year)
 
     if subdir:
         data_dir = data_dir / subdir
@@ -59,12 +158,1194 @@ def get_data_directory(year: Optional[int] = None, subdir: str = "") -> Path:
     return data_dir
 
 
+def create_shared_session():
+    """
+    建立可供多個 yfinance Ticker 共用的 HTTP session
+
+    共用 session 可重複使用連線與 Yahoo cookie/crumb，避免每個代碼
+    各自握手。新版 yfinance 需要 curl_cffi session；若未安裝則返回
+    None，交由 yfinance 自行管理。
+
+    Returns:
+        Optional[Session]: 共用 session 或 None
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:
+        return None
+
+    return curl_requests.Session(impersonate="chrome")
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """
+    取得同一個行程內所有爬蟲共用的 HTTP session（第一次呼叫時建立）
+
+    Returns:
+        Optional[Session]: 共用 session 或 None（交由 yfinance 管理）
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_shared_session()
+        return _shared_session
+
+
+def get_cache_directory() -> Path:
+    """
+    取得快取目錄路徑
+
+    支援從環境變數 CACHE_DIR 指定，預設為專案根目錄的 .cache
+
+    Returns:
+        Path: 快取目錄的路徑
+    """
+    cache_base = os.environ.get('CACHE_DIR')
+    if cache_base:
+        return Path(cache_base)
+    return get_project_root() / ".cache"
+
+
+class ResponseCache:
+    """
+    持久化的 Yahoo Finance 回應快取
+
+    以 (symbol, endpoint, params) 為鍵，各端點有獨立的有效期限，
+    超過筆數上限時淘汰最久未使用的項目。資料存於 SQLite，
+    可在多個爬蟲與多次執行之間共用，並可跨執行緒使用。
+
+    mode:
+        'normal'  - 讀取並寫入快取
+        'refresh' - 不讀取快取，但以新結果更新快取
+        'off'     - 完全不使用快取
+    """
+
+    MODES = ('normal', 'refresh', 'off')
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: Optional[Dict[str, float]] = None,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        mode: str = 'normal',
+    ):
+        if mode not in self.MODES:
+            raise ScraperError(f"未知的快取模式: {mode}")
+
+        self.path = path or get_cache_directory() / "yfinance-cache.sqlite"
+        self.ttl = dict(CACHE_TTL, **(ttl or {}))
+        self.max_entries = max_entries
+        self.mode = mode
+        self.stats: Dict[str, List[int]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(symbol: str, endpoint: str, params: Dict[str, Any]) -> str:
+        """產生快取鍵"""
+        return json.dumps([symbol, endpoint, params], sort_keys=True, default=str, ensure_ascii=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " endpoint TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " value BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def _count(self, endpoint: str, hit: bool) -> None:
+        counts = self.stats.setdefault(endpoint, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def get(self, symbol: str, endpoint: str, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        讀取快取，並記錄命中/未命中次數
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 快取的值)
+        """
+        if self.mode != 'normal':
+            self._count(endpoint, False)
+            return False, None
+
+        key = self.make_key(symbol, endpoint, params)
+        ttl = self.ttl.get(endpoint, DEFAULT_CACHE_TTL)
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT created, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[0] > ttl:
+                    self._count(endpoint, False)
+                    return False, None
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+                value = pickle.loads(row[1])
+            except (sqlite3.Error, pickle.PickleError, EOFError) as e:
+                print_warning(f"讀取快取失敗: {e}")
+                self._count(endpoint, False)
+                return False, None
+
+            self._count(endpoint, True)
+            return True, value
+
+    def set(self, symbol: str, endpoint: str, params: Dict[str, Any], value: Any) -> None:
+        """寫入快取，並在超過筆數上限時淘汰最久未使用的項目"""
+        if self.mode == 'off':
+            return
+
+        key = self.make_key(symbol, endpoint, params)
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, created, accessed, value)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, endpoint, now, now, pickle.dumps(value)),
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.commit()
+            except (sqlite3.Error, pickle.PickleError) as e:
+                print_warning(f"寫入快取失敗: {e}")
+
+    def fetch(
+        self,
+        symbol: str,
+        endpoint: str,
+        fetch_func: Callable[[], Any],
+        refresh: bool = False,
+        **params: Any,
+    ) -> Any:
+        """
+        先查快取，未命中時呼叫 fetch_func 並將非空結果寫入快取
+
+        Args:
+            symbol: 代碼
+            endpoint: 端點名稱 (例如: "info", "history", "news")
+            fetch_func: 實際發出請求的函數
+            refresh: 是否略過快取直接請求（仍以新結果更新快取）
+            **params: 請求參數，會納入快取鍵
+
+        Returns:
+            Any: 快取或新取得的結果
+        """
+        if not refresh:
+            hit, value = self.get(symbol, endpoint, params)
+            if hit:
+                return value
+
+        value = fetch_func()
+        if not is_empty_response(value):
+            self.set(symbol, endpoint, params, value)
+        return value
+
+    def summary(self) -> str:
+        """產生命中/未命中統計文字"""
+        hits = sum(counts[0] for counts in self.stats.values())
+        misses = sum(counts[1] for counts in self.stats.values())
+        detail = ', '.join(
+            f"{endpoint} {counts[0]}/{counts[0] + counts[1]}"
+            for endpoint, counts in sorted(self.stats.items())
+        )
+        text = f"快取統計: 命中 {hits}，未命中 {misses}"
+        if self.mode != 'normal':
+            text += f"（模式: {self.mode}）"
+        if detail:
+            text += f" [{detail}]"
+        return text
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def is_empty_response(value: Any) -> bool:
+    """判斷回應是否為空（空回應不寫入快取）"""
+    if value is None:
+        return True
+    empty = getattr(value, 'empty', None)
+    if isinstance(empty, bool):
+        return empty
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    取得所有爬蟲共用的回應快取（第一次呼叫時建立）
+
+    Returns:
+        ResponseCache: 共用快取實例
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+class RunMetrics:
+    """
+    單次執行的請求指標
+
+    依代碼與端點記錄每個請求的延遲、重試次數與結果（成功、失敗、快取命中、
+    斷路器略過）。延遲包含速率限制的等待與重試退避，反映請求實際花費的時間。
+    執行結束時由 write_run_metrics 輸出 JSON 與 Prometheus textfile。
+    """
+
+    def __init__(self, job: Optional[str] = None):
+        self.job = job or Path(sys.argv[0]).stem.lstrip('-') or 'python'
+        self.started_at = time.time()
+        self.samples: List[Tuple[str, str, str, float, int]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        symbol: Optional[str],
+        endpoint: str,
+        outcome: str,
+        seconds: float = 0.0,
+        retries: int = 0,
+    ) -> None:
+        """
+        記錄一次請求
+
+        Args:
+            symbol: 代碼，None 表示不屬於單一代碼的批次請求
+            endpoint: 端點名稱
+            outcome: METRIC_OUTCOMES 其中之一
+            seconds: 延遲秒數
+            retries: 重試次數
+        """
+        with self._lock:
+            self.samples.append((symbol or BATCH_SYMBOL, endpoint, outcome, seconds, retries))
+
+    @staticmethod
+    def _aggregate(samples: List[Tuple[str, str, str, float, int]]) -> Dict[str, Any]:
+        """彙整一組請求的結果次數、重試與延遲分佈（只計實際發出的請求）"""
+        outcomes = dict.fromkeys(METRIC_OUTCOMES, 0)
+        latencies = []
+        retries = 0
+        for _, _, outcome, seconds, count in samples:
+            outcomes[outcome] += 1
+            retries += count
+            if outcome in ('ok', 'error'):
+                latencies.append(seconds)
+
+        result: Dict[str, Any] = {'calls': len(samples), **outcomes, 'retries': retries, 'latency': None}
+        if latencies:
+            latencies.sort()
+            result['latency'] = {
+                'count': len(latencies),
+                'sum': round(sum(latencies), 6),
+                'max': round(latencies[-1], 6),
+                'p50': round(percentile(latencies, 50), 6),
+                'p95': round(percentile(latencies, 95), 6),
+                'p99': round(percentile(latencies, 99), 6),
+                'buckets': {str(le): sum(1 for v in latencies if v <= le) for le in LATENCY_BUCKETS},
+            }
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        產生目前的指標彙總
+
+        Returns:
+            Dict[str, Any]: 含整體、各端點與各代碼（再依端點細分）的彙總
+        """
+        with self._lock:
+            samples = list(self.samples)
+
+        by_endpoint: Dict[str, list] = {}
+        by_symbol: Dict[str, Dict[str, list]] = {}
+        for sample in samples:
+            by_endpoint.setdefault(sample[1], []).append(sample)
+            by_symbol.setdefault(sample[0], {}).setdefault(sample[1], []).append(sample)
+
+        finished_at = time.time()
+        return {
+            'schema': METRICS_SCHEMA,
+            'schema_version': METRICS_SCHEMA_VERSION,
+            'job': self.job,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'finished_at': datetime.fromtimestamp(finished_at).isoformat(timespec='seconds'),
+            'duration': round(finished_at - self.started_at, 3),
+            'total': self._aggregate(samples),
+            'endpoints': {
+                endpoint: self._aggregate(group) for endpoint, group in sorted(by_endpoint.items())
+            },
+            'symbols': {
+                symbol: {endpoint: self._aggregate(group) for endpoint, group in sorted(endpoints.items())}
+                for symbol, endpoints in sorted(by_symbol.items())
+            },
+        }
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """
+    以最近排名法計算百分位數
+
+    Args:
+        sorted_values: 已排序、非空的數值
+        pct: 百分位 (0-100)
+
+    Returns:
+        float: 百分位數
+    """
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _prometheus_labels(**labels: Any) -> str:
+    """產生 Prometheus 標籤字串，跳脫反斜線、引號與換行"""
+    parts = []
+    for key, value in labels.items():
+        text = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{text}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def format_prometheus_metrics(snapshot: Dict[str, Any]) -> str:
+    """
+    將 RunMetrics.snapshot() 轉為 Prometheus textfile 格式
+
+    各端點輸出延遲直方圖與 p50/p95/p99；各代碼輸出結果次數、重試次數與
+    延遲百分位數。程式名稱放在 scraper 標籤，不與 Prometheus 抓取時
+    附加的 job 標籤衝突。
+
+    Args:
+        snapshot: RunMetrics.snapshot() 的結果
+
+    Returns:
+        str: 可供 node_exporter textfile collector 讀取的文字
+    """
+    scraper = snapshot['job']
+    lines = [
+        '# HELP scraper_request_duration_seconds Yahoo Finance request latency including rate limit waits and retries.',
+        '# TYPE scraper_request_duration_seconds histogram',
+    ]
+    for endpoint, stats in snapshot['endpoints'].items():
+        latency = stats['latency']
+        if latency is None:
+            continue
+        for le, count in latency['buckets'].items():
+            lines.append(
+                f"scraper_request_duration_seconds_bucket{_prometheus_labels(scraper=scraper, endpoint=endpoint, le=le)} {count}"
+            )
+        lines.append(
+            f"scraper_request_duration_seconds_bucket"
+            f"{_prometheus_labels(scraper=scraper, endpoint=endpoint, le='+Inf')} {latency['count']}"
+        )
+        lines.append(f"scraper_request_duration_seconds_sum{_prometheus_labels(scraper=scraper, endpoint=endpoint)} {latency['sum']}")
+        lines.append(f"scraper_request_duration_seconds_count{_prometheus_labels(scraper=scraper, endpoint=endpoint)} {latency['count']}")
+
+    lines += [
+        '# HELP scraper_request_duration_quantile_seconds Request latency percentiles per endpoint.',
+        '# TYPE scraper_request_duration_quantile_seconds gauge',
+    ]
+    for endpoint, stats in snapshot['endpoints'].items():
+        if stats['latency'] is None:
+            continue
+        for name, quantile in METRIC_QUANTILES:
+            lines.append(
+                f"scraper_request_duration_quantile_seconds"
+                f"{_prometheus_labels(scraper=scraper, endpoint=endpoint, quantile=quantile)} {stats['latency'][name]}"
+            )
+
+    lines += [
+        '# HELP scraper_symbol_requests_total Requests per symbol, endpoint and outcome.',
+        '# TYPE scraper_symbol_requests_total counter',
+    ]
+    for symbol, endpoints in snapshot['symbols'].items():
+        for endpoint, stats in endpoints.items():
+            for outcome in METRIC_OUTCOMES:
+                if stats[outcome]:
+                    labels = _prometheus_labels(scraper=scraper, symbol=symbol, endpoint=endpoint, outcome=outcome)
+                    lines.append(f"scraper_symbol_requests_total{labels} {stats[outcome]}")
+
+    lines += [
+        '# HELP scraper_symbol_retries_total Retries per symbol and endpoint.',
+        '# TYPE scraper_symbol_retries_total counter',
+    ]
+    for symbol, endpoints in snapshot['symbols'].items():
+        for endpoint, stats in endpoints.items():
+            if stats['retries']:
+                labels = _prometheus_labels(scraper=scraper, symbol=symbol, endpoint=endpoint)
+                lines.append(f"scraper_symbol_retries_total{labels} {stats['retries']}")
+
+    lines += [
+        '# HELP scraper_symbol_request_duration_quantile_seconds Request latency percentiles per symbol and endpoint.',
+        '# TYPE scraper_symbol_request_duration_quantile_seconds gauge',
+    ]
+    for symbol, endpoints in snapshot['symbols'].items():
+        for endpoint, stats in endpoints.items():
+            if stats['latency'] is None:
+                continue
+            for name, quantile in METRIC_QUANTILES:
+                labels = _prometheus_labels(scraper=scraper, symbol=symbol, endpoint=endpoint, quantile=quantile)
+                lines.append(f"scraper_symbol_request_duration_quantile_seconds{labels} {stats['latency'][name]}")
+
+    lines += [
+        '# HELP scraper_run_duration_seconds Wall time of the last run.',
+        '# TYPE scraper_run_duration_seconds gauge',
+        f"scraper_run_duration_seconds{_prometheus_labels(scraper=scraper)} {snapshot['duration']}",
+        '# HELP scraper_run_finished_timestamp_seconds Unix time the last run finished.',
+        '# TYPE scraper_run_finished_timestamp_seconds gauge',
+        f"scraper_run_finished_timestamp_seconds{_prometheus_labels(scraper=scraper)} "
+        f"{int(datetime.fromisoformat(snapshot['finished_at']).timestamp())}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+_run_metrics: Optional[RunMetrics] = None
+_run_metrics_lock = threading.Lock()
+
+
+def get_run_metrics() -> RunMetrics:
+    """
+    取得本次執行共用的請求指標（第一次呼叫時建立）
+
+    Returns:
+        RunMetrics: 共用指標實例
+    """
+    global _run_metrics
+    with _run_metrics_lock:
+        if _run_metrics is None:
+            _run_metrics = RunMetrics()
+        return _run_metrics
+
+
+def get_metrics_directory() -> Path:
+    """
+    取得請求指標的輸出目錄
+
+    Returns:
+        Path: 環境變數 METRICS_DIR 指定的目錄，預設為 market-data/Metrics
+    """
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        return Path(metrics_dir)
+    return get_market_data_root() / "Metrics"
+
+
+def prune_run_metrics(directory: Path, retention_days: int = METRICS_RETENTION_DAYS) -> int:
+    """
+    刪除超過保留天數的請求指標 JSON 檔（依檔名中的執行時間）
+
+    Args:
+        directory: 指標目錄
+        retention_days: 保留天數
+
+    Returns:
+        int: 刪除的檔案數
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    removed = 0
+    for path in directory.glob('*.json'):
+        match = METRICS_FILE_STAMP.search(path.name)
+        if not match:
+            continue
+        try:
+            if datetime.strptime(match.group(1), '%Y%m%d-%H%M%S') >= cutoff:
+                continue
+            path.unlink()
+            removed += 1
+        except ValueError:
+            continue
+        except OSError as e:
+            print_warning(f"無法刪除舊的請求指標 {path.name}: {e}")
+    return removed
+
+
+def write_run_metrics(
+    metrics: Optional[RunMetrics] = None,
+    directory: Optional[Path] = None,
+    retention_days: int = METRICS_RETENTION_DAYS,
+) -> Optional[Tuple[Path, Path]]:
+    """
+    輸出本次執行的請求指標
+
+    JSON 檔每次執行各寫一份（{job}-{時間}.json），超過 retention_days 天的舊檔
+    會一併刪除；Prometheus textfile（{job}.prom）每次覆寫，供 node_exporter
+    textfile collector 讀取最新一次的結果。
+
+    Args:
+        metrics: 要輸出的指標，None 表示使用共用實例
+        directory: 輸出目錄，None 表示使用 get_metrics_directory()
+        retention_days: JSON 檔保留天數
+
+    Returns:
+        Optional[Tuple[Path, Path]]: (JSON 路徑, textfile 路徑)，沒有任何請求或寫入失敗時為 None
+    """
+    metrics = metrics or _run_metrics
+    if metrics is None or not metrics.samples:
+        return None
+
+    directory = directory or get_metrics_directory()
+    snapshot = metrics.snapshot()
+    stamp = datetime.fromisoformat(snapshot['started_at']).strftime('%Y%m%d-%H%M%S')
+    json_path = directory / f"{metrics.job}-{stamp}.json"
+    prom_path = directory / f"{metrics.job}.prom"
+
+    content = json.dumps(snapshot, ensure_ascii=False, indent=2) + '\n'
+    if write_output_if_changed(content, json_path) is None:
+        return None
+    if write_output_if_changed(format_prometheus_metrics(snapshot), prom_path) is None:
+        return None
+    prune_run_metrics(directory, retention_days)
+    return json_path, prom_path
+
+
+class TokenBucket:
+    """
+    單一端點的自適應 token bucket
+
+    每秒補充 rate 個 token，最多累積 capacity 個。被限流時速率減半，
+    近期錯誤率低時逐步回升到設定的速率（加法增、乘法減）。
+    """
+
+    # 錯誤率統計的視窗大小（最近幾次請求）
+    WINDOW = 50
+
+    # 錯誤率低於此值時才回升速率
+    RECOVER_ERROR_RATE = 0.05
+
+    def __init__(self, rate: float, capacity: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = rate / 16
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.outcomes: deque = deque(maxlen=self.WINDOW)
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """
+        取得一個 token，不足時等待
+
+        Returns:
+            float: 等待的秒數
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def error_rate(self) -> float:
+        """近期請求的錯誤率"""
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def record(self, ok: bool, throttled: bool = False) -> None:
+        """
+        記錄請求結果並調整速率
+
+        Args:
+            ok: 請求是否成功
+            throttled: 是否被限流（429 / rate limit）
+        """
+        with self._lock:
+            self.outcomes.append(ok)
+            if throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, 0)
+            elif ok and self.rate < self.max_rate:
+                errors = self.outcomes.count(False) / len(self.outcomes)
+                if errors < self.RECOVER_ERROR_RATE:
+                    self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def classify_error(error: Exception) -> Tuple[bool, bool]:
+    """
+    判斷錯誤是否可重試
+
+    Args:
+        error: 請求拋出的例外
+
+    Returns:
+        Tuple[bool, bool]: (是否可重試, 是否為限流)
+    """
+    name = type(error).__name__
+    message = str(error).lower()
+
+    if 'ratelimit' in name.lower() or '429' in message or 'too many requests' in message or 'rate limit' in message:
+        return True, True
+    if isinstance(error, (ConnectionError, TimeoutError)) or 'timeout' in name.lower() or 'connection' in name.lower():
+        return True, False
+    if any(code in message for code in ('500', '502', '503', '504')):
+        return True, False
+    return False, False
+
+
+def is_no_data_error(error: Exception) -> bool:
+    """
+    判斷錯誤是否代表代碼確定沒有資料（例如已下市）
+
+    只有這類錯誤與空回應會計入斷路器；可重試的錯誤（限流、連線、
+    伺服器錯誤）與其他錯誤不計入。
+
+    Args:
+        error: 請求拋出的例外
+
+    Returns:
+        bool: 是否為確定沒有資料
+    """
+    if classify_error(error)[0]:
+        return False
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    return (
+        'pricesmissing' in name or 'tzmissing' in name
+        or 'delisted' in message or 'no data found' in message or 'no price data' in message
+    )
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, maximum: float = RETRY_MAX_DELAY) -> float:
+    """
+    計算第 attempt 次重試前的等待秒數（指數退避加上完全隨機抖動）
+
+    Args:
+        attempt: 第幾次重試（從 0 開始）
+        base: 基本秒數
+        maximum: 等待上限
+
+    Returns:
+        float: 等待秒數
+    """
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+def parse_rate_limits(text: str) -> Dict[str, Tuple[float, float]]:
+    """
+    解析 "endpoint=每秒請求數[:突發容量],..." 格式的速率設定
+
+    Args:
+        text: 速率設定字串
+
+    Returns:
+        Dict[str, Tuple[float, float]]: {endpoint: (rate, capacity)}
+
+    Raises:
+        ScraperError: 格式錯誤
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        try:
+            endpoint, value = item.split('=', 1)
+            rate_text, _, capacity_text = value.partition(':')
+            rate = float(rate_text)
+            capacity = float(capacity_text) if capacity_text else max(1.0, rate * 2)
+        except ValueError:
+            raise ScraperError(f"無效的速率設定: {item}")
+        if rate <= 0 or capacity < 1:
+            raise ScraperError(f"無效的速率設定: {item}")
+        limits[endpoint.strip()] = (rate, capacity)
+    return limits
+
+
+class RateLimiter:
+    """
+    所有爬蟲共用的請求速率限制器
+
+    每個端點各有一個 TokenBucket；請求遇到限流或暫時性錯誤時，
+    以帶抖動的指數退避重試，並依錯誤率自動調整該端點的速率。
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        attempts: int = RETRY_ATTEMPTS,
+    ):
+        self.limits = dict(RATE_LIMITS, **(limits or {}))
+        self.attempts = attempts
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        """取得端點的 token bucket（第一次使用時建立）"""
+        with self._lock:
+            if endpoint not in self.buckets:
+                rate, capacity = self.limits.get(endpoint, DEFAULT_RATE_LIMIT)
+                self.buckets[endpoint] = TokenBucket(rate, capacity)
+                self.stats[endpoint] = {'requests': 0, 'retries': 0, 'throttled': 0, 'failed': 0, 'waited': 0.0}
+            return self.buckets[endpoint]
+
+    def _count(self, endpoint: str, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[endpoint][key] += amount
+
+    @profile_phase('network')
+    def call(self, endpoint: str, func: Callable[[], Any], symbol: Optional[str] = None) -> Any:
+        """
+        在速率限制下呼叫 func，可重試的錯誤會退避後重試
+
+        延遲（含等待與退避）、重試次數與結果會記錄到本次執行的請求指標。
+
+        Args:
+            endpoint: 端點名稱
+            func: 實際發出請求的函數
+            symbol: 請求的代碼（僅用於指標），None 表示批次請求
+
+        Returns:
+            Any: func 的結果
+
+        Raises:
+            Exception: 不可重試的錯誤，或重試次數用盡後的最後一個錯誤
+        """
+        bucket = self.bucket(endpoint)
+        started = time.perf_counter()
+        for attempt in range(self.attempts + 1):
+            self._count(endpoint, 'waited', bucket.acquire())
+            self._count(endpoint, 'requests')
+            try:
+                value = func()
+            except Exception as e:
+                retryable, throttled = classify_error(e)
+                bucket.record(False, throttled=throttled)
+                if throttled:
+                    self._count(endpoint, 'throttled')
+                if not retryable or attempt == self.attempts:
+                    self._count(endpoint, 'failed')
+                    get_run_metrics().record(symbol, endpoint, 'error', time.perf_counter() - started, attempt)
+                    raise
+                self._count(endpoint, 'retries')
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            bucket.record(True)
+            get_run_metrics().record(symbol, endpoint, 'ok', time.perf_counter() - started, attempt)
+            return value
+
+    def summary(self) -> str:
+        """產生各端點的請求統計文字"""
+        parts = []
+        for endpoint, stats in sorted(self.stats.items()):
+            text = f"{endpoint} {int(stats['requests'])} 次"
+            if stats['retries']:
+                text += f"，重試 {int(stats['retries'])}"
+            if stats['throttled']:
+                text += f"，限流 {int(stats['throttled'])}（速率 {self.buckets[endpoint].rate:.2f}/s）"
+            if stats['failed']:
+                text += f"，失敗 {int(stats['failed'])}"
+            if stats['waited'] >= 0.01:
+                text += f"，等待 {stats['waited']:.1f}s"
+            parts.append(text)
+        return "請求統計: " + ('; '.join(parts) if parts else "無")
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    取得所有爬蟲共用的速率限制器（第一次呼叫時建立）
+
+    Returns:
+        RateLimiter: 共用速率限制器，速率可由環境變數 YF_RATE_LIMITS 覆寫
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            limits = {}
+            env_limits = os.environ.get('YF_RATE_LIMITS')
+            if env_limits:
+                try:
+                    limits = parse_rate_limits(env_limits)
+                except ScraperError as e:
+                    print_warning(f"{e}，使用預設速率")
+            _rate_limiter = RateLimiter(limits)
+        return _rate_limiter
+
+
+def rate_limited_call(endpoint: str, func: Callable[[], Any], symbol: Optional[str] = None) -> Any:
+    """
+    透過共用速率限制器發出請求
+
+    Args:
+        endpoint: 端點名稱 (例如: "info", "history", "news", "download")
+        func: 實際發出請求的函數
+        symbol: 請求的代碼（僅用於指標），None 表示批次請求
+
+    Returns:
+        Any: func 的結果
+    """
+    return get_rate_limiter().call(endpoint, func, symbol=symbol)
+
+
+def cached_lookup(symbol: str, endpoint: str, **params: Any) -> Tuple[bool, Any]:
+    """
+    只查詢共用快取，不發出請求（例如批次下載前先取出已快取的代碼）
+
+    命中時與 cached_fetch 一樣記錄到請求指標。
+
+    Args:
+        symbol: 代碼
+        endpoint: 端點名稱
+        **params: 請求參數，會納入快取鍵
+
+    Returns:
+        Tuple[bool, Any]: (是否命中, 快取的值)
+    """
+    started = time.perf_counter()
+    hit, value = get_response_cache().get(symbol, endpoint, params)
+    if hit:
+        get_run_metrics().record(symbol, endpoint, 'cache_hit', time.perf_counter() - started)
+    return hit, value
+
+
+def cached_fetch(
+    symbol: str,
+    endpoint: str,
+    fetch_func: Callable[[], Any],
+    refresh: bool = False,
+    **params: Any,
+) -> Any:
+    """
+    透過共用快取取得 Yahoo Finance 回應
+
+    快取未命中時，請求會經過共用速率限制器（含重試與退避）；
+    快取命中也會記錄到請求指標。
+
+    Args:
+        symbol: 代碼
+        endpoint: 端點名稱 (例如: "info", "history", "news")
+        fetch_func: 實際發出請求的函數
+        refresh: 是否略過快取直接請求（仍以新結果更新快取）
+        **params: 請求參數，會納入快取鍵
+
+    Returns:
+        Any: 快取或新取得的結果
+    """
+    started = time.perf_counter()
+    missed = []
+
+    def fetch() -> Any:
+        missed.append(True)
+        return rate_limited_call(endpoint, fetch_func, symbol=symbol)
+
+    value = get_response_cache().fetch(symbol, endpoint, fetch, refresh=refresh, **params)
+    if not missed:
+        get_run_metrics().record(symbol, endpoint, 'cache_hit', time.perf_counter() - started)
+    return value
+
+
+def split_batch_history(df: Any, symbols: Sequence[str]) -> Dict[str, Any]:
+    """
+    將多檔代碼一次下載的結果拆回各代碼的 DataFrame
+
+    Args:
+        df: yf.download(group_by='ticker') 的回傳結果
+        symbols: 請求的代碼列表
+
+    Returns:
+        Dict[str, Any]: {symbol: DataFrame}，沒有資料的代碼不會出現在結果中
+    """
+    frames: Dict[str, Any] = {}
+    if df is None or df.empty:
+        return frames
+
+    if df.columns.nlevels > 1:
+        available = set(df.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in available:
+                continue
+            # 各市場交易日不同，合併後的空白列需逐檔移除
+            symbol_df = df[symbol].dropna(how='all')
+            if not symbol_df.empty:
+                frames[symbol] = symbol_df
+    elif len(symbols) == 1:
+        # 舊版 yfinance 單一代碼時不會有多層欄位
+        symbol_df = df.dropna(how='all')
+        if not symbol_df.empty:
+            frames[symbols[0]] = symbol_df
+
+    return frames
+
+
+class CircuitBreaker:
+    """
+    持久化的代碼斷路器
+
+    代碼確定沒有資料（空回應或已下市）時記錄下來：失敗次數未達門檻時
+    只在 NEGATIVE_CACHE_TTL 內略過（負向快取）；連續失敗達門檻後斷路，
+    冷卻時間隨失敗次數倍增。冷卻結束後放行一次探測請求，成功即恢復，
+    失敗則再次冷卻更久。資料存於 SQLite，跨執行保留。
+
+    bypass 為 True 時（--refresh / --no-cache）一律放行，但仍記錄結果。
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        threshold: int = BREAKER_FAILURE_THRESHOLD,
+        negative_ttl: float = NEGATIVE_CACHE_TTL,
+        base_cooldown: float = BREAKER_BASE_COOLDOWN,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN,
+    ):
+        self.path = path or get_cache_directory() / "circuit-breaker.sqlite"
+        self.threshold = threshold
+        self.negative_ttl = negative_ttl
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.bypass = False
+        self.skipped: List[str] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS failures ("
+                " symbol TEXT PRIMARY KEY,"
+                " failures INTEGER NOT NULL,"
+                " last_failure REAL NOT NULL,"
+                " blocked_until REAL NOT NULL,"
+                " reason TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def cooldown(self, failures: int) -> float:
+        """
+        計算失敗 failures 次後的略過秒數
+
+        Args:
+            failures: 連續失敗次數
+
+        Returns:
+            float: 略過秒數
+        """
+        if failures < self.threshold:
+            return self.negative_ttl
+        return min(self.max_cooldown, self.base_cooldown * (2 ** (failures - self.threshold)))
+
+    def allow(self, symbol: str) -> bool:
+        """
+        判斷是否應對代碼發出請求
+
+        Args:
+            symbol: 代碼
+
+        Returns:
+            bool: 未在冷卻中（或已到探測時間）時為 True
+        """
+        if self.bypass:
+            return True
+
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT blocked_until FROM failures WHERE symbol = ?", (symbol,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print_warning(f"讀取斷路器狀態失敗: {e}")
+                return True
+
+            if row is not None and time.time() < row[0]:
+                self.skipped.append(symbol)
+                get_run_metrics().record(symbol, 'breaker', 'skipped')
+                return False
+            return True
+
+    def record_failure(self, symbol: str, reason: str) -> None:
+        """
+        記錄代碼失敗並計算下次可重試的時間
+
+        Args:
+            symbol: 代碼
+            reason: 失敗原因（顯示於冷卻報告）
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT failures FROM failures WHERE symbol = ?", (symbol,)).fetchone()
+                failures = (row[0] if row else 0) + 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO failures (symbol, failures, last_failure, blocked_until, reason)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (symbol, failures, now, now + self.cooldown(failures), reason),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print_warning(f"寫入斷路器狀態失敗: {e}")
+
+    def record_success(self, symbol: str) -> None:
+        """記錄代碼成功，清除失敗紀錄"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM failures WHERE symbol = ?", (symbol,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print_warning(f"寫入斷路器狀態失敗: {e}")
+
+    def cooling_down(self) -> List[dict]:
+        """
+        列出目前在冷卻中的代碼
+
+        Returns:
+            List[dict]: symbol、failures、blocked_until、reason，依可重試時間排序
+        """
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT symbol, failures, blocked_until, reason FROM failures"
+                    " WHERE blocked_until > ? ORDER BY blocked_until",
+                    (time.time(),),
+                ).fetchall()
+            except sqlite3.Error as e:
+                print_warning(f"讀取斷路器狀態失敗: {e}")
+                return []
+        return [
+            {'symbol': symbol, 'failures': failures, 'blocked_until': blocked_until, 'reason': reason}
+            for symbol, failures, blocked_until, reason in rows
+        ]
+
+    def report(self) -> str:
+        """產生冷卻中代碼的報告文字"""
+        entries = self.cooling_down()
+        if not entries:
+            return "冷卻中的代碼: 無"
+
+        lines = [f"冷卻中的代碼 ({len(entries)} 個，本次略過 {len(set(self.skipped))} 個):"]
+        for entry in entries:
+            until = datetime.fromtimestamp(entry['blocked_until']).strftime('%Y-%m-%d %H:%M')
+            state = "斷路" if entry['failures'] >= self.threshold else "負向快取"
+            lines.append(
+                f"  {entry['symbol']:<12} 失敗 {entry['failures']} 次（{state}），"
+                f"{until} 後重試 - {entry['reason']}"
+            )
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_circuit_breaker: Optional[CircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    取得所有爬蟲共用的代碼斷路器（第一次呼叫時建立）
+
+    Returns:
+        CircuitBreaker: 共用斷路器實例
+    """
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker()
+        return _circuit_breaker
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    添加快取相關的命令列參數
+
+    Args:
+        parser: ArgumentParser 實例
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不使用回應快取（也不略過冷卻中的代碼）'
+    )
+    group.add_argument(
+        '--refresh',
+        action='store_true',
+        help='忽略既有快取與冷卻中的代碼重新請求，並以新結果更新快取'
+    )
+
+
+def configure_cache(args: argparse.Namespace) -> ResponseCache:
+    """
+    依命令列參數設定共用快取與斷路器，並在程式結束時印出命中、請求統計
+    與冷卻中的代碼，同時輸出本次執行的請求指標
+
+    Args:
+        args: 包含 no_cache / refresh 的參數
+
+    Returns:
+        ResponseCache: 共用快取實例
+    """
+    cache = get_response_cache()
+    if getattr(args, 'no_cache', False):
+        cache.mode = 'off'
+    elif getattr(args, 'refresh', False):
+        cache.mode = 'refresh'
+    get_circuit_breaker().bypass = cache.mode != 'normal'
+
+    def report():
+        print_status(cache.summary())
+        if _rate_limiter is not None and _rate_limiter.stats:
+            print_status(_rate_limiter.summary())
+        if _circuit_breaker is not None and _circuit_breaker.cooling_down():
+            print_warning(_circuit_breaker.report())
+        paths = write_run_metrics()
+        if paths is not None:
+            print_status(f"請求指標: {paths[0]}")
+
+    atexit.register(report)
+    return cache
+
+
 def create_argument_parser(
     description: str,
     epilog: str = "",
 ) -> argparse.ArgumentParser:
     """
-    建立標準化的 ArgumentParser
+    建立標準化的 ArgumentParser（含共用的 --profile 選項）
 
     Args:
         description: 程式描述
@@ -78,6 +1359,7 @@ def create_argument_parser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=epilog
     )
+    add_profile_argument(parser)
     return parser
 
 
@@ -141,40 +1423,280 @@ def setup_output_path(
     return get_data_directory(year, default_subdir) / default_filename
 
 
-def write_output(
-    content: str,
+class _ContentDigest:
+    """逐段計算內容的 SHA-256，各行先移除 VOLATILE_CONTENT"""
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._pending = ''
+
+    def update(self, text: str) -> None:
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._digest.update(VOLATILE_CONTENT.sub('', line).encode('utf-8') + b'\n')
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(VOLATILE_CONTENT.sub('', self._pending).encode('utf-8'))
+        return digest.hexdigest()
+
+
+def _file_digest(path: Path) -> Optional[str]:
+    """計算既有檔案內容的 _ContentDigest，無法以 UTF-8 讀取時返回 None"""
+    digest = _ContentDigest()
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for block in iter(lambda: f.read(1 << 16), ''):
+                digest.update(block)
+    except UnicodeDecodeError:
+        return None
+    return digest.hexdigest()
+
+
+@profile_phase('write')
+def write_output_if_changed(
+    content: Union[str, Iterable[str]],
     output_path: Optional[Path],
     verbose: bool = False
-) -> bool:
+) -> Optional[bool]:
     """
-    寫入輸出內容
+    寫入輸出內容，內容與既有檔案相同時不寫入
+
+    內容先寫到同目錄的暫存檔並計算雜湊，與既有檔案相同時捨棄暫存檔
+    （檔案與修改時間都不變）；不同時同步到磁碟後以改名取代原檔，讀取端
+    不會看到寫到一半的檔案。比對時忽略更新時間等每次執行都不同的部分
+    （VOLATILE_CONTENT），只有時間不同的報告視為未變動。
 
     Args:
-        content: 要寫入的內容
+        content: 要寫入的內容，或依序寫入的文字片段
         output_path: 輸出路徑，None 表示輸出到 stdout
         verbose: 是否顯示詳細資訊
 
     Returns:
-        bool: 是否成功
+        Optional[bool]: True 表示已寫入（內容有變動），False 表示內容未變動，
+                        None 表示寫入失敗
     """
+    # 串流輸出的產生器在寫入時才格式化，效能分析時將這段時間歸入格式化
+    chunks = [content] if isinstance(content, str) else profile_iter('format', content)
+
+    if output_path is None:
+        try:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            sys.stdout.write('\n')
+            return True
+        except IOError as e:
+            print_error(f"寫入檔案時發生錯誤: {e}")
+            return None
+
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
     try:
-        if output_path is None:
-            print(content)
-        else:
-            # 確保目錄存在
-            output_path.parent.mkdir(parents=True, exist_ok=True)
+        # 確保目錄存在
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        digest = _ContentDigest()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
 
+        if output_path.is_file() and _file_digest(output_path) == digest.hexdigest():
+            tmp_path.unlink()
             if verbose:
-                print_success(f"資料已儲存到: {output_path}")
+                print_status(f"內容未變動，略過寫入: {output_path}")
+            return False
 
-        return True
+        os.replace(tmp_path, output_path)
 
-    except IOError as e:
+    except (IOError, OSError) as e:
         print_error(f"寫入檔案時發生錯誤: {e}")
-        return False
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return None
+
+    if verbose:
+        print_success(f"資料已儲存到: {output_path}")
+    return True
+
+
+def write_output(
+    content: Union[str, Iterable[str]],
+    output_path: Optional[Path],
+    verbose: bool = False
+) -> bool:
+    """
+    寫入輸出內容（內容未變動時不寫入，寫入時以暫存檔改名取代）
+
+    Args:
+        content: 要寫入的內容，或依序寫入的文字片段
+        output_path: 輸出路徑，None 表示輸出到 stdout
+        verbose: 是否顯示詳細資訊
+
+    Returns:
+        bool: 是否成功（內容未變動也視為成功），需要知道是否有變動時
+              請使用 write_output_if_changed
+    """
+    return write_output_if_changed(content, output_path, verbose=verbose) is not None
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    將 pandas/numpy 值轉為 JSON 可表示的值
+
+    時間轉為 ISO 8601 字串，numpy 純量轉為 Python 數值，NaN 與正負無限大轉為 None。
+    """
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def get_sidecar_path(output_path: Path, fmt: str) -> Path:
+    """
+    取得與報告同名的結構化輸出路徑
+
+    Args:
+        output_path: Markdown 報告路徑
+        fmt: 'json' 或 'ndjson'
+
+    Returns:
+        Path: 副檔名改為 .json / .ndjson 的路徑
+    """
+    return Path(output_path).with_suffix(SIDECAR_FORMATS[fmt])
+
+
+@profile_phase('format')
+def format_sidecar(
+    records: Iterable[Dict[str, Any]],
+    schema: str,
+    fmt: str = 'json',
+    generated_at: Optional[str] = None,
+) -> str:
+    """
+    將記錄轉為帶有格式版本的 JSON 或 NDJSON 文字
+
+    JSON 為 {"schema", "schema_version", "generated_at", "records": [...]}；NDJSON 每行
+    一筆記錄，每筆都帶有 schema、schema_version 與 generated_at。輸出為嚴格的 JSON
+    （非有限數值轉為 null）；比對內容是否變動時會忽略 generated_at。
+
+    Args:
+        records: 記錄（值可為 pandas/numpy 型別）
+        schema: 記錄格式名稱（例如: "global-indices"、"holdings-prices"）
+        fmt: 'json' 或 'ndjson'
+        generated_at: 產生時間（ISO 8601），None 表示現在
+
+    Returns:
+        str: 輸出文字
+    """
+    if fmt not in SIDECAR_FORMATS:
+        raise ScraperError(f"未知的輸出格式: {fmt}")
+
+    generated_at = generated_at or datetime.now().isoformat(timespec='seconds')
+    header = {'schema': schema, 'schema_version': SIDECAR_SCHEMA_VERSION, 'generated_at': generated_at}
+    rows = [{key: to_json_value(value) for key, value in record.items()} for record in records]
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(dict(row, **header), ensure_ascii=False, allow_nan=False) + '\n' for row in rows)
+    return json.dumps(dict(header, records=rows), ensure_ascii=False, allow_nan=False, indent=2) + '\n'
+
+
+def write_sidecar(
+    records: Iterable[Dict[str, Any]],
+    output_path: Path,
+    schema: str,
+    fmt: str = 'json',
+    verbose: bool = False,
+) -> bool:
+    """
+    將記錄寫入與報告同名的 .json / .ndjson 檔
+
+    Args:
+        records: 記錄
+        output_path: Markdown 報告路徑
+        schema: 記錄格式名稱
+        fmt: 'json' 或 'ndjson'
+        verbose: 是否顯示詳細資訊
+
+    Returns:
+        bool: 是否成功（只有 generated_at 不同時不重寫檔案）
+    """
+    content = format_sidecar(records, schema, fmt)
+    return write_output_if_changed(content, get_sidecar_path(output_path, fmt), verbose=verbose) is not None
+
+
+def load_sidecar(path: Path, schema: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    讀取 write_sidecar 產生的 .json / .ndjson 檔
+
+    Args:
+        path: 檔案路徑
+        schema: 預期的記錄格式名稱，None 表示不檢查
+
+    Returns:
+        List[Dict[str, Any]]: 記錄列表（NDJSON 會移除 schema 與 generated_at 欄位）
+
+    Raises:
+        ScraperError: 格式版本不符或格式名稱不符
+    """
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+
+    if path.suffix == '.ndjson':
+        headers = []
+        records = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            headers.append((row.pop('schema', None), row.pop('schema_version', None)))
+            row.pop('generated_at', None)
+            records.append(row)
+    else:
+        document = json.loads(text)
+        headers = [(document.get('schema'), document.get('schema_version'))]
+        records = document.get('records', [])
+
+    for found_schema, version in set(headers):
+        if version != SIDECAR_SCHEMA_VERSION:
+            raise ScraperError(f"{path}: 不支援的格式版本 {version}（預期 {SIDECAR_SCHEMA_VERSION}）")
+        if schema is not None and found_schema != schema:
+            raise ScraperError(f"{path}: 格式為 {found_schema}，預期 {schema}")
+    return records
+
+
+def add_sidecar_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    添加結構化輸出的命令列參數（--json / --ndjson，結果存於 args.sidecar）
+
+    Args:
+        parser: ArgumentParser 實例
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--json',
+        dest='sidecar',
+        action='store_const',
+        const='json',
+        help='同時輸出同名的 .json 檔（含格式版本的結構化資料）'
+    )
+    group.add_argument(
+        '--ndjson',
+        dest='sidecar',
+        action='store_const',
+        const='ndjson',
+        help='同時輸出同名的 .ndjson 檔（每行一筆記錄）'
+    )
 
 
 def print_status(message: str) -> None:
@@ -262,3 +1784,87 @@ def safe_exit(success: bool = True) -> None:
         success: 是否成功，False 時使用 exit code 1
     """
     sys.exit(0 if success else 1)
+
+
+def run_bounded(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    workers: int = 4,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[int, Any, Any, bool], None]] = None,
+) -> List[Any]:
+    """
+    以有限數量的工作執行緒並行執行 func，結果依輸入順序返回
+
+    單一項目執行超過 timeout 秒即視為失敗（結果為 None），並補上一個
+    新的工作執行緒，因此卡住的項目不會拖住其他項目。工作執行緒為
+    daemon，卡住的請求也不會阻止程式結束。
+
+    Args:
+        func: 對每個項目執行的函數，拋出例外時結果為 None
+        items: 要處理的項目
+        workers: 最多同時執行的數量
+        timeout: 單一項目的逾時秒數，None 表示不限制
+        on_result: 每個項目完成或逾時時呼叫 (index, item, result, timed_out)
+
+    Returns:
+        List: 與 items 順序相同的結果列表
+    """
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    started: List[Optional[float]] = [None] * len(items)
+    finished = [False] * len(items)
+    pending: "queue.Queue[int]" = queue.Queue()
+    for index in range(len(items)):
+        pending.put(index)
+
+    lock = threading.Condition()
+
+    def finish(index: int, value: Any, timed_out: bool) -> None:
+        finished[index] = True
+        results[index] = value
+        if on_result:
+            on_result(index, items[index], value, timed_out)
+        lock.notify_all()
+
+    def worker() -> None:
+        while True:
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            with lock:
+                started[index] = time.monotonic()
+
+            try:
+                with profile_thread():
+                    value = func(items[index])
+            except Exception as e:
+                print_error(f"{items[index]}: {e}")
+                value = None
+
+            with lock:
+                # 已逾時的項目由主執行緒處理過，直接丟棄結果
+                if finished[index]:
+                    return
+                finish(index, value, False)
+
+    def spawn() -> None:
+        threading.Thread(target=worker, daemon=True).start()
+
+    with lock:
+        for _ in range(max(1, min(workers, len(items)))):
+            spawn()
+
+        while not all(finished):
+            if timeout is not None:
+                now = time.monotonic()
+                for index, start in enumerate(started):
+                    if not finished[index] and start is not None and now - start > timeout:
+                        finish(index, None, True)
+                        # 卡住的執行緒不再取新工作，補一個新的維持並行數
+                        spawn()
+            lock.wait(0.1)
+
+    return results
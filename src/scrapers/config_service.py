@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+設定檔服務
+
+延遲載入 config/holdings.yaml 與 config/indices.yaml：匯入模組時不讀取
+任何檔案，第一次需要時才解析，同一行程內每個檔案只解析一次。
+解析並驗證後的結果以 pickle 快取於 .cache/config/，鍵為檔案路徑、
+修改時間與大小，設定檔未變動時不需重新解析 YAML 與驗證格式。
+"""
+
+import hashlib
+import pickle
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common import (
+    ScraperError,
+    get_cache_directory,
+    get_project_root,
+    print_warning,
+)
+
+
+# 設定檔名稱 → 檔名（位於 config/）
+CONFIG_FILES = {
+    'holdings': 'holdings.yaml',
+    'indices': 'indices.yaml',
+}
+
+# 快取格式版本，格式變更時遞增以捨棄舊快取
+CONFIG_CACHE_VERSION = 1
+
+# 同一行程內已載入的設定，鍵為 (設定檔路徑, 修改時間, 大小)
+_configs: Dict[tuple, dict] = {}
+_configs_lock = threading.Lock()
+
+
+def get_config_path(name: str) -> Path:
+    """
+    取得設定檔的預設路徑
+
+    Args:
+        name: 設定檔名稱（'holdings' 或 'indices'）
+
+    Returns:
+        Path: config/ 下的設定檔路徑
+    """
+    if name not in CONFIG_FILES:
+        raise ScraperError(f"未知的設定檔: {name}")
+    return get_project_root() / 'config' / CONFIG_FILES[name]
+
+
+def _validate_groups(groups, path: Path, section: str) -> None:
+    """驗證 {群組: {名稱: {'symbol': ...} 或 '代碼'}} 結構"""
+    if groups is None:
+        return
+    if not isinstance(groups, dict):
+        raise ScraperError(f"{path}: {section} 必須是群組對應表")
+    for group_name, entries in groups.items():
+        # 群組可以為空
+        if entries is None:
+            continue
+        if not isinstance(entries, dict):
+            raise ScraperError(f"{path}: {section}.{group_name} 必須是名稱對應表")
+        for name, data in entries.items():
+            symbol = data.get('symbol') if isinstance(data, dict) else data
+            if not isinstance(symbol, str) or not symbol:
+                raise ScraperError(f"{path}: {section}.{group_name}.{name} 缺少 symbol")
+
+
+def validate_config(name: str, config, path: Path) -> dict:
+    """
+    驗證設定檔格式
+
+    Args:
+        name: 設定檔名稱
+        config: yaml.safe_load 的結果
+        path: 設定檔路徑（用於錯誤訊息）
+
+    Returns:
+        dict: 驗證後的設定（空檔案視為空字典）
+
+    Raises:
+        ScraperError: 格式錯誤
+    """
+    config = config or {}
+    if not isinstance(config, dict):
+        raise ScraperError(f"{path}: 最上層必須是對應表")
+
+    if name == 'indices':
+        _validate_groups(config.get('global_indices'), path, 'global_indices')
+    elif name == 'holdings':
+        _validate_groups(config.get('holdings'), path, 'holdings')
+        _validate_groups(config.get('watchlist'), path, 'watchlist')
+    return config
+
+
+def _get_cache_path(path: Path) -> Path:
+    digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:16]
+    return get_cache_directory() / 'config' / f"{path.stem}-{digest}.pickle"
+
+
+def load_config(name: str, path: Optional[Path] = None, use_cache: bool = True) -> dict:
+    """
+    載入並驗證設定檔
+
+    同一行程內相同檔案只解析一次；檔案未變動時直接使用 .cache 中
+    已驗證的結果。
+
+    Args:
+        name: 設定檔名稱（'holdings' 或 'indices'）
+        path: 設定檔路徑，None 表示使用預設路徑
+        use_cache: 是否使用 .cache 中的解析結果
+
+    Returns:
+        dict: 設定內容
+
+    Raises:
+        ScraperError: 找不到設定檔或格式錯誤
+    """
+    path = Path(path).resolve() if path else get_config_path(name).resolve()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise ScraperError(f"找不到配置檔: {path}")
+    signature = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    with _configs_lock:
+        if signature in _configs:
+            return _configs[signature]
+
+        cache_path = _get_cache_path(path)
+        if use_cache and cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as f:
+                    cached = pickle.load(f)
+                if cached.get('version') == CONFIG_CACHE_VERSION and cached.get('signature') == signature:
+                    _configs[signature] = cached['config']
+                    return cached['config']
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                pass
+
+        import yaml
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = validate_config(name, yaml.safe_load(f), path)
+        except yaml.YAMLError as e:
+            raise ScraperError(f"解析 YAML 檔案時發生錯誤 {path}: {e}")
+
+        if use_cache:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(
+                        {'version': CONFIG_CACHE_VERSION, 'signature': signature, 'config': config},
+                        f,
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+                tmp_path.replace(cache_path)
+            except OSError as e:
+                print_warning(f"無法寫入設定檔快取: {e}")
+
+        _configs[signature] = config
+        return config
+
+
+def _normalize_groups(groups) -> Dict[str, Dict[str, dict]]:
+    """將群組內的舊格式（名稱: '代碼'）統一為 {'symbol': '代碼'}"""
+    result = {}
+    for group_name, entries in (groups or {}).items():
+        result[group_name] = {
+            name: dict(data) if isinstance(data, dict) else {'symbol': data}
+            for name, data in (entries or {}).items()
+        }
+    return result
+
+
+def get_global_indices(path: Optional[Path] = None) -> Dict[str, Dict[str, dict]]:
+    """
+    取得全球指數設定
+
+    Args:
+        path: indices.yaml 路徑，None 表示使用預設路徑
+
+    Returns:
+        Dict[str, Dict[str, dict]]: {區域: {指數名稱: {'symbol': ..., 'fetch_news': ...}}}，依設定檔順序
+    """
+    return _normalize_groups(load_config('indices', path).get('global_indices'))
+
+
+def get_regions(path: Optional[Path] = None) -> List[str]:
+    """
+    取得指數設定中的區域名稱
+
+    Returns:
+        List[str]: 依設定檔順序的區域名稱
+    """
+    return list(get_global_indices(path))
+
+
+def get_indices(region: Optional[str] = None, path: Optional[Path] = None) -> List[dict]:
+    """
+    取得指數列表
+
+    Args:
+        region: 只取這個區域的指數，None 表示全部
+        path: indices.yaml 路徑，None 表示使用預設路徑
+
+    Returns:
+        List[dict]: 每個指數一筆（symbol, name, region, fetch_news）
+    """
+    indices = []
+    for region_name, entries in get_global_indices(path).items():
+        if region is not None and region_name != region:
+            continue
+        for name, data in entries.items():
+            indices.append({
+                'symbol': data['symbol'],
+                'name': name,
+                'region': region_name,
+                'fetch_news': bool(data.get('fetch_news', False)),
+            })
+    return indices
+
+
+def get_holdings_groups(section: str = 'holdings', path: Optional[Path] = None) -> Dict[str, Dict[str, dict]]:
+    """
+    取得持倉或觀察清單的群組
+
+    Args:
+        section: 'holdings' 或 'watchlist'
+        path: holdings.yaml 路徑，None 表示使用預設路徑
+
+    Returns:
+        Dict[str, Dict[str, dict]]: {群組: {名稱: 設定}}，空群組為空字典
+    """
+    if section not in ('holdings', 'watchlist'):
+        raise ScraperError(f"未知的持倉區段: {section}")
+    return _normalize_groups(load_config('holdings', path).get(section))
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+單一行程執行所有爬蟲（全球指數、持倉價格、新聞）
+
+三個階段在同一個行程中並行執行，共用 yfinance/pandas 的載入成本與
+同一個 HTTP session（連線與 Yahoo cookie/crumb 只需建立一次）。
+每個階段獨立計時、獨立判斷成功與否，任一階段失敗時 exit code 為 1。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import (
+    create_argument_parser,
+    add_cache_arguments,
+    configure_cache,
+    get_shared_session,
+    print_status,
+    print_error,
+    print_success,
+    safe_exit,
+    validate_positive_int,
+    ScraperError,
+)
+from fetch_global_indices import fetch_global_indices
+from fetch_holdings_prices import fetch_holdings_prices
+from fetch_all_news import fetch_all_news
+
+
+# 可執行的階段：名稱 → 顯示名稱
+STAGES = {
+    'global': '全球指數',
+    'holdings': '持倉價格',
+    'news': '市場新聞',
+}
+
+
+def run_stage(name, func):
+    """
+    執行單一階段並計時
+
+    階段內部呼叫 safe_exit 或拋出例外都只視為該階段失敗，
+    不影響其他階段。
+
+    Args:
+        name: 階段名稱
+        func: 無參數的函數，返回 None 表示失敗（False 只表示輸出內容未變動）
+
+    Returns:
+        tuple: (階段名稱, 是否成功, 耗時秒數)
+    """
+    start = time.perf_counter()
+    try:
+        success = func() is not None
+    except SystemExit as e:
+        success = e.code in (0, None)
+    except Exception as e:
+        print_error(f"{STAGES[name]} 階段發生錯誤: {e}")
+        success = False
+    return name, success, time.perf_counter() - start
+
+
+def fetch_all(stages=None, sequential=False, batch=True, workers=8, concurrency=8, fast=False,
+              incremental_news=False):
+    """
+    執行所有（或指定的）爬蟲階段
+
+    Args:
+        stages: 要執行的階段名稱列表，None 表示全部
+        sequential: 是否依序執行（預設並行）
+        batch: 全球指數是否使用批次下載
+        workers: 持倉價格的並行執行緒數
+        concurrency: 新聞的最大並行請求數
+        fast: 持倉價格是否使用輕量報價（不呼叫 ticker.info）
+        incremental_news: 新聞是否使用增量模式（只加入新文章）
+
+    Returns:
+        list: [(階段名稱, 是否成功, 耗時秒數)]，順序與 STAGES 相同
+    """
+    stages = stages or list(STAGES)
+
+    # 先建立共用 session，所有階段都透過 get_shared_session() 取得同一個
+    get_shared_session()
+
+    funcs = {
+        'global': lambda: fetch_global_indices(batch=batch),
+        'holdings': lambda: fetch_holdings_prices(workers=workers, fast=fast),
+        'news': lambda: fetch_all_news(concurrency=concurrency, incremental=incremental_news),
+    }
+    selected = [name for name in STAGES if name in stages]
+
+    if sequential:
+        return [run_stage(name, funcs[name]) for name in selected]
+
+    with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        futures = [executor.submit(run_stage, name, funcs[name]) for name in selected]
+        return [future.result() for future in futures]
+
+
+def print_stage_report(results, total_seconds):
+    """
+    印出各階段的結果與耗時
+
+    Args:
+        results: fetch_all 的返回值
+        total_seconds: 整體耗時秒數
+    """
+    print_status("\n" + "=" * 60)
+    print_status("爬蟲執行結果")
+    print_status("=" * 60)
+    for name, success, seconds in results:
+        mark = "✓" if success else "✗"
+        print_status(f"  {mark} {STAGES[name]:<8} {seconds:8.2f}s")
+    print_status("-" * 60)
+    print_status(f"  總耗時 {total_seconds:.2f}s")
+    print_status("=" * 60)
+
+
+def main():
+    parser = create_argument_parser(
+        description='在單一行程中並行執行全球指數、持倉價格與新聞爬蟲（共用 HTTP session）',
+        epilog="""
+使用範例:
+  # 執行所有爬蟲（等同 make fetch-all）
+  python fetch_all.py
+
+  # 只執行持倉價格與新聞
+  python fetch_all.py -s holdings news
+
+  # 依序執行（除錯用）
+  python fetch_all.py --sequential
+
+階段:
+  global    全球指數 (fetch_global_indices)
+  holdings  持倉價格 (fetch_holdings_prices)
+  news      市場新聞 (fetch_all_news)
+        """
+    )
+
+    parser.add_argument(
+        '-s', '--stages',
+        nargs='+',
+        choices=list(STAGES),
+        help='要執行的階段（可多選），不指定則執行全部'
+    )
+
+    parser.add_argument(
+        '--sequential',
+        action='store_true',
+        help='依序執行各階段而非並行'
+    )
+
+    parser.add_argument(
+        '--no-batch',
+        action='store_true',
+        help='全球指數逐一請求而非批次下載'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='持倉價格的並行執行緒數 (預設: 8)'
+    )
+
+    parser.add_argument(
+        '-c', '--concurrency',
+        type=int,
+        default=8,
+        help='新聞的最大並行請求數 (預設: 8)'
+    )
+
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='持倉價格使用輕量報價（基本資料取自每日快照）'
+    )
+
+    parser.add_argument(
+        '--incremental-news',
+        action='store_true',
+        help='新聞使用增量模式（只加入新文章，沒有新文章的項目不重寫檔案）'
+    )
+
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+
+    # 檢查參數
+    try:
+        validate_positive_int(args.workers, "執行緒數量")
+        validate_positive_int(args.concurrency, "並行數")
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    configure_cache(args)
+
+    start = time.perf_counter()
+    results = fetch_all(
+        stages=args.stages,
+        sequential=args.sequential,
+        batch=not args.no_batch,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        fast=args.fast,
+        incremental_news=args.incremental_news
+    )
+    print_stage_report(results, time.perf_counter() - start)
+
+    failed = [STAGES[name] for name, success, _ in results if not success]
+    if failed:
+        print_error(f"失敗的階段: {', '.join(failed)}")
+    else:
+        print_success("所有爬蟲完成")
+
+    safe_exit(not failed)
+
+
+if __name__ == '__main__':
+    main()
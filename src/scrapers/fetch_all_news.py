@@ -3,169 +3,257 @@
 批次爬取所有配置的股票和指數新聞
 從 config/holdings.yaml 和 config/indices.yaml 讀取配置
 只爬取 fetch_news: true 的項目
-"""
 
-import sys
-import yaml
-from pathlib import Path
-from fetch_market_news import fetch_market_news
-from common import print_status, print_error, safe_exit, get_project_root
+以 asyncio 並行爬取，所有請求共用同一個 HTTP session，
+每個項目取得新聞後立即存入新聞資料庫並寫檔，不需等待其他項目；
+全部完成後產生當天的新聞彙整（重複的文章只列一次）
+
+增量模式（--incremental）只加入每個項目上次之後的新文章，
+沒有新文章的項目不格式化、不寫檔，檔案修改時間不變
+"""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fetch_market_news import get_news, format_news, get_news_output_path, store_news, write_news_digest
+from news_index import get_news_index
+from news_store import get_news_store
+from symbol_universe import load_universe, query_symbols
+from common import (
+    create_argument_parser,
+    get_shared_session,
+    get_data_directory,
+    print_status,
+    print_error,
+    print_warning,
+    safe_exit,
+    validate_positive_int,
+    write_output_if_changed,
+    ScraperError,
+    add_cache_arguments,
+    configure_cache,
+    profile_phase,
+)
+
+
+async def ingest_news_item(item, limit, session, news_dir, semaphore, incremental=False):
+    """
+    爬取單一項目的新聞並立即寫入檔案
+
+    Args:
+        item: symbol_universe 的代碼項目
+        limit: 新聞數量上限
+        session: 共用的 HTTP session
+        news_dir: 新聞輸出目錄
+        semaphore: 限制同時請求數的 asyncio.Semaphore
+        incremental: 是否為增量模式（沒有新文章時不寫檔）
+
+    Returns:
+        tuple: (item, 是否成功, 當天的新聞數量, 新加入的新聞數量)
+    """
+    symbol = item['symbol']
 
-def load_config(config_file):
-    """載入 YAML 配置檔"""
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        async with semaphore:
+            news = await asyncio.to_thread(get_news, symbol, limit, session)
+
+        if not news:
+            print_error(f"{item['name']} ({symbol}): 無法取得新聞資料")
+            return item, False, 0, 0
+
+        records, new_count = await asyncio.to_thread(store_news, symbol, news, None, incremental)
+        if incremental and not new_count:
+            return item, True, len(records), 0
+
+        with profile_phase('format'):
+            content = format_news(symbol, records)
+        output_path = get_news_output_path(symbol, news_dir=news_dir)
+        changed = await asyncio.to_thread(write_output_if_changed, content, output_path)
+        return item, changed is not None, len(records), new_count
+
     except Exception as e:
-        print_error(f"無法讀取配置檔 {config_file}: {e}")
-        return None
+        print_error(f"{item['name']} ({symbol}): 發生錯誤: {e}")
+        return item, False, 0, 0
 
 
-def extract_symbols_from_holdings(config):
-    """從 holdings.yaml 提取需要爬取新聞的股票代碼"""
-    symbols = []
-    if not config or 'holdings' not in config:
-        return symbols
+async def ingest_all_news(symbols, concurrency=8, limit=10, incremental=False):
+    """
+    並行爬取所有項目的新聞，每完成一項就寫檔並顯示進度
 
-    for category, stocks in config['holdings'].items():
-        # 檢查群組是否為空
-        if stocks is None:
-            continue
-        for name, data in stocks.items():
-            if data.get('enabled', True) and data.get('fetch_news', False):
-                symbols.append({
-                    'symbol': data['symbol'],
-                    'name': name,
-                    'type': 'stock'
-                })
-
-    return symbols
-
-
-def extract_symbols_from_watchlist(config):
-    """從 holdings.yaml 提取觀察清單中需要爬取新聞的股票代碼"""
-    symbols = []
-    if not config or 'watchlist' not in config:
-        return symbols
-
-    for category, stocks in config['watchlist'].items():
-        # 檢查群組是否為空
-        if stocks is None:
-            continue
-        for name, data in stocks.items():
-            if data.get('enabled', True) and data.get('fetch_news', False):
-                symbols.append({
-                    'symbol': data['symbol'],
-                    'name': name,
-                    'type': 'watchlist'
-                })
-
-    return symbols
-
-
-def extract_symbols_from_indices(config):
-    """從 indices.yaml 提取需要爬取新聞的指數代碼"""
-    symbols = []
-    if not config or 'global_indices' not in config:
-        return symbols
-
-    for region, indices in config['global_indices'].items():
-        # 檢查群組是否為空
-        if indices is None:
-            continue
-        for name, data in indices.items():
-            if data.get('fetch_news', False):
-                symbols.append({
-                    'symbol': data['symbol'],
-                    'name': name,
-                    'type': 'index'
-                })
+    Args:
+        symbols: symbol_universe 的代碼項目列表
+        concurrency: 最多同時進行的請求數
+        limit: 每個項目的新聞數量上限
+        incremental: 是否為增量模式
 
-    return symbols
+    Returns:
+        tuple: (成功數, 失敗數, 新加入的新聞總數, 沒有新新聞的項目數)
+    """
+    session = get_shared_session()
+    news_dir = get_data_directory(subdir="News")
+    semaphore = asyncio.Semaphore(concurrency)
 
+    # 預設執行緒池大小依 CPU 數而定，需足以容納指定的並行數
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
 
-def main():
-    # 取得配置檔路徑
-    config_dir = get_project_root() / 'config'
-    holdings_config_file = config_dir / 'holdings.yaml'
-    indices_config_file = config_dir / 'indices.yaml'
+    tasks = [
+        asyncio.create_task(ingest_news_item(item, limit, session, news_dir, semaphore, incremental))
+        for item in symbols
+    ]
 
-    print_status("正在載入配置檔...")
+    success_count = 0
+    failed_count = 0
+    new_total = 0
+    unchanged_count = 0
 
-    # 載入配置
-    holdings_config = load_config(holdings_config_file)
-    indices_config = load_config(indices_config_file)
+    for done, task in enumerate(asyncio.as_completed(tasks), 1):
+        item, success, count, new_count = await task
+        label = f"[{done}/{len(symbols)}] {item['name']} ({item['symbol']})"
 
-    if not holdings_config and not indices_config:
-        print_error("無法載入任何配置檔")
-        safe_exit(False)
+        if not success:
+            failed_count += 1
+            print_error(f"{label} ✗ 失敗")
+            continue
 
-    # 提取需要爬取新聞的股票和指數
-    symbols = []
+        success_count += 1
+        new_total += new_count
+        if not incremental:
+            print_status(f"{label} ✓ {count} 則新聞")
+        elif new_count:
+            print_status(f"{label} ✓ 新增 {new_count} 則（今日共 {count} 則）")
+        else:
+            unchanged_count += 1
+            print_status(f"{label} ✓ 沒有新的新聞")
 
-    if holdings_config:
-        stock_symbols = extract_symbols_from_holdings(holdings_config)
-        symbols.extend(stock_symbols)
-        print_status(f"從 holdings.yaml 找到 {len(stock_symbols)} 隻需要爬取新聞的股票")
+    return success_count, failed_count, new_total, unchanged_count
 
-        watchlist_symbols = extract_symbols_from_watchlist(holdings_config)
-        symbols.extend(watchlist_symbols)
-        print_status(f"從 holdings.yaml 找到 {len(watchlist_symbols)} 隻觀察清單股票")
 
-    if indices_config:
-        index_symbols = extract_symbols_from_indices(indices_config)
-        symbols.extend(index_symbols)
-        print_status(f"從 indices.yaml 找到 {len(index_symbols)} 個需要爬取新聞的指數")
+def fetch_all_news(concurrency=8, limit=10, incremental=False):
+    """
+    爬取所有 fetch_news: true 項目的新聞
 
-    if not symbols:
-        print_error("沒有找到任何需要爬取新聞的項目（請檢查配置檔中的 fetch_news 設定）")
-        safe_exit(False)
+    Args:
+        concurrency: 最多同時進行的請求數
+        limit: 每個項目的新聞數量上限
+        incremental: 增量模式，只加入新文章，沒有新文章的項目不重寫檔案
 
-    print_status(f"總共需要爬取 {len(symbols)} 個項目的新聞\n")
+    Returns:
+        Optional[bool]: 有項目失敗時為 None，否則表示是否有新的新聞寫入
+    """
+    print_status("正在載入配置檔...")
 
-    # 依序爬取每個項目的新聞
-    success_count = 0
-    failed_count = 0
+    # 載入合併去重後的代碼總表，同一代碼只爬取一次
+    try:
+        universe = load_universe()
+    except ScraperError as e:
+        print_error(f"無法載入任何配置檔: {e}")
+        return None
 
-    for i, item in enumerate(symbols, 1):
-        symbol = item['symbol']
-        name = item['name']
-        item_type = item['type']
+    # 提取需要爬取新聞的股票和指數
+    symbols = query_symbols(universe, fetch_news=True)
+
+    stock_count = sum(1 for item in symbols if item['type'] == 'stock')
+    watchlist_count = sum(1 for item in symbols if item['type'] == 'watchlist')
+    index_count = sum(1 for item in symbols if item['type'] == 'index')
+    print_status(f"從 holdings.yaml 找到 {stock_count} 隻需要爬取新聞的股票")
+    print_status(f"從 holdings.yaml 找到 {watchlist_count} 隻觀察清單股票")
+    print_status(f"從 indices.yaml 找到 {index_count} 個需要爬取新聞的指數")
+
+    if not symbols:
+        print_error("沒有找到任何需要爬取新聞的項目（請檢查配置檔中的 fetch_news 設定）")
+        return None
 
-        print_status(f"[{i}/{len(symbols)}] 正在爬取 {name} ({symbol}) 的新聞...")
+    print_status(f"總共需要爬取 {len(symbols)} 個項目的新聞（並行數: {concurrency}）\n")
 
+    # 並行爬取每個項目的新聞
+    success_count, failed_count, new_total, unchanged_count = asyncio.run(
+        ingest_all_news(symbols, concurrency=concurrency, limit=limit, incremental=incremental)
+    )
+
+    # 由新聞資料庫產生當天的新聞彙整（增量模式下沒有新文章時不重寫）
+    changed = new_total > 0 if incremental else success_count > 0
+    if changed and write_news_digest(verbose=True):
         try:
-            # 爬取新聞（自動產生檔名，預設 10 則新聞）
-            success = fetch_market_news(
-                symbol=symbol,
-                limit=10,
-                output_file=None,
-                json_output=False,
-                auto_filename=True
-            )
-
-            if success:
-                success_count += 1
-                print_status(f"  ✓ 完成\n")
-            else:
-                failed_count += 1
-                print_error(f"  ✗ 失敗\n")
-
-        except Exception as e:
-            failed_count += 1
-            print_error(f"  ✗ 發生錯誤: {e}\n")
+            articles = get_news_store().day_articles()
+            mentions = sum(len(article['symbols']) for article in articles)
+            print_status(f"不重複新聞: {len(articles)} 則（共 {mentions} 則，合併 {mentions - len(articles)} 則重複）")
+        except ScraperError as e:
+            print_error(str(e))
+
+    # 將新寫入的新聞檔載入全文索引（只解析新增或變更的檔案）
+    if changed:
+        try:
+            stats = get_news_index().update()
+            print_status(f"新聞索引: 載入 {stats['indexed']} 個檔案，共 {stats['articles']} 篇文章")
+        except ScraperError as e:
+            print_warning(f"無法更新新聞索引: {e}")
 
     # 顯示總結
     print("=" * 60)
     print_status(f"新聞爬取完成!")
     print_status(f"成功: {success_count}/{len(symbols)}")
+    if incremental:
+        print_status(f"新增: {new_total} 則新聞（{unchanged_count} 個項目沒有新的新聞，未重寫檔案）")
     if failed_count > 0:
         print_error(f"失敗: {failed_count}/{len(symbols)}")
     print("=" * 60)
 
-    # 如果所有項目都成功，則回傳成功
-    safe_exit(failed_count == 0)
+    # 有項目失敗時回傳 None，否則回傳是否有新的新聞寫入
+    return None if failed_count else changed
+
+
+def main():
+    parser = create_argument_parser(
+        description='批次爬取 config/holdings.yaml 與 config/indices.yaml 中 fetch_news: true 項目的新聞',
+        epilog="""
+使用範例:
+  # 爬取所有配置的新聞（預設同時 8 個請求）
+  python fetch_all_news.py
+
+  # 提高並行數並限制每檔 5 則新聞
+  python fetch_all_news.py -c 16 -l 5
+
+  # 增量模式：只加入上次之後的新文章，沒有新文章的項目不重寫檔案
+  python fetch_all_news.py -i
+        """
+    )
+
+    parser.add_argument(
+        '-c', '--concurrency',
+        type=int,
+        default=8,
+        help='最多同時進行的請求數 (預設: 8)'
+    )
+
+    parser.add_argument(
+        '-l', '--limit',
+        type=int,
+        default=10,
+        help='每個項目的新聞數量 (預設: 10則)'
+    )
+
+    parser.add_argument(
+        '-i', '--incremental',
+        action='store_true',
+        help='增量模式：只加入每個項目上次之後的新文章（累積到當天的紀錄），沒有新文章的項目不重寫檔案'
+    )
+
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+    configure_cache(args)
+
+    # 檢查參數
+    try:
+        validate_positive_int(args.concurrency, "並行數")
+        validate_positive_int(args.limit, "新聞數量")
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    changed = fetch_all_news(concurrency=args.concurrency, limit=args.limit, incremental=args.incremental)
+
+    safe_exit(changed is not None)
 
 
 if __name__ == '__main__':
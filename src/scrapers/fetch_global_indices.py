@@ -9,42 +9,82 @@ from datetime import datetime
 from pathlib import Path
 import yfinance as yf
 import pandas as pd
-import yaml
 
 from common import (
     create_argument_parser,
     setup_output_path,
-    write_output,
+    write_output_if_changed,
     print_status,
     print_error,
     print_success,
     print_warning,
     generate_dated_filename,
-    get_project_root,
+    add_cache_arguments,
+    configure_cache,
+    cached_fetch,
+    cached_lookup,
+    split_batch_history,
+    get_response_cache,
+    rate_limited_call,
+    ScraperError,
+    safe_exit,
+    get_shared_session,
+    get_circuit_breaker,
+    is_no_data_error,
+    add_sidecar_arguments,
+    write_sidecar,
+    profile_phase,
 )
+from config_service import get_global_indices
+from price_store import save_snapshot_bars
 
 
-def load_indices_config():
+def build_index_data(df, symbol, index_name):
     """
-    從 YAML 配置檔載入全球指數設定
+    從歷史資料 DataFrame 組出單一指數的今日資料
+
+    Args:
+        df: 該指數最近幾天的 OHLCV 資料（已移除空白列）
+        symbol: Yahoo Finance 代碼
+        index_name: 指數名稱
 
     Returns:
-        dict: 全球指數配置字典
+        dict: 包含指數資料的字典，如果沒有資料則返回 None
     """
-    config_path = get_project_root() / "config" / "indices.yaml"
-
-    if not config_path.exists():
-        print_error(f"找不到配置檔: {config_path}")
-        exit(1)
-
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    return config.get('global_indices', {})
-
+    if df.empty:
+        return None
 
-# 從 YAML 配置檔載入全球指數設定
-GLOBAL_INDICES = load_indices_config()
+    # 取最新一筆資料
+    latest = df.iloc[-1]
+    latest_date = df.index[-1]
+
+    # 計算漲跌
+    # 優先使用前一天收盤價，如果沒有則用今天開盤價
+    if len(df) >= 2:
+        prev_close = df.iloc[-2]['Close']
+        change = latest['Close'] - prev_close
+        change_pct = (change / prev_close) * 100
+    elif pd.notna(latest['Open']) and latest['Open'] > 0:
+        # 盤中狀態：用今天開盤價計算
+        change = latest['Close'] - latest['Open']
+        change_pct = (change / latest['Open']) * 100
+    else:
+        change = 0
+        change_pct = 0
+
+    return {
+        'name': index_name,
+        'symbol': symbol,
+        'date': latest_date,
+        'open': latest['Open'],
+        'high': latest['High'],
+        'low': latest['Low'],
+        'close': latest['Close'],
+        'volume': latest['Volume'],
+        'change': change,
+        'change_pct': change_pct,
+        'market': None,  # Will be set later
+    }
 
 
 def fetch_index_data(symbol, index_name):
@@ -58,52 +98,125 @@ def fetch_index_data(symbol, index_name):
     Returns:
         dict: 包含指數資料的字典，如果失敗則返回 None
     """
+    # 最近一直失敗的代碼在冷卻結束前不再請求
+    breaker = get_circuit_breaker()
+    if not breaker.allow(symbol):
+        print_warning(f"{index_name} ({symbol}): 冷卻中，略過")
+        return None
+
     try:
-        ticker = yf.Ticker(symbol)
         # 獲取最近2天的資料（確保能取到今日資料）
-        df = ticker.history(period='2d')
-
-        if df.empty:
+        df = cached_fetch(
+            symbol, 'history',
+            lambda: yf.Ticker(symbol, session=get_shared_session()).history(period='2d'),
+            period='2d',
+        )
+
+        data = build_index_data(df, symbol, index_name)
+        if data is None:
             print_warning(f"{index_name} ({symbol}): 無法取得資料")
-            return None
-
-        # 取最新一筆資料
-        latest = df.iloc[-1]
-        latest_date = df.index[-1]
-
-        # 計算漲跌
-        # 優先使用前一天收盤價，如果沒有則用今天開盤價
-        if len(df) >= 2:
-            prev_close = df.iloc[-2]['Close']
-            change = latest['Close'] - prev_close
-            change_pct = (change / prev_close) * 100
-        elif pd.notna(latest['Open']) and latest['Open'] > 0:
-            # 盤中狀態：用今天開盤價計算
-            change = latest['Close'] - latest['Open']
-            change_pct = (change / latest['Open']) * 100
+            breaker.record_failure(symbol, "無法取得資料")
         else:
-            change = 0
-            change_pct = 0
-
-        return {
-            'name': index_name,
-            'symbol': symbol,
-            'date': latest_date,
-            'open': latest['Open'],
-            'high': latest['High'],
-            'low': latest['Low'],
-            'close': latest['Close'],
-            'volume': latest['Volume'],
-            'change': change,
-            'change_pct': change_pct,
-            'market': None,  # Will be set later
-        }
+            breaker.record_success(symbol)
+        return data
 
     except Exception as e:
         print_error(f"{index_name} ({symbol}): {str(e)}")
+        # 可重試的錯誤（限流、連線）不代表代碼失效，不計入斷路器
+        if is_no_data_error(e):
+            breaker.record_failure(symbol, str(e))
         return None
 
 
+def fetch_indices_batch(index_items):
+    """
+    以單次多代碼下載爬取多個指數的今日資料
+
+    Args:
+        index_items: (index_name, symbol) 組成的列表
+
+    Returns:
+        tuple: ({symbol: 指數資料 dict}, [失敗的 (index_name, symbol)])
+    """
+    symbols = list(dict.fromkeys(symbol for _, symbol in index_items))
+
+    # 略過冷卻中的代碼
+    breaker = get_circuit_breaker()
+    cooling = {symbol for symbol in symbols if not breaker.allow(symbol)}
+    symbols = [symbol for symbol in symbols if symbol not in cooling]
+
+    # 先從快取取得，只下載未命中的代碼
+    cache = get_response_cache()
+    frames = {}
+    for symbol in symbols:
+        hit, cached_df = cached_lookup(symbol, 'history', period='2d')
+        if hit:
+            frames[symbol] = cached_df
+    to_download = [symbol for symbol in symbols if symbol not in frames]
+
+    # 逐一重試仍發生錯誤（非確定沒有資料）的代碼，不計入斷路器
+    errored = set()
+    if to_download:
+        try:
+            df = rate_limited_call('download', lambda: yf.download(
+                to_download,
+                period='2d',
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                session=get_shared_session(),
+            ))
+            downloaded = split_batch_history(df, to_download)
+        except Exception as e:
+            print_error(f"批次下載失敗: {str(e)}")
+            downloaded = {}
+
+        for symbol, symbol_df in downloaded.items():
+            cache.set(symbol, 'history', {'period': '2d'}, symbol_df)
+        frames.update(downloaded)
+
+        # 批次下載會吞掉個別代碼的錯誤（例如被限流），缺少的代碼逐一重試
+        for symbol in to_download:
+            if symbol in frames:
+                continue
+            try:
+                frames[symbol] = cached_fetch(
+                    symbol, 'history',
+                    lambda: yf.Ticker(symbol, session=get_shared_session()).history(period='2d'),
+                    period='2d',
+                )
+            except Exception as e:
+                print_error(f"{symbol}: {str(e)}")
+                if not is_no_data_error(e):
+                    errored.add(symbol)
+
+    records = {}
+    failed = []
+    for index_name, symbol in index_items:
+        if symbol in cooling:
+            print_warning(f"{index_name} ({symbol}): 冷卻中，略過")
+            failed.append((index_name, symbol))
+            continue
+
+        data = None
+        if symbol in frames:
+            data = build_index_data(frames[symbol], symbol, index_name)
+        if data is None:
+            print_warning(f"{index_name} ({symbol}): 無法取得資料")
+            failed.append((index_name, symbol))
+        else:
+            records[symbol] = data
+
+    for symbol in symbols:
+        if symbol in records:
+            breaker.record_success(symbol)
+        elif symbol not in errored:
+            breaker.record_failure(symbol, "無法取得資料")
+
+    return records, failed
+
+
 def format_all_market_data(all_data, use_emoji=True):
     """
     格式化所有市場的資料為單一 Markdown 表格
@@ -119,12 +232,8 @@ def format_all_market_data(all_data, use_emoji=True):
     lines.append("| 國家/地區 | 指數名稱 | 收盤價 | 開盤 | 最高 | 最低 | 成交量 | 漲跌 | 漲跌幅 |")
     lines.append("|----------|---------|--------|------|------|------|--------|------|--------|")
 
-    # 按照預定義的順序輸出
-    for market_name in GLOBAL_INDICES.keys():
-        if market_name not in all_data:
-            continue
-
-        indices_data = all_data[market_name]
+    # all_data 已依 indices.yaml 的區域順序排列
+    for market_name, indices_data in all_data.items():
         for data in indices_data:
             market = data['market']
             name = data['name']
@@ -157,34 +266,49 @@ def format_all_market_data(all_data, use_emoji=True):
     return '\n'.join(lines)
 
 
-def fetch_all_indices(regions=None):
+def get_index_symbol(index_config):
+    """
+    從指數設定取得 Yahoo Finance 代碼
+
+    支援新舊兩種格式
+    新格式: {'symbol': '^GSPC', 'fetch_news': true}
+    舊格式: '^GSPC'
+    """
+    if isinstance(index_config, dict):
+        return index_config.get('symbol', '')
+    return index_config
+
+
+def fetch_all_indices(regions=None, batch=False, global_indices=None):
     """
     爬取所有或指定區域的市場指數資料
 
     Args:
         regions: 要爬取的區域列表，None 表示全部
+        batch: 是否以單次多代碼下載取代逐一請求
+        global_indices: 全球指數設定，None 表示從 indices.yaml 載入
 
     Returns:
         dict: 各區域的資料
     """
     results = {}
 
-    markets_to_fetch = GLOBAL_INDICES
+    if global_indices is None:
+        global_indices = get_global_indices()
+
+    markets_to_fetch = global_indices
     if regions:
-        markets_to_fetch = {k: v for k, v in GLOBAL_INDICES.items() if k in regions}
+        markets_to_fetch = {k: v for k, v in global_indices.items() if k in regions}
+
+    if batch:
+        return fetch_all_indices_batch(markets_to_fetch)
 
     for market_name, indices in markets_to_fetch.items():
         print_status(f"\n正在爬取 {market_name} 市場指數...")
         market_data = []
 
         for index_name, index_config in indices.items():
-            # 支援新舊兩種格式
-            # 新格式: {'symbol': '^GSPC', 'fetch_news': true}
-            # 舊格式: '^GSPC'
-            if isinstance(index_config, dict):
-                symbol = index_config.get('symbol', '')
-            else:
-                symbol = index_config
+            symbol = get_index_symbol(index_config)
 
             print_status(f"  → {index_name} ({symbol})")
             data = fetch_index_data(symbol, index_name)
@@ -198,6 +322,157 @@ def fetch_all_indices(regions=None):
     return results
 
 
+def fetch_all_indices_batch(markets_to_fetch):
+    """
+    以單次多代碼下載爬取指定市場的所有指數，再依市場拆回結果
+
+    Args:
+        markets_to_fetch: {market_name: {index_name: index_config}}
+
+    Returns:
+        dict: 各區域的資料，格式與 fetch_all_indices 相同
+    """
+    index_items = [
+        (index_name, get_index_symbol(index_config))
+        for indices in markets_to_fetch.values()
+        for index_name, index_config in indices.items()
+    ]
+
+    print_status(f"\n正在批次爬取 {len(index_items)} 個市場指數...")
+    records, failed = fetch_indices_batch(index_items)
+
+    results = {}
+    for market_name, indices in markets_to_fetch.items():
+        market_data = []
+        for index_name, index_config in indices.items():
+            data = records.get(get_index_symbol(index_config))
+            if data:
+                # 同一代碼可能出現在多個市場，各自複製一份
+                data = dict(data, name=index_name, market=market_name)
+                market_data.append(data)
+                print_status(f"  ✓ {index_name}: {data['close']:.2f} ({data['change_pct']:+.2f}%)")
+        results[market_name] = market_data
+
+    if failed:
+        print_warning(f"{len(failed)} 個指數無法取得資料: "
+                      + ', '.join(f"{name} ({symbol})" for name, symbol in failed))
+
+    return results
+
+
+# 結構化輸出的記錄格式名稱
+SIDECAR_SCHEMA = 'global-indices'
+
+
+def to_sidecar_record(data):
+    """
+    將指數資料轉為結構化輸出的記錄（原始數值，不含顯示格式）
+
+    Args:
+        data: build_index_data 的結果（已填入 market）
+
+    Returns:
+        dict: region, name, symbol, date, close, open, high, low, volume, change, change_pct
+    """
+    return {
+        'region': data['market'],
+        'name': data['name'],
+        'symbol': data['symbol'],
+        'date': data['date'],
+        'close': data['close'],
+        'open': data['open'],
+        'high': data['high'],
+        'low': data['low'],
+        'volume': data['volume'],
+        'change': data['change'],
+        'change_pct': data['change_pct'],
+    }
+
+
+def fetch_global_indices(regions=None, output=None, use_emoji=True, batch=False, sidecar=None):
+    """
+    爬取全球市場指數並產生今日報告
+
+    Args:
+        regions: 要爬取的區域列表，None 表示全部
+        output: 輸出檔案路徑，None 表示自動產生檔名
+        use_emoji: 是否使用 emoji 符號
+        batch: 是否以單次多代碼下載取代逐一請求
+        sidecar: 同時輸出的結構化格式（'json' / 'ndjson'），None 表示只輸出 Markdown
+
+    Returns:
+        Optional[bool]: True 表示報告有變動並已寫入，False 表示內容未變動
+                        （只有更新時間不同），None 表示失敗
+    """
+    # 載入指數設定
+    try:
+        global_indices = get_global_indices()
+    except ScraperError as e:
+        print_error(str(e))
+        return None
+
+    # 驗證區域名稱
+    if regions:
+        invalid_regions = [r for r in regions if r not in global_indices]
+        if invalid_regions:
+            print_error(f"無效的區域名稱: {', '.join(invalid_regions)}")
+            print_status(f"可用區域: {', '.join(global_indices.keys())}")
+            return None
+
+    # 爬取資料
+    print_status("=" * 60)
+    print_status("全球市場大盤指數資料爬蟲")
+    print_status("=" * 60)
+
+    results = fetch_all_indices(regions=regions, batch=batch, global_indices=global_indices)
+
+    # 寫入價格資料庫
+    try:
+        save_snapshot_bars(data for indices in results.values() for data in indices)
+    except ScraperError as e:
+        print_warning(f"無法寫入價格資料庫: {e}")
+
+    # 產生報告
+    with profile_phase('format'):
+        today = datetime.now()
+        output_lines = []
+        output_lines.append(f"# 全球市場大盤指數 - {today.strftime('%Y-%m-%d')}\n")
+        output_lines.append(f"**更新時間**: {today.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+        # 使用單一表格輸出所有資料
+        output_lines.append(format_all_market_data(results, use_emoji=use_emoji))
+
+        output_lines.append("\n---\n")
+        output_lines.append("*資料來源: Yahoo Finance*\n")
+
+        result_text = '\n'.join(output_lines)
+
+    # 決定輸出檔案路徑
+    filename = generate_dated_filename("global-indices", "md")
+    output_file = setup_output_path(
+        output_arg=output,
+        default_filename=filename,
+        default_subdir="Daily",
+        use_stdout=False
+    )
+
+    # 寫入檔案（只有更新時間不同時不重寫）
+    changed = write_output_if_changed(result_text, output_file, verbose=True)
+    if changed is not None and sidecar:
+        records = [to_sidecar_record(data) for indices in results.values() for data in indices]
+        if not write_sidecar(records, output_file, SIDECAR_SCHEMA, sidecar, verbose=True):
+            changed = None
+
+    print_status("\n" + "=" * 60)
+
+    # 統計資訊
+    total_indices = sum(len(data) for data in results.values())
+    print_success(f"總共爬取了 {len(results)} 個市場的 {total_indices} 個指數")
+    print_status("=" * 60)
+
+    return changed
+
+
 def main():
     parser = create_argument_parser(
         description='爬取全球主要市場大盤指數今日資料（預設存成 data/market-data/{YEAR}/Daily/global-indices-YYYY-MM-DD.md）',
@@ -209,6 +484,12 @@ def main():
   # 爬取特定區域
   python fetch_global_indices.py -r 美國 日本 台灣
 
+  # 以單次多代碼下載爬取（較快）
+  python fetch_global_indices.py --batch
+
+  # 同時輸出結構化資料（global-indices-YYYY-MM-DD.json）
+  python fetch_global_indices.py --json
+
   # 指定輸出檔案
   python fetch_global_indices.py -o data/market-data/2025/Daily/global-indices-2025-11-18.md
 
@@ -239,56 +520,27 @@ def main():
         help='不使用 emoji 符號'
     )
 
-    args = parser.parse_args()
-
-    # 驗證區域名稱
-    if args.regions:
-        invalid_regions = [r for r in args.regions if r not in GLOBAL_INDICES]
-        if invalid_regions:
-            print_error(f"無效的區域名稱: {', '.join(invalid_regions)}")
-            print_status(f"可用區域: {', '.join(GLOBAL_INDICES.keys())}")
-            exit(1)
-
-    # 爬取資料
-    print_status("=" * 60)
-    print_status("全球市場大盤指數資料爬蟲")
-    print_status("=" * 60)
-
-    results = fetch_all_indices(regions=args.regions)
-
-    # 產生報告
-    today = datetime.now()
-    output_lines = []
-    output_lines.append(f"# 全球市場大盤指數 - {today.strftime('%Y-%m-%d')}\n")
-    output_lines.append(f"**更新時間**: {today.strftime('%Y-%m-%d %H:%M:%S')}\n")
-
-    # 使用單一表格輸出所有資料
-    use_emoji = not args.no_emoji
-    output_lines.append(format_all_market_data(results, use_emoji=use_emoji))
-
-    output_lines.append("\n---\n")
-    output_lines.append("*資料來源: Yahoo Finance*\n")
-
-    result_text = '\n'.join(output_lines)
-
-    # 決定輸出檔案路徑
-    filename = generate_dated_filename("global-indices", "md")
-    output_file = setup_output_path(
-        output_arg=args.output,
-        default_filename=filename,
-        default_subdir="Daily",
-        use_stdout=False
+    parser.add_argument(
+        '-b', '--batch',
+        action='store_true',
+        help='以單次多代碼下載取代逐一請求（大幅減少網路往返）'
     )
 
-    # 寫入檔案
-    write_output(result_text, output_file, verbose=True)
+    add_sidecar_arguments(parser)
+    add_cache_arguments(parser)
 
-    print_status("\n" + "=" * 60)
+    args = parser.parse_args()
+    configure_cache(args)
+
+    changed = fetch_global_indices(
+        regions=args.regions,
+        output=args.output,
+        use_emoji=not args.no_emoji,
+        batch=args.batch,
+        sidecar=args.sidecar
+    )
 
-    # 統計資訊
-    total_indices = sum(len(data) for data in results.values())
-    print_success(f"總共爬取了 {len(results)} 個市場的 {total_indices} 個指數")
-    print_status("=" * 60)
+    safe_exit(changed is not None)
 
 
 if __name__ == '__main__':
@@ -4,14 +4,17 @@
 從 holdings.md 檔案中提取股票代碼，並從 Yahoo Finance 獲取當天價格
 """
 
-import re
-from datetime import datetime
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
 import yfinance as yf
-import yaml
 
 from common import (
     create_argument_parser,
     write_output,
+    write_output_if_changed,
     print_status,
     print_error,
     print_warning,
@@ -19,7 +22,24 @@ from common import (
     safe_exit,
     setup_output_path,
     generate_dated_filename,
+    run_bounded,
+    validate_positive_int,
+    ScraperError,
+    add_cache_arguments,
+    configure_cache,
+    cached_fetch,
+    get_shared_session,
+    get_market_data_root,
+    get_circuit_breaker,
+    is_no_data_error,
+    rate_limited_call,
+    split_batch_history,
+    add_sidecar_arguments,
+    write_sidecar,
+    profile_phase,
 )
+from price_store import save_snapshot_bars
+from symbol_universe import load_universe, query_symbols
 
 
 def extract_holdings_from_yaml(holdings_file):
@@ -30,65 +50,289 @@ def extract_holdings_from_yaml(holdings_file):
         holdings_file: holdings.yaml 檔案路徑
 
     Returns:
-        list: 股票代碼列表
+        list: 股票代碼列表（持股與觀察清單合併去重）
     """
-    holdings = []
-
-    try:
-        with open(holdings_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-
-        # 遍歷所有持股群組
-        if 'holdings' not in config:
-            print_error("YAML 檔案中未找到 'holdings' 欄位")
-            safe_exit(False)
-
-        for group_name, stocks in config['holdings'].items():
-            # 檢查群組是否為空
-            if stocks is None:
-                continue
-            for stock_name, stock_info in stocks.items():
-                # 只提取啟用的股票
-                if stock_info.get('enabled', True):  # 預設為啟用
-                    symbol = stock_info.get('symbol')
-                    if symbol:
-                        holdings.append(symbol)
-
-        # 遍歷觀察清單
-        if 'watchlist' in config:
-            for group_name, stocks in config['watchlist'].items():
-                # 檢查群組是否為空
-                if stocks is None:
-                    continue
-                for stock_name, stock_info in stocks.items():
-                    # 只提取啟用的股票
-                    if stock_info.get('enabled', True):
-                        symbol = stock_info.get('symbol')
-                        if symbol and symbol not in holdings:  # 避免重複
-                            holdings.append(symbol)
-
-        print_status(f"從 {holdings_file} 中提取到 {len(holdings)} 隻啟用的股票（包含觀察清單）")
-
-    except FileNotFoundError:
+    if not Path(holdings_file).exists():
         print_error(f"找不到檔案 {holdings_file}")
         safe_exit(False)
-    except yaml.YAMLError as e:
-        print_error(f"解析 YAML 檔案時發生錯誤: {e}")
-        safe_exit(False)
-    except Exception as e:
-        print_error(f"讀取檔案時發生錯誤: {e}")
+
+    try:
+        universe = load_universe(holdings_file=holdings_file)
+    except ScraperError as e:
+        print_error(str(e))
         safe_exit(False)
 
+    holdings = [
+        entry['symbol']
+        for entry in query_symbols(universe, types=['stock', 'watchlist'])
+    ]
+
+    print_status(f"從 {holdings_file} 中提取到 {len(holdings)} 隻啟用的股票（包含觀察清單）")
+
     return holdings
 
 
-def fetch_stock_price(symbol, verbose=False):
+# 基本資料（名稱、市值、本益比、幣別）快照的最長有效時間
+FUNDAMENTALS_MAX_AGE = timedelta(days=1)
+
+_fundamentals_lock = threading.Lock()
+
+
+def get_fundamentals_path():
+    """
+    取得基本資料快照檔路徑
+
+    Returns:
+        Path: output/market-data/Fundamentals/snapshot.json
+    """
+    return get_market_data_root() / "Fundamentals" / "snapshot.json"
+
+
+def load_fundamentals_snapshot():
+    """
+    讀取基本資料快照
+
+    Returns:
+        dict: {symbol: {'name', 'market_cap', 'pe_ratio', 'currency', 'updated_at'}}
+    """
+    path = get_fundamentals_path()
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        print_warning(f"無法讀取基本資料快照: {e}")
+        return {}
+
+
+def save_fundamentals_snapshot(snapshot):
+    """
+    儲存基本資料快照
+
+    Args:
+        snapshot: load_fundamentals_snapshot 格式的字典
+    """
+    path = get_fundamentals_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def default_fundamentals(symbol):
+    """沒有基本資料時使用的預設值（名稱為代碼）"""
+    return {'name': symbol, 'market_cap': None, 'pe_ratio': None, 'currency': 'USD'}
+
+
+def get_fundamentals(symbol, snapshot, force=False):
+    """
+    取得單隻股票的基本資料，快照超過一天才呼叫 ticker.info 更新
+
+    Args:
+        symbol: 股票代碼
+        snapshot: 基本資料快照（會就地更新）
+        force: 是否忽略快照與回應快取強制更新
+
+    Returns:
+        dict: 包含 name、market_cap、pe_ratio、currency 的字典
+    """
+    with _fundamentals_lock:
+        entry = snapshot.get(symbol)
+
+    if entry and not force:
+        updated_at = datetime.fromisoformat(entry['updated_at'])
+        if datetime.now() - updated_at < FUNDAMENTALS_MAX_AGE:
+            return entry
+
+    try:
+        ticker = yf.Ticker(symbol, session=get_shared_session())
+        info = cached_fetch(symbol, 'info', lambda: ticker.info, refresh=force)
+    except Exception as e:
+        print_warning(f"{symbol} 無法更新基本資料: {e}")
+        return entry or default_fundamentals(symbol)
+
+    entry = {
+        'name': info.get('longName', info.get('shortName', symbol)),
+        'market_cap': info.get('marketCap', None),
+        'pe_ratio': info.get('trailingPE', None),
+        'currency': info.get('currency', 'USD'),
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with _fundamentals_lock:
+        snapshot[symbol] = entry
+    return entry
+
+
+def refresh_fundamentals_snapshot(symbols, snapshot, force=False, workers=4):
+    """
+    並行更新多隻股票的基本資料快照（未過期的項目不發出請求）
+
+    Args:
+        symbols: 股票代碼列表
+        snapshot: 基本資料快照（會就地更新）
+        force: 是否忽略快照與回應快取強制更新
+        workers: 同時請求的數量
+    """
+    run_bounded(lambda symbol: get_fundamentals(symbol, snapshot, force=force), symbols, workers=workers)
+
+
+def build_quote(symbol, hist, fundamentals):
+    """
+    從最近幾天的歷史資料與基本資料組出單隻股票的報價
+
+    Args:
+        symbol: 股票代碼
+        hist: 最近幾天的 OHLCV 資料（至少一筆）
+        fundamentals: get_fundamentals 的結果
+
+    Returns:
+        dict: 與 fetch_stock_price 相同格式的字典
+    """
+    latest = hist.iloc[-1]
+    previous_close = hist.iloc[-2]['Close'] if len(hist) >= 2 else latest['Close']
+
+    data = {
+        'symbol': symbol,
+        'date': hist.index[-1],
+        'name': fundamentals['name'],
+        'current_price': latest['Close'],
+        'open': latest['Open'],
+        'high': latest['High'],
+        'low': latest['Low'],
+        'volume': latest['Volume'],
+        'previous_close': previous_close,
+        'market_cap': fundamentals['market_cap'],
+        'pe_ratio': fundamentals['pe_ratio'],
+        'currency': fundamentals['currency']
+    }
+
+    # 計算漲跌幅
+    if data['previous_close'] and data['previous_close'] > 0:
+        change = data['current_price'] - data['previous_close']
+        data['change'] = change
+        data['change_percent'] = (change / data['previous_close']) * 100
+    else:
+        data['change'] = 0
+        data['change_percent'] = 0
+
+    return data
+
+
+def fetch_stock_quote(symbol, snapshot, verbose=False, refresh_fundamentals=False, raise_errors=False):
+    """
+    以輕量請求獲取單隻股票的當前價格（不呼叫 ticker.info）
+
+    價格與前一日收盤價取自最近5天的歷史資料，名稱、市值等
+    變動緩慢的欄位取自基本資料快照（每天最多更新一次）。
+
+    Args:
+        symbol: 股票代碼
+        snapshot: 基本資料快照（會就地更新）
+        verbose: 是否顯示詳細資訊
+        refresh_fundamentals: 是否強制更新基本資料
+        raise_errors: 發生錯誤時拋出例外（沒有資料時仍返回 None）
+
+    Returns:
+        dict: 與 fetch_stock_price 相同格式的字典，失敗返回 None
+    """
+    try:
+        if verbose:
+            print_status(f"正在獲取 {symbol} 的價格...")
+
+        # 最近5天可涵蓋週末與假日，取得前一個交易日收盤價
+        hist = cached_fetch(
+            symbol, 'history',
+            lambda: yf.Ticker(symbol, session=get_shared_session()).history(period='5d'),
+            period='5d',
+        )
+
+        if hist.empty:
+            print_warning(f"{symbol} 無法獲取歷史數據")
+            return None
+
+        fundamentals = get_fundamentals(symbol, snapshot, force=refresh_fundamentals)
+        return build_quote(symbol, hist, fundamentals)
+
+    except Exception as e:
+        if raise_errors:
+            raise
+        print_error(f"獲取 {symbol} 數據時發生錯誤: {e}")
+        return None
+
+
+def fetch_quotes_batch(symbols, snapshot):
+    """
+    以單次多代碼下載獲取所有股票的當前價格（不經過回應快取）
+
+    批次下載會吞掉個別代碼的錯誤（例如被限流），缺少的代碼逐一重試；
+    只有確定沒有資料才計入斷路器。基本資料只取自快照，不在輪詢中請求
+    （由 refresh_fundamentals_snapshot 事先更新）。
+
+    Args:
+        symbols: 股票代碼列表
+        snapshot: 基本資料快照
+
+    Returns:
+        dict: {symbol: 報價 dict}，冷卻中或沒有資料的代碼不會出現
+    """
+    breaker = get_circuit_breaker()
+    active = [symbol for symbol in symbols if breaker.allow(symbol)]
+    if not active:
+        return {}
+
+    try:
+        df = rate_limited_call('download', lambda: yf.download(
+            active,
+            period='5d',
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            session=get_shared_session(),
+        ))
+        frames = split_batch_history(df, active)
+    except Exception as e:
+        # 整批失敗多半是網路問題，改為逐一重試
+        print_error(f"批次下載失敗: {e}")
+        frames = {}
+
+    for symbol in active:
+        if symbol in frames:
+            continue
+        try:
+            hist = rate_limited_call(
+                'history',
+                lambda: yf.Ticker(symbol, session=get_shared_session()).history(period='5d'),
+                symbol=symbol,
+            )
+        except Exception as e:
+            print_error(f"{symbol}: {e}")
+            if is_no_data_error(e):
+                breaker.record_failure(symbol, str(e))
+            continue
+        if hist is None or hist.empty:
+            print_warning(f"{symbol} 無法獲取歷史數據")
+            breaker.record_failure(symbol, "無法獲取價格")
+            continue
+        frames[symbol] = hist
+
+    with _fundamentals_lock:
+        fundamentals = {symbol: snapshot.get(symbol) or default_fundamentals(symbol) for symbol in frames}
+
+    quotes = {}
+    for symbol in active:
+        if symbol in frames:
+            quotes[symbol] = build_quote(symbol, frames[symbol], fundamentals[symbol])
+            breaker.record_success(symbol)
+    return quotes
+
+
+def fetch_stock_price(symbol, verbose=False, raise_errors=False):
     """
     獲取單隻股票的當前價格資訊
 
     Args:
         symbol: 股票代碼
         verbose: 是否顯示詳細資訊
+        raise_errors: 發生錯誤時拋出例外（沒有資料時仍返回 None）
 
     Returns:
         dict: 包含股票資訊的字典，失敗返回 None
@@ -97,13 +341,17 @@ def fetch_stock_price(symbol, verbose=False):
         if verbose:
             print_status(f"正在獲取 {symbol} 的價格...")
 
-        ticker = yf.Ticker(symbol)
+        ticker = yf.Ticker(symbol, session=get_shared_session())
 
         # 獲取最新價格資訊
-        info = ticker.info
+        info = cached_fetch(symbol, 'info', lambda: ticker.info)
 
         # 獲取歷史數據（最近1天）
-        hist = ticker.history(period='1d')
+        hist = cached_fetch(
+            symbol, 'history',
+            lambda: ticker.history(period='1d'),
+            period='1d',
+        )
 
         if hist.empty:
             print_warning(f"{symbol} 無法獲取歷史數據")
@@ -114,6 +362,7 @@ def fetch_stock_price(symbol, verbose=False):
         # 提取關鍵資訊
         data = {
             'symbol': symbol,
+            'date': hist.index[-1],
             'name': info.get('longName', info.get('shortName', symbol)),
             'current_price': latest['Close'],
             'open': latest['Open'],
@@ -139,10 +388,84 @@ def fetch_stock_price(symbol, verbose=False):
         return data
 
     except Exception as e:
+        if raise_errors:
+            raise
         print_error(f"獲取 {symbol} 數據時發生錯誤: {e}")
         return None
 
 
+def fetch_with_breaker(symbol, fetch_func):
+    """
+    透過斷路器獲取單隻股票，冷卻中的股票直接略過
+
+    只有確定沒有資料（空的歷史資料或已下市）才計入斷路器，
+    限流、連線逾時等錯誤不代表代碼失效。
+
+    Args:
+        symbol: 股票代碼
+        fetch_func: 獲取單隻股票的函數 (symbol) -> dict，沒有資料返回 None，錯誤時拋出例外
+
+    Returns:
+        dict: fetch_func 的結果，冷卻中或失敗返回 None
+    """
+    breaker = get_circuit_breaker()
+    if not breaker.allow(symbol):
+        print_warning(f"{symbol} 冷卻中，略過")
+        return None
+
+    try:
+        data = fetch_func(symbol)
+    except Exception as e:
+        print_error(f"獲取 {symbol} 數據時發生錯誤: {e}")
+        if is_no_data_error(e):
+            breaker.record_failure(symbol, str(e))
+        return None
+
+    if data is None:
+        breaker.record_failure(symbol, "無法獲取價格")
+    else:
+        breaker.record_success(symbol)
+    return data
+
+
+def fetch_prices_concurrently(symbols, workers=4, timeout=30, verbose=False, fetch_func=None):
+    """
+    以有限執行緒池並行獲取多隻股票的價格資訊
+
+    Args:
+        symbols: 股票代碼列表
+        workers: 最多同時執行的請求數
+        timeout: 單隻股票的逾時秒數
+        verbose: 是否顯示詳細資訊
+        fetch_func: 獲取單隻股票的函數 (symbol) -> dict，預設為 fetch_stock_price
+
+    Returns:
+        list: 成功取得的股票資訊，順序與 symbols 相同
+    """
+    completed = [0]
+
+    def report(index, symbol, data, timed_out):
+        completed[0] += 1
+        if timed_out:
+            mark = f"✗ (逾時 {timeout:g} 秒)"
+        else:
+            mark = "✓" if data else "✗"
+        print_status(f"[{completed[0]}/{len(symbols)}] {symbol} {mark}")
+
+    if fetch_func is None:
+        fetch_func = lambda symbol: fetch_stock_price(symbol, verbose=verbose)
+
+    results = run_bounded(
+        fetch_func,
+        symbols,
+        workers=workers,
+        timeout=timeout,
+        on_result=report,
+    )
+
+    return [data for data in results if data]
+
+
 def format_markdown_table(holdings_data):
     """
     將持倉數據格式化為 Markdown 表格
@@ -226,6 +549,284 @@ def format_markdown_table(holdings_data):
     return '\n'.join(lines)
 
 
+# 結構化輸出的記錄格式名稱
+SIDECAR_SCHEMA = 'holdings-prices'
+
+
+def to_sidecar_record(data):
+    """
+    將報價 dict 轉為結構化輸出的記錄（原始數值，不含顯示格式）
+
+    Args:
+        data: fetch_stock_price / fetch_stock_quote 的結果
+
+    Returns:
+        dict: symbol, name, date, close, previous_close, open, high, low, volume,
+              change, change_pct, market_cap, pe_ratio, currency
+    """
+    return {
+        'symbol': data['symbol'],
+        'name': data['name'],
+        'date': data.get('date'),
+        'close': data['current_price'],
+        'previous_close': data['previous_close'],
+        'open': data['open'],
+        'high': data['high'],
+        'low': data['low'],
+        'volume': data['volume'],
+        'change': data['change'],
+        'change_pct': data['change_percent'],
+        'market_cap': data['market_cap'],
+        'pe_ratio': data['pe_ratio'],
+        'currency': data['currency'],
+    }
+
+
+def write_holdings_sidecar(holdings_data, output_file, fmt='json', verbose=False):
+    """
+    將報價寫入與 Markdown 同名的 .json / .ndjson 檔
+
+    Args:
+        holdings_data: 報價 dict 列表
+        output_file: Markdown 輸出路徑
+        fmt: 'json' 或 'ndjson'
+        verbose: 是否顯示詳細資訊
+
+    Returns:
+        bool: 是否成功
+    """
+    records = [to_sidecar_record(data) for data in holdings_data]
+    return write_sidecar(records, output_file, SIDECAR_SCHEMA, fmt, verbose=verbose)
+
+
+def resolve_holdings_symbols(input_file, verbose=False):
+    """
+    將 holdings.yaml 路徑轉為絕對路徑並提取股票代碼
+
+    Args:
+        input_file: holdings.yaml 檔案路徑（相對路徑以專案根目錄為準）
+        verbose: 是否顯示詳細資訊
+
+    Returns:
+        list: 股票代碼列表
+    """
+    project_root = get_project_root()
+
+    holdings_file = input_file
+    if not holdings_file.startswith('/'):
+        holdings_file = str(project_root / holdings_file)
+
+    if verbose:
+        print_status(f"專案根目錄: {project_root}")
+        print_status(f"Holdings 檔案: {holdings_file}")
+
+    return extract_holdings_from_yaml(holdings_file)
+
+
+def watch_holdings_prices(input_file='config/holdings.yaml', output=None, interval=60, sidecar=None,
+                          verbose=False, refresh_fundamentals=False, max_polls=None):
+    """
+    盤中監看模式：持續輪詢所有股票的價格，有變動時才重寫報告
+
+    每次輪詢只發出一個批次請求（批次缺少的代碼才逐一重試）；基本資料在
+    開始輪詢前（與每天第一次輪詢前）並行更新一次，不在輪詢中請求。
+    每隻股票最後一次的報價保留在記憶體中，某次輪詢缺少的股票沿用上次的
+    報價。只有價格變動時才重寫 Markdown（與結構化輸出），並只將變動的
+    股票寫入價格資料庫。
+
+    Args:
+        input_file: holdings.yaml 檔案路徑（相對路徑以專案根目錄為準）
+        output: 輸出檔案路徑，None 表示自動產生檔名（跨日時自動換檔）
+        interval: 輪詢間隔秒數
+        sidecar: 結構化輸出格式（'json' / 'ndjson'），None 表示不輸出
+        verbose: 是否顯示詳細資訊
+        refresh_fundamentals: 開始輪詢前是否強制更新基本資料快照
+        max_polls: 最多輪詢次數，None 表示直到中斷為止
+
+    Returns:
+        bool: 是否至少取得過一次報價
+    """
+    symbols = resolve_holdings_symbols(input_file, verbose=verbose)
+    if not symbols:
+        print_error("未找到任何股票代碼")
+        return False
+
+    print_status(f"監看 {len(symbols)} 隻股票，每 {interval:g} 秒更新（Ctrl+C 停止）")
+
+    snapshot = load_fundamentals_snapshot()
+    saved_snapshot = dict(snapshot)
+    # 每隻股票最後一次取得的報價；某次輪詢缺少的股票沿用上次的報價
+    latest = {}
+    refreshed_on = None
+    polls = 0
+    try:
+        while True:
+            started = time.monotonic()
+
+            # 開始輪詢前與跨日時並行更新基本資料（快照每天過期），有更新才儲存
+            if refreshed_on != date.today():
+                refresh_fundamentals_snapshot(symbols, snapshot, force=refresh_fundamentals and refreshed_on is None)
+                refreshed_on = date.today()
+                with _fundamentals_lock:
+                    current_snapshot = dict(snapshot)
+                if current_snapshot != saved_snapshot:
+                    try:
+                        save_fundamentals_snapshot(current_snapshot)
+                        saved_snapshot = current_snapshot
+                    except OSError as e:
+                        print_warning(f"無法儲存基本資料快照: {e}")
+
+            quotes = fetch_quotes_batch(symbols, snapshot)
+
+            now = datetime.now().strftime('%H:%M:%S')
+            changed = [
+                symbol for symbol, data in quotes.items()
+                if symbol not in latest
+                or (latest[symbol]['current_price'], latest[symbol]['previous_close'])
+                != (data['current_price'], data['previous_close'])
+            ]
+            latest.update(quotes)
+
+            if not quotes:
+                print_error(f"[{now}] 輪詢失敗：無法獲取任何股票的價格")
+            elif changed:
+                holdings_data = [latest[symbol] for symbol in symbols if symbol in latest]
+                output_file = setup_output_path(
+                    output_arg=output,
+                    default_filename=generate_dated_filename("holdings-prices", "md"),
+                    default_subdir="Daily",
+                    use_stdout=False
+                )
+                with profile_phase('format'):
+                    markdown_output = format_markdown_table(holdings_data)
+                write_output(markdown_output, output_file, verbose=False)
+                if sidecar:
+                    write_holdings_sidecar(holdings_data, output_file, sidecar)
+
+                try:
+                    save_snapshot_bars((quotes[symbol] for symbol in changed), price_key='current_price')
+                except ScraperError as e:
+                    print_warning(f"無法寫入價格資料庫: {e}")
+
+                print_status(f"[{now}] {len(changed)}/{len(holdings_data)} 隻股票價格變動 → {output_file}")
+            else:
+                print_status(f"[{now}] 價格無變動 ({len(quotes)}/{len(symbols)})")
+
+            missing = [symbol for symbol in symbols if symbol not in quotes]
+            if quotes and missing:
+                print_warning(f"[{now}] 本次未取得 {', '.join(missing)} 的報價，沿用上次的價格")
+
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print_status("\n停止監看")
+
+    return bool(latest)
+
+
+def fetch_holdings_prices(input_file='config/holdings.yaml', output=None, verbose=False, workers=1, timeout=30,
+                          fast=False, refresh_fundamentals=False, sidecar=None):
+    """
+    獲取 holdings.yaml 中所有啟用股票的價格並產生今日報告
+
+    Args:
+        input_file: holdings.yaml 檔案路徑（相對路徑以專案根目錄為準）
+        output: 輸出檔案路徑，None 表示自動產生檔名
+        verbose: 是否顯示詳細資訊
+        workers: 並行獲取的執行緒數量，1 表示逐一獲取
+        timeout: 並行模式下單隻股票的逾時秒數
+        fast: 是否使用輕量報價（不呼叫 ticker.info，基本資料取自每日快照）
+        refresh_fundamentals: 快速模式下是否強制更新基本資料快照
+        sidecar: 同時輸出的結構化格式（'json' / 'ndjson'），None 表示只輸出 Markdown
+
+    Returns:
+        Optional[bool]: True 表示報告有變動並已寫入，False 表示內容未變動
+                        （只有更新時間不同），None 表示失敗
+    """
+    # 提取股票代碼
+    symbols = resolve_holdings_symbols(input_file, verbose=verbose)
+
+    if not symbols:
+        print_error("未找到任何股票代碼")
+        return None
+
+    if verbose:
+        print_status(f"找到的股票: {', '.join(symbols)}")
+
+    # 獲取每隻股票的價格
+    print_status(f"\n正在獲取 {len(symbols)} 隻股票的價格資訊...\n")
+
+    if fast:
+        snapshot = load_fundamentals_snapshot()
+        fetch_one = lambda symbol: fetch_stock_quote(
+            symbol, snapshot, verbose=verbose, refresh_fundamentals=refresh_fundamentals, raise_errors=True
+        )
+    else:
+        fetch_one = lambda symbol: fetch_stock_price(symbol, verbose=verbose, raise_errors=True)
+    fetch_func = lambda symbol: fetch_with_breaker(symbol, fetch_one)
+
+    if workers > 1:
+        holdings_data = fetch_prices_concurrently(
+            symbols,
+            workers=workers,
+            timeout=timeout,
+            verbose=verbose,
+            fetch_func=fetch_func
+        )
+    else:
+        holdings_data = []
+        for i, symbol in enumerate(symbols, 1):
+            print_status(f"[{i}/{len(symbols)}] {symbol}...")
+            data = fetch_func(symbol)
+            if data:
+                holdings_data.append(data)
+                print_status("  ✓")
+            else:
+                print_status("  ✗")
+
+    if fast:
+        try:
+            with _fundamentals_lock:
+                save_fundamentals_snapshot(dict(snapshot))
+        except OSError as e:
+            print_warning(f"無法儲存基本資料快照: {e}")
+
+    if not holdings_data:
+        print_error("無法獲取任何股票數據")
+        return None
+
+    # 寫入價格資料庫
+    try:
+        save_snapshot_bars(holdings_data, price_key='current_price')
+    except ScraperError as e:
+        print_warning(f"無法寫入價格資料庫: {e}")
+
+    # 產生 Markdown 表格
+    with profile_phase('format'):
+        markdown_output = format_markdown_table(holdings_data)
+
+    # 決定輸出檔案路徑
+    filename = generate_dated_filename("holdings-prices", "md")
+    output_file = setup_output_path(
+        output_arg=output,
+        default_filename=filename,
+        default_subdir="Daily",
+        use_stdout=False
+    )
+
+    # 寫入檔案（只有更新時間不同時不重寫）
+    changed = write_output_if_changed(markdown_output, output_file, verbose=True)
+    if changed is not None and sidecar:
+        if not write_holdings_sidecar(holdings_data, output_file, sidecar, verbose=True):
+            changed = None
+
+    print_status(f"\n成功獲取 {len(holdings_data)}/{len(symbols)} 隻股票的價格資訊")
+
+    return changed
+
+
 def main():
     parser = create_argument_parser(
         description='獲取持倉股票的當天價格資訊（預設存成 output/market-data/{YEAR}/Daily/holdings-prices-YYYY-MM-DD.md）',
@@ -240,6 +841,15 @@ def main():
   # 顯示詳細資訊
   python fetch_holdings_prices.py -v
 
+  # 以 8 個執行緒並行獲取，單檔超過 20 秒視為失敗
+  python fetch_holdings_prices.py --workers 8 --timeout 20
+
+  # 盤中快速更新（不呼叫 ticker.info，每檔一個輕量請求）
+  python fetch_holdings_prices.py --fast --workers 8
+
+  # 盤中監看：每 30 秒批次輪詢一次，價格變動時才重寫報告與 JSON
+  python fetch_holdings_prices.py --watch --interval 30 --json
+
 說明:
   若未指定 -o，程式會自動產生 output/market-data/{YEAR}/Daily/holdings-prices-YYYY-MM-DD.md
         """
@@ -264,62 +874,85 @@ def main():
         help='顯示詳細資訊'
     )
 
-    args = parser.parse_args()
-
-    # 轉換為絕對路徑
-    project_root = get_project_root()
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='並行獲取的執行緒數量 (預設: 1，逐一獲取)'
+    )
 
-    holdings_file = args.input
-    if not holdings_file.startswith('/'):
-        holdings_file = str(project_root / holdings_file)
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30,
+        help='並行模式下單隻股票的逾時秒數 (預設: 30)'
+    )
 
-    if args.verbose:
-        print_status(f"專案根目錄: {project_root}")
-        print_status(f"Holdings 檔案: {holdings_file}")
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='輕量報價：只請求歷史資料，名稱/市值/本益比取自每日更新的基本資料快照'
+    )
 
-    # 提取股票代碼
-    symbols = extract_holdings_from_yaml(holdings_file)
+    parser.add_argument(
+        '--refresh-fundamentals',
+        action='store_true',
+        help='快速模式下強制更新基本資料快照（略過回應快取）'
+    )
 
-    if not symbols:
-        print_error("未找到任何股票代碼")
-        safe_exit(False)
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='盤中監看模式：持續以批次請求輪詢價格，有變動時才重寫報告'
+    )
 
-    if args.verbose:
-        print_status(f"找到的股票: {', '.join(symbols)}")
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=60,
+        help='監看模式的輪詢間隔秒數 (預設: 60)'
+    )
 
-    # 獲取每隻股票的價格
-    print_status(f"\n正在獲取 {len(symbols)} 隻股票的價格資訊...\n")
+    add_sidecar_arguments(parser)
+    add_cache_arguments(parser)
 
-    holdings_data = []
-    for i, symbol in enumerate(symbols, 1):
-        print_status(f"[{i}/{len(symbols)}] {symbol}...")
-        data = fetch_stock_price(symbol, verbose=args.verbose)
-        if data:
-            holdings_data.append(data)
-            print_status("  ✓")
-        else:
-            print_status("  ✗")
+    args = parser.parse_args()
+    configure_cache(args)
 
-    if not holdings_data:
-        print_error("無法獲取任何股票數據")
+    # 檢查參數
+    try:
+        validate_positive_int(args.workers, "執行緒數量")
+        if args.timeout <= 0:
+            raise ScraperError(f"逾時秒數必須是正數，收到: {args.timeout}")
+        if args.interval <= 0:
+            raise ScraperError(f"輪詢間隔必須是正數，收到: {args.interval}")
+    except ScraperError as e:
+        print_error(str(e))
         safe_exit(False)
 
-    # 產生 Markdown 表格
-    markdown_output = format_markdown_table(holdings_data)
-
-    # 決定輸出檔案路徑
-    filename = generate_dated_filename("holdings-prices", "md")
-    output_file = setup_output_path(
-        output_arg=args.output,
-        default_filename=filename,
-        default_subdir="Daily",
-        use_stdout=False
+    if args.watch:
+        success = watch_holdings_prices(
+            input_file=args.input,
+            output=args.output,
+            interval=args.interval,
+            sidecar=args.sidecar,
+            verbose=args.verbose,
+            refresh_fundamentals=args.refresh_fundamentals
+        )
+        safe_exit(success)
+
+    changed = fetch_holdings_prices(
+        input_file=args.input,
+        output=args.output,
+        verbose=args.verbose,
+        workers=args.workers,
+        timeout=args.timeout,
+        fast=args.fast,
+        refresh_fundamentals=args.refresh_fundamentals,
+        sidecar=args.sidecar
     )
 
-    # 寫入檔案
-    write_output(markdown_output, output_file, verbose=True)
-
-    print_status(f"\n成功獲取 {len(holdings_data)}/{len(symbols)} 隻股票的價格資訊")
+    safe_exit(changed is not None)
 
 
 if __name__ == '__main__':
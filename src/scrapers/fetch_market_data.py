@@ -6,21 +6,233 @@ Yahoo Finance 資料爬蟲工具
 
 from datetime import datetime, timedelta
 import yfinance as yf
+import numpy as np
 import pandas as pd
 
 from common import (
     create_argument_parser,
     setup_output_path,
-    write_output,
+    write_output_if_changed,
     print_status,
     print_error,
     validate_positive_int,
     safe_exit,
     ScraperError,
+    add_cache_arguments,
+    configure_cache,
+    cached_fetch,
+    get_shared_session,
 )
+from price_store import (
+    load_prices,
+    save_prices,
+    normalize_prices,
+    load_sync_state,
+    save_sync_state,
+)
+
+
+def download_history(symbol, start_date, end_date):
+    """
+    從 Yahoo Finance 下載指定區間的歷史資料（經過共用快取）
+
+    Args:
+        symbol: 股票代碼或匯率代碼
+        start_date: 起始日期（含）
+        end_date: 結束日期（不含）
+
+    Returns:
+        pd.DataFrame: 歷史資料
+    """
+    # 以日期為快取鍵，同一天內重複執行不需再次下載
+    return cached_fetch(
+        symbol, 'history',
+        lambda: yf.Ticker(symbol, session=get_shared_session()).history(start=start_date, end=end_date),
+        start=start_date.strftime('%Y-%m-%d'),
+        end=end_date.strftime('%Y-%m-%d'),
+    )
+
+
+def has_new_actions(df, after):
+    """
+    判斷下載的資料中是否有晚於指定日期的除權息或股票分割
+
+    yfinance 的價格經過調整，除權息或分割發生後，之前所有K線的價格都會改變，
+    已儲存的資料便與新下載的資料不一致。
+
+    Args:
+        df: download_history 的結果（含 Dividends / Stock Splits 欄位）
+        after: 本地資料最後一筆的日期
+
+    Returns:
+        bool: 是否有晚於 after 的除權息或分割
+    """
+    columns = [c for c in ('Dividends', 'Stock Splits') if c in df.columns]
+    if df.empty or not columns:
+        return False
+    dates = normalize_prices(df).index
+    mask = (df[columns].fillna(0) != 0).any(axis=1).to_numpy()
+    return bool((dates[mask] > pd.Timestamp(after)).any())
+
+
+def sync_history(symbol, start_date, end_date):
+    """
+    增量同步本地歷史資料，只下載最後一筆之後的交易日
+
+    最後一筆資料可能是盤中的不完整K線，因此會從最後一筆的日期
+    重新下載並以新資料覆蓋。若要求的區間早於本地資料的起點，
+    則補抓前段缺少的部分。新下載的資料中有除權息或股票分割時，
+    重新下載整個區間，讓所有K線使用相同的調整基準。
+
+    Args:
+        symbol: 股票代碼或匯率代碼
+        start_date: 起始日期（含）
+        end_date: 結束日期（不含）
+
+    Returns:
+        pd.DataFrame: 同步後、位於要求區間內的歷史資料
+    """
+    stored = load_prices(symbol)
+    meta = load_sync_state(symbol)
+    downloads = []
+    now = datetime.now()
+
+    covered_from = meta.get('covered_from')
+    covered_from = datetime.fromisoformat(covered_from) if covered_from else None
+    synced_at = meta.get('synced_at')
+    synced_at = datetime.fromisoformat(synced_at) if synced_at else None
+
+    if stored.empty or covered_from is None:
+        # 沒有本地資料：下載整個區間
+        print_status("本地沒有歷史資料，下載完整區間...")
+        downloads.append(normalize_prices(download_history(symbol, start_date, end_date)))
+        covered_from = start_date
+    else:
+        if start_date < covered_from:
+            # 補抓本地資料起點之前的部分
+            print_status(f"補抓 {start_date.strftime('%Y-%m-%d')} 到 {covered_from.strftime('%Y-%m-%d')} 的資料...")
+            downloads.append(normalize_prices(download_history(symbol, start_date, covered_from)))
+            covered_from = start_date
+
+        last_date = stored.index.max().to_pydatetime()
+        if last_date >= end_date - timedelta(days=1) and synced_at is not None and synced_at >= end_date:
+            # 本地資料已涵蓋到區間最後一天，且是在區間結束後同步的完整K線
+            pass
+        else:
+            print_status(f"增量下載 {last_date.strftime('%Y-%m-%d')} 之後的資料...")
+            downloaded = download_history(symbol, last_date, end_date)
+            if has_new_actions(downloaded, last_date):
+                print_status("偵測到除權息或股票分割，重新下載完整區間以更新調整後價格...")
+                downloaded = download_history(symbol, covered_from, max(end_date, last_date + timedelta(days=1)))
+            downloads.append(normalize_prices(downloaded))
+
+    # 重複的日期以較新下載的資料為準（覆蓋不完整的最後一筆）
+    downloads = [frame for frame in downloads if not frame.empty]
+    for frame in downloads:
+        save_prices(symbol, frame)
+
+    if downloads or not stored.empty:
+        save_sync_state(symbol, {
+            'covered_from': covered_from.strftime('%Y-%m-%d'),
+            'synced_at': now.isoformat(timespec='seconds'),
+        })
+
+    return load_prices(symbol, start_date, end_date)
+
+
+# 表格標題列
+HISTORY_TABLE_HEADER = (
+    "| Date         | Open   | High   | Low    | Close  | Adj Close | Volume     |\n"
+    "|--------------|--------|--------|--------|--------|-----------|------------|"
+)
+
+
+def format_price_column(values):
+    """
+    將整欄價格格式化為保留2位小數的字串，NaN 顯示為 —
+
+    Args:
+        values: 價格 Series
+
+    Returns:
+        pd.Series: 格式化後的字串
+    """
+    arr = values.to_numpy(dtype='float64')
+    formatted = np.char.mod('%.2f', arr)
+    return pd.Series(np.where(np.isnan(arr), '—', formatted), index=values.index)
+
+
+def format_volume_column(values):
+    """
+    將整欄交易量格式化為含千分位逗號的整數，NaN 或 0 顯示為 —
+
+    Args:
+        values: 交易量 Series
+
+    Returns:
+        pd.Series: 格式化後的字串
+    """
+    arr = values.to_numpy(dtype='float64')
+    valid = ~np.isnan(arr) & (arr > 0)
+    digits = pd.Series(np.char.mod('%d', np.where(valid, arr, 0).astype('int64')), index=values.index)
+    with_commas = digits.str.replace(r'\B(?=(\d{3})+(?!\d))', ',', regex=True)
+    return with_commas.where(valid, '—')
 
 
-def fetch_market_data(symbol, weeks=52, output_file=None, year=None):
+def iter_history_table(df, chunk_size=1000):
+    """
+    逐段產生歷史資料的 Markdown 表格（最新的在上面）
+
+    整欄一次格式化，再每 chunk_size 列產生一段文字，
+    可直接寫入檔案而不需先在記憶體中組出整份表格。
+
+    Args:
+        df: 歷史資料
+        chunk_size: 每段包含的列數
+
+    Yields:
+        str: 表格文字片段，全部串接後即為完整表格（結尾不含換行）
+    """
+    # 排序資料 (最新的在上面)
+    df = df.sort_index(ascending=False)
+
+    yield HISTORY_TABLE_HEADER
+
+    if df.empty:
+        return
+
+    dates = pd.Series(df.index.strftime('%b %d, %Y'), index=df.index)
+    close = format_price_column(df['Close'])
+
+    rows = (
+        "| " + dates.str.ljust(12)
+        + " | " + format_price_column(df['Open']).str.ljust(6)
+        + " | " + format_price_column(df['High']).str.ljust(6)
+        + " | " + format_price_column(df['Low']).str.ljust(6)
+        + " | " + close.str.ljust(6)
+        + " | " + close.str.ljust(9)
+        + " | " + format_volume_column(df['Volume']).str.ljust(10)
+        + " |"
+    ).tolist()
+
+    for start in range(0, len(rows), chunk_size):
+        yield '\n' + '\n'.join(rows[start:start + chunk_size])
+
+
+def format_history_table(df):
+    """
+    將歷史資料格式化為 Markdown 表格（最新的在上面）
+
+    Args:
+        df: 歷史資料
+
+    Returns:
+        str: Markdown 表格
+    """
+    return ''.join(iter_history_table(df))
+
+
+def fetch_market_data(symbol, weeks=52, output_file=None, year=None, incremental=False):
     """
     爬取市場資料
 
@@ -29,6 +241,10 @@ def fetch_market_data(symbol, weeks=52, output_file=None, year=None):
         weeks: 要爬取的週數，預設52週（若指定 year 則忽略）
         output_file: 輸出檔案路徑，如果為 None 則輸出到 stdout
         year: 只輸出指定年份的資料
+        incremental: 是否使用本地歷史資料增量同步
+
+    Returns:
+        Optional[bool]: True 表示已寫入（內容有變動），False 表示內容未變動，None 表示失敗
     """
     # 計算日期範圍
     if year:
@@ -43,52 +259,38 @@ def fetch_market_data(symbol, weeks=52, output_file=None, year=None):
     print_status(f"正在爬取 {symbol} 資料...")
     print_status(f"日期範圍: {start_date.strftime('%Y-%m-%d')} 到 {display_end_date.strftime('%Y-%m-%d')}")
 
-    # 使用 yfinance 爬取資料
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(start=start_date, end=end_date)
+    if incremental:
+        # 以日為單位同步，避免同一天的時間差造成重複下載
+        day_start = datetime(start_date.year, start_date.month, start_date.day)
+        day_end = datetime(end_date.year, end_date.month, end_date.day)
+        if day_end < end_date:
+            day_end += timedelta(days=1)
+        df = sync_history(symbol, day_start, day_end)
+    else:
+        # 寫入價格資料庫後再由資料庫產生表格
+        downloaded = download_history(symbol, start_date, end_date)
+        if downloaded.empty:
+            df = downloaded
+        else:
+            save_prices(symbol, downloaded)
+            df = load_prices(symbol, normalize_prices(downloaded).index.min(), end_date)
 
     if df.empty:
         print_error("無法取得資料")
-        return False
+        return None
 
     if year:
         df = df[df.index.year == year]
         if df.empty:
             print_error(f"找不到 {year} 年的資料")
-            return False
-
-    # 排序資料 (最新的在上面)
-    df = df.sort_index(ascending=False)
-
-    # 格式化數據
-    output_lines = []
-    output_lines.append("| Date         | Open   | High   | Low    | Close  | Adj Close | Volume     |")
-    output_lines.append("|--------------|--------|--------|--------|--------|-----------|------------|")
-
-    for date, row in df.iterrows():
-        date_str = date.strftime('%b %d, %Y')
+            return None
 
-        # 格式化數字 - 保留2位小數
-        open_val = f"{row['Open']:.2f}" if pd.notna(row['Open']) else "—"
-        high_val = f"{row['High']:.2f}" if pd.notna(row['High']) else "—"
-        low_val = f"{row['Low']:.2f}" if pd.notna(row['Low']) else "—"
-        close_val = f"{row['Close']:.2f}" if pd.notna(row['Close']) else "—"
-        adj_close_val = f"{row['Close']:.2f}" if pd.notna(row['Close']) else "—"
-
-        # 格式化交易量 - 加入千分位逗號
-        volume_val = f"{int(row['Volume']):,}" if pd.notna(row['Volume']) and row['Volume'] > 0 else "—"
-
-        line = f"| {date_str:12} | {open_val:6} | {high_val:6} | {low_val:6} | {close_val:6} | {adj_close_val:9} | {volume_val:10} |"
-        output_lines.append(line)
-
-    # 輸出結果
-    result = '\n'.join(output_lines)
-
-    success = write_output(result, output_file, verbose=True)
-    if success:
+    # 輸出結果（逐段寫入，內容未變動時不重寫）
+    changed = write_output_if_changed(iter_history_table(df), output_file, verbose=True)
+    if changed is not None:
         print_status(f"總共爬取了 {len(df)} 筆資料")
 
-    return success
+    return changed
 
 
 def main():
@@ -111,6 +313,9 @@ def main():
   # 只輸出 UPS 於 2024 年的資料
   python fetch_market_data.py UPS -y 2024 -o data/market-data/2024/Stocks/UPS-2024.md
 
+  # 增量同步：只下載本地歷史資料最後一筆之後的交易日
+  python fetch_market_data.py UPS -i
+
 常用代碼:
   股票: AAPL (Apple), TSLA (Tesla), MSFT (Microsoft), UPS, GOOGL
   匯率: JPY=X (USD/JPY), EUR=X (USD/EUR), GBP=X (USD/GBP)
@@ -154,7 +359,16 @@ def main():
         help='強制輸出到螢幕（不自動儲存檔案）'
     )
 
+    parser.add_argument(
+        '-i', '--incremental',
+        action='store_true',
+        help='使用本地價格資料庫（market-data/{YEAR}/Prices/）增量同步，只下載最後一筆之後的交易日'
+    )
+
+    add_cache_arguments(parser)
+
     args = parser.parse_args()
+    configure_cache(args)
 
     # 檢查參數
     try:
@@ -180,14 +394,15 @@ def main():
     )
 
     # 執行爬蟲
-    success = fetch_market_data(
+    changed = fetch_market_data(
         symbol=args.symbol,
         weeks=args.weeks,
         output_file=output_file,
-        year=args.year
+        year=args.year,
+        incremental=args.incremental
     )
 
-    safe_exit(success)
+    safe_exit(changed is not None)
 
 
 if __name__ == '__main__':
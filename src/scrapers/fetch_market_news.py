@@ -2,6 +2,10 @@
 """
 Yahoo Finance 金融新聞爬蟲工具
 從 Yahoo Finance 爬取特定股票的最新金融新聞
+
+取得的新聞先存入新聞資料庫（news_store.py，同一篇文章只存一份），
+輸出的 Markdown / JSON 由資料庫的索引產生，並同時更新當天所有代碼的
+新聞彙整（Daily/news-digest-YYYY-MM-DD.md，每篇文章只列一次）。
 """
 
 from datetime import datetime
@@ -11,14 +15,23 @@ import json
 from common import (
     create_argument_parser,
     setup_output_path,
-    write_output,
+    write_output_if_changed,
     print_status,
     print_error,
+    print_warning,
+    get_data_directory,
     validate_positive_int,
     safe_exit,
     generate_dated_filename,
     ScraperError,
+    add_cache_arguments,
+    configure_cache,
+    cached_fetch,
+    get_shared_session,
+    profile_phase,
 )
+from news_dedup import NEAR_DUPLICATE_THRESHOLD, collapse_near_duplicates
+from news_store import get_news_store, normalize_article
 
 
 def format_datetime(date_str):
@@ -38,7 +51,229 @@ def format_datetime(date_str):
         return date_str
 
 
-def fetch_market_news(symbol, limit=10, output_file=None, json_output=False, auto_filename=False):
+def get_news(symbol, limit=10, session=None):
+    """
+    從 Yahoo Finance 取得股票相關新聞
+
+    Args:
+        symbol: 股票代碼 (例如: AAPL, TSLA, NVDA)
+        limit: 最多取得的新聞數量
+        session: HTTP session，None 表示使用 get_shared_session()
+
+    Returns:
+        list: 新聞列表（可能為空）
+    """
+    if session is None:
+        session = get_shared_session()
+
+    news = cached_fetch(
+        symbol, 'news',
+        lambda: yf.Ticker(symbol, session=session).news or [],
+    )
+    return (news or [])[:limit]
+
+
+def format_article_lines(index, record, symbols=None):
+    """
+    將單篇文章格式化為 Markdown 區塊
+
+    Args:
+        index: 文章編號（從 1 開始）
+        record: 正規化後的文章
+        symbols: 相關代碼列表，None 表示不顯示
+
+    record 含 'also_covered_by'（collapse_near_duplicates 的結果）時列出相似報導。
+
+    Returns:
+        list: Markdown 行
+    """
+    title = record.get('title') or 'N/A'
+    summary = record.get('summary') or 'N/A'
+    pub_date = record.get('published_at') or 'N/A'
+    provider = record.get('publisher') or 'N/A'
+    url = record.get('url') or '#'
+    content_type = record.get('content_type') or 'ARTICLE'
+
+    # 格式化日期
+    formatted_date = format_datetime(pub_date) if pub_date != 'N/A' else 'N/A'
+
+    # 新聞類型圖示
+    type_icon = "🎥" if content_type == "VIDEO" else "📰"
+
+    # 組合輸出
+    lines = [f"## {index}. {type_icon} {title}\n"]
+    if symbols:
+        lines.append(f"**相關代碼**: {', '.join(symbols)}  ")
+    lines.append(f"**來源**: {provider}  ")
+    lines.append(f"**發布時間**: {formatted_date}  ")
+    also_covered = record.get('also_covered_by')
+    if also_covered:
+        lines.append(f"**連結**: [{url}]({url})  ")
+        sources = [f"{other.get('publisher') or 'N/A'}「{other.get('title') or 'N/A'}」" for other in also_covered]
+        lines.append(f"**同時報導**: {'、'.join(sources)}\n")
+    else:
+        lines.append(f"**連結**: [{url}]({url})\n")
+    lines.append(f"**摘要**:  ")
+    lines.append(f"{summary}\n")
+    lines.append("---\n")
+    return lines
+
+
+def format_news(symbol, news, json_output=False):
+    """
+    將新聞列表格式化為 Markdown 或 JSON
+
+    Args:
+        symbol: 股票代碼
+        news: get_news 取得的新聞列表，或新聞資料庫中正規化後的文章
+        json_output: 是否輸出為 JSON 格式
+
+    Returns:
+        str: 格式化後的內容
+    """
+    records = [normalize_article(article) for article in news]
+
+    if json_output:
+        # JSON 格式輸出
+        return json.dumps(records, indent=2, ensure_ascii=False)
+
+    # Markdown 格式輸出
+    output_lines = []
+    output_lines.append(f"# {symbol} 最新金融新聞\n")
+    output_lines.append(f"**更新時間**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    output_lines.append(f"**新聞數量**: {len(records)} 則\n")
+    output_lines.append("---\n")
+
+    for i, record in enumerate(records, 1):
+        output_lines.extend(format_article_lines(i, record))
+
+    return '\n'.join(output_lines)
+
+
+def store_news(symbol, news, day=None, incremental=False):
+    """
+    將新聞存入新聞資料庫，並由索引取回該代碼當天的新聞
+
+    資料庫無法使用時直接使用取得的新聞（全部視為新的），不影響輸出。
+
+    Args:
+        symbol: 股票代碼
+        news: get_news 取得的新聞列表
+        day: 日期 YYYY-MM-DD，None 表示今天
+        incremental: 是否只加入比該代碼 watermark 新的文章（保留當天已收錄的文章）
+
+    Returns:
+        tuple: (正規化後的文章, 新加入的文章數)
+    """
+    try:
+        store = get_news_store()
+        added = store.add(symbol, news, day, incremental=incremental)
+        return store.articles_for(symbol, day), len(added)
+    except ScraperError as e:
+        print_warning(f"{symbol}: {e}")
+        return [normalize_article(article) for article in news], len(news)
+
+
+def format_news_digest(articles, day, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    將當天所有代碼的新聞格式化為彙整 Markdown，每篇文章只列一次
+
+    不同標題的相似報導（例如同一篇通訊社稿件）合併為一篇，其餘列為「同時報導」。
+
+    Args:
+        articles: NewsStore.day_articles 的結果（含 'symbols'）
+        day: 日期 YYYY-MM-DD
+        threshold: 相似報導的 Jaccard 相似度門檻，None 表示不合併
+
+    Returns:
+        str: Markdown 內容
+    """
+    symbols = {symbol for article in articles for symbol in article['symbols']}
+    mentions = sum(len(article['symbols']) for article in articles)
+    unique_count = len(articles)
+    if threshold is not None:
+        articles = collapse_near_duplicates(articles, threshold)
+    merged = unique_count - len(articles)
+
+    output_lines = []
+    output_lines.append(f"# 市場新聞彙整 - {day}\n")
+    output_lines.append(f"**更新時間**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    output_lines.append(
+        f"**新聞數量**: {len(articles)} 則（{len(symbols)} 個代碼共 {mentions} 則，重複的文章只列一次"
+        + (f"，合併 {merged} 則相似報導" if merged else "") + "）\n"
+    )
+    output_lines.append("---\n")
+
+    for i, article in enumerate(articles, 1):
+        output_lines.extend(format_article_lines(i, article, article['symbols']))
+
+    return '\n'.join(output_lines)
+
+
+def get_news_digest_path(day=None):
+    """
+    取得新聞彙整的輸出路徑
+
+    Args:
+        day: 日期 YYYY-MM-DD，None 表示今天
+
+    Returns:
+        Path: market-data/{YEAR}/Daily/news-digest-YYYY-MM-DD.md
+    """
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    return get_data_directory(int(day[:4]), "Daily") / f"news-digest-{day}.md"
+
+
+def write_news_digest(day=None, verbose=False):
+    """
+    由新聞資料庫產生當天的新聞彙整
+
+    Args:
+        day: 日期 YYYY-MM-DD，None 表示今天
+        verbose: 是否顯示詳細資訊
+
+    Returns:
+        bool: 是否成功（當天沒有新聞也視為成功）
+    """
+    try:
+        articles = get_news_store().day_articles(day)
+    except ScraperError as e:
+        print_warning(f"無法產生新聞彙整: {e}")
+        return False
+
+    if not articles:
+        return True
+
+    with profile_phase('format'):
+        content = format_news_digest(articles, day or datetime.now().strftime('%Y-%m-%d'))
+    return write_output_if_changed(content, get_news_digest_path(day), verbose=verbose) is not None
+
+
+def get_news_output_path(symbol, json_output=False, news_dir=None):
+    """
+    產生自動命名的新聞輸出路徑（格式：SYMBOL-YYYY-MM-DD.md 或 .json）
+
+    Args:
+        symbol: 股票代碼
+        json_output: 是否為 JSON 格式
+        news_dir: 新聞目錄，None 表示使用當年的 News 目錄
+
+    Returns:
+        Path: 輸出路徑
+    """
+    extension = 'json' if json_output else 'md'
+    filename = generate_dated_filename(symbol, extension)
+    if news_dir is not None:
+        return news_dir / filename
+    return setup_output_path(
+        output_arg=filename,
+        default_filename=filename,
+        default_subdir="News",
+        use_stdout=False
+    )
+
+
+def fetch_market_news(symbol, limit=10, output_file=None, json_output=False, auto_filename=False, incremental=False):
     """
     爬取股票相關新聞
 
@@ -47,94 +282,57 @@ def fetch_market_news(symbol, limit=10, output_file=None, json_output=False, aut
         limit: 要顯示的新聞數量，預設10則
         output_file: 輸出檔案路徑，如果為 None 則根據 auto_filename 決定
         json_output: 是否輸出為 JSON 格式，預設 False (Markdown 格式)
-        auto_filename: 是否自動產生檔名（格式：SYMBOL-YYYY-MM-DD.md）
+        auto_filename: 是否自動產生檔名（格式：SYMBOL-YYYY-MM-DD.md），
+                       只有此模式會存入新聞資料庫並更新新聞彙整
+        incremental: 增量模式，只加入新的文章，沒有新文章時不輸出（需搭配 auto_filename）
+
+    Returns:
+        Optional[bool]: True 表示已寫入（內容有變動），False 表示內容未變動，None 表示失敗
     """
     print_status(f"正在爬取 {symbol} 的最新新聞...")
 
     # 使用 yfinance 爬取新聞
-    ticker = yf.Ticker(symbol)
-    news = ticker.news
+    news = get_news(symbol, limit)
 
     if not news:
         print_error("無法取得新聞資料")
-        return False
-
-    # 限制新聞數量
-    news = news[:limit]
+        return None
 
     print_status(f"找到 {len(news)} 則新聞")
 
-    # 格式化輸出
-    if json_output:
-        # JSON 格式輸出
-        output_data = []
-        for article in news:
-            content = article.get('content', {})
-            output_data.append({
-                'id': content.get('id'),
-                'title': content.get('title'),
-                'summary': content.get('summary'),
-                'publisher': content.get('provider', {}).get('displayName'),
-                'published_at': content.get('pubDate'),
-                'url': content.get('canonicalUrl', {}).get('url'),
-                'content_type': content.get('contentType')
-            })
-
-        result = json.dumps(output_data, indent=2, ensure_ascii=False)
+    # 只有寫入預設的日期檔時才存入新聞資料庫並更新彙整；
+    # --stdout 與 -o 只輸出這次取得的新聞，不影響當天的紀錄
+    persist = auto_filename and not output_file
+    if persist:
+        # 輸出由資料庫的索引產生
+        records, new_count = store_news(symbol, news, incremental=incremental)
+        if incremental:
+            if not new_count:
+                print_status("沒有新的新聞，略過輸出")
+                return False
+            print_status(f"新增 {new_count} 則新聞（今日共 {len(records)} 則）")
     else:
-        # Markdown 格式輸出
-        output_lines = []
-        output_lines.append(f"# {symbol} 最新金融新聞\n")
-        output_lines.append(f"**更新時間**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output_lines.append(f"**新聞數量**: {len(news)} 則\n")
-        output_lines.append("---\n")
-
-        for i, article in enumerate(news, 1):
-            content = article.get('content', {})
-
-            # 提取資訊
-            title = content.get('title', 'N/A')
-            summary = content.get('summary', 'N/A')
-            pub_date = content.get('pubDate', 'N/A')
-            provider = content.get('provider', {}).get('displayName', 'N/A')
-            url = content.get('canonicalUrl', {}).get('url', '#')
-            content_type = content.get('contentType', 'ARTICLE')
-
-            # 格式化日期
-            formatted_date = format_datetime(pub_date) if pub_date != 'N/A' else 'N/A'
-
-            # 新聞類型圖示
-            type_icon = "🎥" if content_type == "VIDEO" else "📰"
-
-            # 組合輸出
-            output_lines.append(f"## {i}. {type_icon} {title}\n")
-            output_lines.append(f"**來源**: {provider}  ")
-            output_lines.append(f"**發布時間**: {formatted_date}  ")
-            output_lines.append(f"**連結**: [{url}]({url})\n")
-            output_lines.append(f"**摘要**:  ")
-            output_lines.append(f"{summary}\n")
-            output_lines.append("---\n")
-
-        result = '\n'.join(output_lines)
+        if incremental:
+            print_warning("增量模式只適用於預設的日期檔，已忽略")
+        records = news
+
+    # 格式化輸出
+    with profile_phase('format'):
+        result = format_news(symbol, records, json_output)
 
     # 決定輸出檔案路徑
     if output_file:
         final_output = output_file
     elif auto_filename:
-        # 自動產生檔名（格式：SYMBOL-YYYY-MM-DD.md 或 .json）
-        extension = 'json' if json_output else 'md'
-        filename = generate_dated_filename(symbol, extension)
-        final_output = setup_output_path(
-            output_arg=filename,
-            default_filename=filename,
-            default_subdir="News",
-            use_stdout=False
-        )
+        final_output = get_news_output_path(symbol, json_output)
     else:
         final_output = None
 
     # 輸出結果
-    return write_output(result, final_output, verbose=True)
+    changed = write_output_if_changed(result, final_output, verbose=True)
+    if changed is not None and persist and not write_news_digest(verbose=True):
+        return None
+    return changed
 
 
 def main():
@@ -148,6 +346,9 @@ def main():
   # 爬取 Tesla 的最新5則新聞並儲存為 Markdown
   python fetch_market_news.py TSLA -l 5
 
+  # 增量模式：只加入新文章，沒有新文章時不重寫檔案
+  python fetch_market_news.py AAPL -i
+
   # 指定輸出檔案
   python fetch_market_news.py NVDA -o data/market-data/2025/News/NVDA-2025-11-18.md
 
@@ -193,7 +394,16 @@ def main():
         help='輸出到螢幕而非檔案'
     )
 
+    parser.add_argument(
+        '-i', '--incremental',
+        action='store_true',
+        help='增量模式：只加入上次之後的新文章（累積到當天的紀錄），沒有新文章時不重寫檔案'
+    )
+
+    add_cache_arguments(parser)
+
     args = parser.parse_args()
+    configure_cache(args)
 
     # 檢查參數
     try:
@@ -207,15 +417,16 @@ def main():
     auto_filename = not args.output and not args.stdout
 
     # 執行爬蟲
-    success = fetch_market_news(
+    changed = fetch_market_news(
         symbol=args.symbol,
         limit=args.limit,
         output_file=args.output,
         json_output=args.json,
-        auto_filename=auto_filename
+        auto_filename=auto_filename,
+        incremental=args.incremental
     )
 
-    safe_exit(success)
+    safe_exit(changed is not None)
 
 
 if __name__ == '__main__':
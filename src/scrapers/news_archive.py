@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+新聞封存（每月壓縮 JSONL 分片）
+
+逐代碼、逐日的新聞檔（{YEAR}/News/SYMBOL-YYYY-MM-DD.md 或 .json）會無限
+累積。本模組將已結束的日期壓縮到每月一個 JSONL 分片：
+
+    market-data/News/archive/{YEAR}/news-YYYY-MM.N.jsonl.gz（安裝 zstandard 時為 .jsonl.zst）
+    market-data/News/archive/{YEAR}/news-YYYY-MM.index.json
+
+分片依（代碼, 日期）排序，每組各自壓縮為獨立的 gzip member / zstd frame；
+索引記錄每組的位元組位移、長度與文章數。同一代碼的日期在分片中相鄰，
+讀取任一代碼的任一日期區間只需一次 seek 與一次解壓縮。
+
+分片檔名帶有世代編號 N，由索引指定。重寫時先寫入新世代的分片，
+最後才以改名取代索引，中途中斷時舊的索引仍指向完整的舊分片。
+"""
+
+import gzip
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_market_data_root,
+    print_error,
+    print_status,
+    print_success,
+    print_warning,
+    safe_exit,
+    write_output,
+)
+from news_index import find_news_files, news_file_key, parse_news_file
+
+
+# 分片索引的 schema 名稱與版本
+ARCHIVE_SCHEMA = 'news-archive-index'
+ARCHIVE_SCHEMA_VERSION = 1
+
+# 壓縮格式 → 副檔名
+ARCHIVE_CODECS = {
+    'zstd': '.jsonl.zst',
+    'gzip': '.jsonl.gz',
+}
+
+
+def get_archive_directory(root: Optional[Path] = None) -> Path:
+    """取得新聞封存目錄（market-data/News/archive）"""
+    return (root or get_market_data_root()) / "News" / "archive"
+
+
+def default_codec() -> str:
+    """預設壓縮格式：安裝 zstandard 時使用 zstd，否則使用 gzip"""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return 'gzip'
+    return 'zstd'
+
+
+def compress_block(data: bytes, codec: str) -> bytes:
+    """將一組記錄壓縮為獨立的 gzip member 或 zstd frame"""
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress_blocks(data: bytes, codec: str) -> bytes:
+    """解壓縮一段連續的 gzip member 或 zstd frame"""
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ScraperError("需要安裝 zstandard 套件才能讀取 .zst 分片。請執行 `pip install zstandard` 後再試一次。")
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return reader.read()
+    return gzip.decompress(data)
+
+
+class ArchiveShard:
+    """
+    單月的新聞分片與其索引
+
+    index['symbols'] 為 代碼 → 日期 → [位移, 長度, 文章數]，
+    index['shard'] 為目前世代的分片檔名。
+    """
+
+    def __init__(self, directory: Path, month: str, codec: Optional[str] = None):
+        self.directory = directory
+        self.month = month
+        self.index_path = directory / f"news-{month}.index.json"
+        self.index = self._load_index()
+        self.codec = self.index['codec'] if self.index else (codec or default_codec())
+        self.generation = self.index['generation'] if self.index else 0
+        self.path = directory / self.index['shard'] if self.index else self._shard_path(self.generation)
+
+    def _shard_path(self, generation: int) -> Path:
+        return self.directory / f"news-{self.month}.{generation}{ARCHIVE_CODECS[self.codec]}"
+
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        if not self.index_path.is_file():
+            return None
+        try:
+            index = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise ScraperError(f"無法讀取分片索引 {self.index_path.name}: {e}")
+        if index.get('schema') != ARCHIVE_SCHEMA or index.get('version') != ARCHIVE_SCHEMA_VERSION:
+            raise ScraperError(f"不支援的分片索引: {self.index_path.name}")
+        return index
+
+    @property
+    def symbols(self) -> Dict[str, Dict[str, List[int]]]:
+        return self.index['symbols'] if self.index else {}
+
+    def read(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        讀取代碼在日期區間內的記錄（一次 seek、一次解壓縮）
+
+        Args:
+            symbol: 代碼
+            start: 起始日期 YYYY-MM-DD（含），None 表示不限制
+            end: 結束日期 YYYY-MM-DD（含），None 表示不限制
+
+        Returns:
+            List[Dict[str, Any]]: 依日期排序的記錄（含 'symbol' 與 'day'）
+        """
+        days = sorted(
+            day for day in self.symbols.get(symbol, {})
+            if (start is None or day >= start) and (end is None or day <= end)
+        )
+        if not days:
+            return []
+
+        entries = self.symbols[symbol]
+        offset = entries[days[0]][0]
+        last_offset, last_length, _ = entries[days[-1]]
+        try:
+            if self.path.stat().st_size != self.index['size']:
+                raise ScraperError(f"分片與索引不一致: {self.path.name}")
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(last_offset + last_length - offset)
+            text = decompress_blocks(data, self.codec).decode('utf-8')
+        except (OSError, EOFError, ValueError) as e:
+            raise ScraperError(f"無法讀取分片 {self.path.name}: {e}")
+
+        return [json.loads(line) for line in text.splitlines() if line]
+
+    def groups(self) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """讀取整個分片，依（代碼, 日期）分組"""
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for symbol in self.symbols:
+            for record in self.read(symbol):
+                groups.setdefault((symbol, record['day']), []).append(record)
+        return groups
+
+    def write(self, groups: Dict[Tuple[str, str], List[Dict[str, Any]]]) -> None:
+        """
+        重寫分片與索引
+
+        新內容寫入下一個世代的分片檔，寫入完成並同步到磁碟後才以改名
+        取代索引，最後刪除舊世代的分片。任何一步中斷時，索引仍指向
+        完整的舊分片（或尚未存在）。
+
+        Args:
+            groups: （代碼, 日期）→ 文章
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        generation = self.generation + 1
+        path = self._shard_path(generation)
+        symbols: Dict[str, Dict[str, List[int]]] = {}
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        offset = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for symbol, day in sorted(groups):
+                    articles = groups[(symbol, day)]
+                    lines = ''.join(
+                        json.dumps(dict(article, symbol=symbol, day=day), ensure_ascii=False) + '\n'
+                        for article in articles
+                    )
+                    block = compress_block(lines.encode('utf-8'), self.codec)
+                    f.write(block)
+                    symbols.setdefault(symbol, {})[day] = [offset, len(block), len(articles)]
+                    offset += len(block)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise ScraperError(f"無法寫入分片 {path.name}: {e}")
+
+        index = {
+            'schema': ARCHIVE_SCHEMA,
+            'version': ARCHIVE_SCHEMA_VERSION,
+            'month': self.month,
+            'codec': self.codec,
+            'generation': generation,
+            'shard': path.name,
+            'size': offset,
+            'symbols': symbols,
+        }
+        # 索引最後寫入：改名成功後讀取端才會看到新世代的分片
+        if not write_output(json.dumps(index, ensure_ascii=False, indent=2), self.index_path):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            raise ScraperError(f"無法寫入分片索引 {self.index_path.name}")
+
+        old_path = self.path
+        self.index, self.generation, self.path = index, generation, path
+        if old_path != path:
+            try:
+                old_path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print_warning(f"無法刪除舊分片 {old_path.name}: {e}")
+
+
+def find_archive_shards(root: Optional[Path] = None) -> List[Path]:
+    """列出所有分片索引（依月份排序）"""
+    return sorted(get_archive_directory(root).glob("*/news-*.index.json"))
+
+
+def _shard_for(month: str, root: Optional[Path] = None, codec: Optional[str] = None) -> ArchiveShard:
+    return ArchiveShard(get_archive_directory(root) / month[:4], month, codec)
+
+
+def _months(start: Optional[str], end: Optional[str], root: Optional[Path]) -> List[str]:
+    """區間內有分片的月份"""
+    months = [path.name[len("news-"):-len(".index.json")] for path in find_archive_shards(root)]
+    return [
+        month for month in months
+        if (start is None or month >= start[:7]) and (end is None or month <= end[:7])
+    ]
+
+
+def compact_news(
+    before: Optional[str] = None,
+    root: Optional[Path] = None,
+    keep_files: bool = False,
+    codec: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    將已結束日期的新聞檔壓縮到每月分片
+
+    同一代碼同一天已在分片中時以新聞檔的內容取代；同時有 .md 與 .json 時
+    使用 .json（含 Yahoo 的文章 id）。分片與索引寫入成功後才刪除新聞檔。
+
+    Args:
+        before: 只封存早於此日期（YYYY-MM-DD）的新聞檔，None 表示今天
+        root: market-data 目錄，None 表示使用預設目錄
+        keep_files: 是否保留已封存的新聞檔
+        codec: 新分片的壓縮格式（'zstd' 或 'gzip'），None 表示 default_codec()；
+               既有分片沿用原本的格式
+
+    Returns:
+        Dict[str, int]: {'files', 'months', 'articles', 'failed'}
+
+    Raises:
+        ScraperError: 分片無法讀寫
+    """
+    before = before or datetime.now().strftime('%Y-%m-%d')
+    stats = {'files': 0, 'months': 0, 'articles': 0, 'failed': 0}
+
+    by_month: Dict[str, List[Tuple[str, str, Path]]] = {}
+    for path in find_news_files(root):
+        symbol, day = news_file_key(path)
+        if day < before:
+            by_month.setdefault(day[:7], []).append((symbol, day, path))
+
+    for month, files in sorted(by_month.items()):
+        shard = _shard_for(month, root, codec)
+        groups = shard.groups()
+        archived = []
+        # .json 排在 .md 之後，同一代碼同一天以 .json 為準
+        for symbol, day, path in sorted(files, key=lambda item: (item[0], item[1], item[2].suffix == '.json')):
+            try:
+                _, _, articles = parse_news_file(path)
+            except (ScraperError, OSError, UnicodeDecodeError) as e:
+                print_warning(f"無法封存 {path.name}: {e}")
+                stats['failed'] += 1
+                continue
+            groups[(symbol, day)] = [
+                {key: value for key, value in article.items() if key not in ('symbol', 'day')}
+                for article in articles
+            ]
+            archived.append(path)
+
+        if not archived:
+            continue
+        shard.write(groups)
+        stats['months'] += 1
+        stats['files'] += len(archived)
+        stats['articles'] += sum(len(articles) for articles in groups.values())
+
+        if not keep_files:
+            for path in archived:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    print_warning(f"無法刪除 {path.name}: {e}")
+    return stats
+
+
+def read_news_archive(
+    symbols: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """
+    讀取封存的新聞
+
+    每個分片中每個代碼只需一次 seek 與一次解壓縮。
+
+    Args:
+        symbols: 代碼，None 表示所有代碼
+        start: 起始日期 YYYY-MM-DD（含），None 表示不限制
+        end: 結束日期 YYYY-MM-DD（含），None 表示不限制
+        root: market-data 目錄，None 表示使用預設目錄
+
+    Returns:
+        List[Dict[str, Any]]: 依（代碼, 日期）排序的文章，含 'symbol' 與 'day'
+
+    Raises:
+        ScraperError: 分片無法讀取
+    """
+    records = []
+    for month in _months(start, end, root):
+        shard = _shard_for(month, root)
+        for symbol in symbols if symbols is not None else sorted(shard.symbols):
+            records.extend(shard.read(symbol, start, end))
+    return sorted(records, key=lambda record: (record['symbol'], record['day']))
+
+
+def format_archive_markdown(records: List[Dict[str, Any]]) -> str:
+    """
+    將封存的新聞格式化為 Markdown（每個代碼、每天一節）
+
+    Args:
+        records: read_news_archive 的結果
+
+    Returns:
+        str: Markdown 內容
+    """
+    from fetch_market_news import format_article_lines
+
+    output_lines = []
+    current = None
+    index = 0
+    for record in records:
+        if (record['symbol'], record['day']) != current:
+            current = (record['symbol'], record['day'])
+            index = 0
+            output_lines.append(f"# {record['symbol']} 新聞 - {record['day']}\n")
+        index += 1
+        output_lines.extend(format_article_lines(index, record))
+    return '\n'.join(output_lines)
+
+
+def main():
+    parser = create_argument_parser(
+        description='將已結束日期的新聞檔壓縮為每月 JSONL 分片，並依代碼與日期讀取',
+        epilog="""
+使用範例:
+  # 封存今天以前的新聞檔（寫入分片後刪除原檔）
+  python news_archive.py --compact
+
+  # 封存上個月以前的新聞並保留原檔
+  python news_archive.py --compact --before 2025-11-01 --keep-files
+
+  # 讀取 INTC 本季的封存新聞
+  python news_archive.py -s INTC --start 2025-10-01 --end 2025-12-31
+
+  # 以 JSON 輸出多個代碼
+  python news_archive.py -s INTC -s TSM --start 2025-10-01 --format json
+        """
+    )
+
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='封存已結束日期的新聞檔'
+    )
+    parser.add_argument('--before', type=str, help='只封存早於此日期的新聞檔 YYYY-MM-DD (預設: 今天)')
+    parser.add_argument(
+        '--keep-files',
+        action='store_true',
+        help='封存後保留原本的新聞檔'
+    )
+    parser.add_argument(
+        '--codec',
+        choices=sorted(ARCHIVE_CODECS),
+        help='新分片的壓縮格式 (預設: 安裝 zstandard 時為 zstd，否則為 gzip)'
+    )
+    parser.add_argument(
+        '-s', '--symbol',
+        action='append',
+        help='讀取這個代碼的封存新聞（可重複指定，未指定時為所有代碼）'
+    )
+    parser.add_argument('--start', type=str, help='起始日期 YYYY-MM-DD（含）')
+    parser.add_argument('--end', type=str, help='結束日期 YYYY-MM-DD（含）')
+    parser.add_argument(
+        '--format',
+        choices=['markdown', 'json'],
+        default='markdown',
+        help='讀取時的輸出格式 (預設: markdown)'
+    )
+
+    args = parser.parse_args()
+
+    if args.codec == 'zstd' and default_codec() != 'zstd':
+        print_error("需要安裝 zstandard 套件才能使用 zstd。請執行 `pip install zstandard` 後再試一次。")
+        safe_exit(False)
+
+    try:
+        if args.compact:
+            stats = compact_news(before=args.before, keep_files=args.keep_files, codec=args.codec)
+            print_success(
+                f"已封存 {stats['files']} 個新聞檔到 {stats['months']} 個分片"
+                f"（分片共 {stats['articles']} 則，失敗 {stats['failed']}）"
+            )
+            safe_exit(stats['failed'] == 0)
+
+        if not (args.symbol or args.start or args.end):
+            parser.error("請指定 --compact，或以 -s / --start / --end 讀取封存的新聞")
+
+        started = datetime.now()
+        records = read_news_archive(args.symbol, args.start, args.end)
+        elapsed = (datetime.now() - started).total_seconds() * 1000
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    if args.format == 'json':
+        print(json.dumps(records, ensure_ascii=False, indent=2))
+    else:
+        print(format_archive_markdown(records))
+    print_status(f"{len(records)} 則新聞（{elapsed:.1f} ms）")
+    safe_exit(True)
+
+
+if __name__ == '__main__':
+    main()
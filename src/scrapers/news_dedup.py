@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+相似新聞合併（MinHash + LSH）
+
+同一篇通訊社稿件常以不同標題、不同文章 id 出現在多個代碼下，新聞資料庫
+以 id 去除重複後仍會重複。本模組以詞語 shingle 的 MinHash 簽章與 LSH
+分桶找出候選配對，再以實際的 Jaccard 相似度確認，將當天所有代碼的相似
+報導分群；每群只保留一篇代表文章，其餘列為「同時報導」，縮短分析提示詞。
+
+也可在沒有新聞彙整時，由當天的逐代碼新聞檔產生彙整：
+    python news_dedup.py --day 2025-11-20
+"""
+
+import hashlib
+import random
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_market_data_root,
+    print_error,
+    print_status,
+    print_warning,
+    safe_exit,
+    write_output,
+)
+
+
+# 相似度門檻：shingle 集合的 Jaccard 相似度不低於此值視為同一則報導
+NEAR_DUPLICATE_THRESHOLD = 0.5
+
+# shingle 的詞數
+SHINGLE_SIZE = 3
+
+# MinHash 簽章長度與 LSH 分段（16 段 × 4 列，候選門檻約為 (1/16)^(1/4) ≈ 0.5）
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20251120)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> FrozenSet[int]:
+    """
+    將文字轉為詞語 shingle 的雜湊集合
+
+    Args:
+        text: 標題與摘要
+        size: 每個 shingle 的詞數（詞數不足時以整段文字為一個 shingle）
+
+    Returns:
+        FrozenSet[int]: 32 位元雜湊值
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return frozenset()
+    grams = [' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=4).digest(), 'big')
+        for gram in grams
+    )
+
+
+def minhash(values: FrozenSet[int]) -> Tuple[int, ...]:
+    """
+    計算 MinHash 簽章
+
+    Args:
+        values: shingles() 的結果（不可為空）
+
+    Returns:
+        Tuple[int, ...]: 長度為 MINHASH_PERMUTATIONS 的簽章
+    """
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME & _MAX_HASH for value in values)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def jaccard(first: FrozenSet[int], second: FrozenSet[int]) -> float:
+    """兩個 shingle 集合的 Jaccard 相似度"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    """用來比對的文字：標題與摘要"""
+    return f"{article.get('title') or ''} {article.get('summary') or ''}"
+
+
+def find_near_duplicates(
+    articles: Sequence[Dict[str, Any]],
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+) -> List[List[int]]:
+    """
+    將相似的文章分群
+
+    Args:
+        articles: 文章（需有 title / summary）
+        threshold: Jaccard 相似度門檻
+
+    Returns:
+        List[List[int]]: 每群文章的索引（依原順序），沒有相似文章的也自成一群
+    """
+    sets = [shingles(article_text(article)) for article in articles]
+    parent = list(range(len(articles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i, values in enumerate(sets):
+        if not values:
+            continue
+        signature = minhash(values)
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for position, i in enumerate(members):
+            for j in members[position + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if find(i) != find(j) and jaccard(sets[i], sets[j]) >= threshold:
+                    parent[find(j)] = find(i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(articles)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values())
+
+
+def _representative_key(article: Dict[str, Any]) -> tuple:
+    """代表文章：相關代碼最多、摘要最完整、最早發布"""
+    return (
+        -len(article.get('symbols') or []),
+        -len(article.get('summary') or ''),
+        article.get('published_at') or '',
+        article.get('id') or '',
+    )
+
+
+def collapse_near_duplicates(
+    articles: Sequence[Dict[str, Any]],
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    每群相似報導只保留一篇代表文章
+
+    代表文章的 'symbols' 為整群的相關代碼，'also_covered_by' 列出其餘報導
+    （publisher、title、url，依發布時間排序）；沒有相似報導時為空列表。
+
+    Args:
+        articles: 文章（例如 NewsStore.day_articles 的結果），依顯示順序
+        threshold: Jaccard 相似度門檻
+
+    Returns:
+        List[Dict[str, Any]]: 代表文章（複本），依各群第一篇文章的原順序
+    """
+    collapsed = []
+    for cluster in find_near_duplicates(articles, threshold):
+        members = [articles[i] for i in cluster]
+        chosen = min(members, key=_representative_key)
+        others = sorted(
+            (article for article in members if article is not chosen),
+            key=lambda article: article.get('published_at') or '',
+        )
+
+        representative = dict(chosen)
+        symbols = {symbol for article in members for symbol in article.get('symbols') or []}
+        if symbols:
+            representative['symbols'] = sorted(symbols)
+        representative['also_covered_by'] = [
+            {'publisher': article.get('publisher'), 'title': article.get('title'), 'url': article.get('url')}
+            for article in others
+        ]
+        collapsed.append((cluster[0], representative))
+    return [article for _, article in sorted(collapsed, key=lambda item: item[0])]
+
+
+def articles_from_news_files(day: str, root: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    由當天的逐代碼新聞檔取得文章（相同連結的文章合併並列出相關代碼）
+
+    當天的新聞檔已封存時改由每月分片讀取。
+
+    Args:
+        day: 日期 YYYY-MM-DD
+        root: market-data 目錄，None 表示使用預設目錄
+
+    Returns:
+        List[Dict[str, Any]]: 依發布時間由新到舊的文章，含 'symbols'
+    """
+    from news_index import article_key, parse_news_file
+
+    root = root or get_market_data_root()
+    found = []
+    for path in sorted((root / day[:4] / "News").glob(f"*-{day}.*")):
+        if path.suffix not in ('.md', '.json'):
+            continue
+        try:
+            symbol, _, records = parse_news_file(path)
+        except (ScraperError, OSError, UnicodeDecodeError) as e:
+            print_warning(f"無法解析 {path.name}: {e}")
+            continue
+        found.extend((symbol, record) for record in records)
+
+    if not found:
+        # 已封存的日期改由每月分片讀取
+        from news_archive import read_news_archive
+
+        try:
+            records = read_news_archive(start=day, end=day, root=root)
+        except ScraperError as e:
+            print_warning(str(e))
+            records = []
+        found = [
+            (record['symbol'], {key: value for key, value in record.items() if key not in ('symbol', 'day')})
+            for record in records
+        ]
+
+    articles: Dict[str, Dict[str, Any]] = {}
+    for symbol, record in found:
+        key = article_key(record)
+        article = articles.setdefault(key, dict(record, id=record.get('id') or key, symbols=[]))
+        if symbol not in article['symbols']:
+            article['symbols'].append(symbol)
+
+    for article in articles.values():
+        article['symbols'].sort()
+    return sorted(articles.values(), key=lambda article: article.get('published_at') or '', reverse=True)
+
+
+def load_day_articles(day: str, root: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    取得當天所有代碼的新聞：優先使用新聞資料庫，沒有紀錄時解析新聞檔
+
+    Args:
+        day: 日期 YYYY-MM-DD
+        root: market-data 目錄，None 表示使用預設目錄
+
+    Returns:
+        List[Dict[str, Any]]: 文章（含 'symbols'）
+    """
+    from news_store import get_news_store
+
+    try:
+        articles = get_news_store().day_articles(day)
+    except ScraperError as e:
+        print_warning(str(e))
+        articles = []
+    return articles or articles_from_news_files(day, root)
+
+
+def main():
+    parser = create_argument_parser(
+        description='合併當天的相似新聞並產生新聞彙整（Daily/news-digest-YYYY-MM-DD.md）',
+        epilog="""
+使用範例:
+  # 產生今天的新聞彙整（新聞資料庫沒有紀錄時解析 News/*.md）
+  python news_dedup.py
+
+  # 指定日期與相似度門檻，輸出到螢幕
+  python news_dedup.py --day 2025-11-20 --threshold 0.4 --stdout
+        """
+    )
+
+    parser.add_argument('--day', type=str, help='日期 YYYY-MM-DD (預設: 今天)')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=NEAR_DUPLICATE_THRESHOLD,
+        help=f'Jaccard 相似度門檻 (預設: {NEAR_DUPLICATE_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--stdout',
+        action='store_true',
+        help='輸出到螢幕而非檔案'
+    )
+
+    args = parser.parse_args()
+
+    from fetch_market_news import format_news_digest, get_news_digest_path
+
+    day = args.day or datetime.now().strftime('%Y-%m-%d')
+    if not 0 < args.threshold <= 1:
+        print_error("相似度門檻必須介於 0 與 1 之間")
+        safe_exit(False)
+
+    articles = load_day_articles(day)
+    if not articles:
+        print_error(f"{day} 沒有新聞")
+        safe_exit(False)
+
+    content = format_news_digest(articles, day, threshold=args.threshold)
+    output = None if args.stdout else get_news_digest_path(day)
+    safe_exit(write_output(content, output, verbose=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+新聞全文索引（SQLite FTS5）
+
+將 output/market-data/{YEAR}/News/ 中逐代碼的新聞檔（SYMBOL-YYYY-MM-DD.md
+或 .json）解析後載入 FTS5 全文索引，以 BM25 排序搜尋標題、摘要與來源，
+並可依日期與代碼篩選，不需再以 grep 逐檔搜尋。
+
+索引以檔案的修改時間與大小判斷是否需要重新解析，每次更新只處理新增或
+變更的檔案；同一篇文章（相同連結）出現在多個代碼或多天時只索引一次。
+已封存到每月分片（news_archive.py）的新聞也會載入索引。
+
+資料存於 market-data/News/news-index.sqlite。
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_market_data_root,
+    print_error,
+    print_status,
+    print_warning,
+    safe_exit,
+    validate_positive_int,
+)
+
+
+# 索引版本，解析規則或資料表變更時遞增以重建索引
+NEWS_INDEX_VERSION = 1
+
+# BM25 欄位權重：標題、摘要、來源
+NEWS_INDEX_WEIGHTS = (10.0, 1.0, 0.5)
+
+# 新聞檔名：SYMBOL-YYYY-MM-DD.md / .json（代碼本身可能含 '-'，例如 BRK-B）
+_NEWS_FILENAME = re.compile(r'^(?P<symbol>.+)-(?P<day>\d{4}-\d{2}-\d{2})\.(?P<ext>md|json)$')
+_ARTICLE_HEADING = re.compile(r'^## \d+\. (?:🎥|📰) (?P<title>.*)$')
+_FIELD_LINE = re.compile(r'^\*\*(?P<name>[^*]+)\*\*: ?(?P<value>.*?)\s*$')
+_LINK_VALUE = re.compile(r'^\[(?P<url>[^\]]*)\]\((?P<target>[^)]*)\)$')
+
+
+def get_news_index_path() -> Path:
+    """取得新聞全文索引路徑"""
+    return get_market_data_root() / "News" / "news-index.sqlite"
+
+
+def parse_published_at(value: Optional[str]) -> Optional[str]:
+    """
+    將新聞檔中的發布時間轉回 ISO 8601
+
+    Args:
+        value: format_datetime 的結果（例如 Nov 17, 2025 21:06 UTC）或 ISO 8601 字串
+
+    Returns:
+        Optional[str]: 例如 2025-11-17T21:06:00Z，無法解析時返回原字串，空值返回 None
+    """
+    if not value or value == 'N/A':
+        return None
+    try:
+        return datetime.strptime(value, '%b %d, %Y %H:%M UTC').strftime('%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        return value
+
+
+def parse_news_markdown(text: str) -> List[Dict[str, Any]]:
+    """
+    解析 fetch_market_news 產生的新聞 Markdown
+
+    Args:
+        text: 檔案內容
+
+    Returns:
+        List[Dict[str, Any]]: 文章（title、summary、publisher、published_at、url、content_type）
+    """
+    articles: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    in_summary = False
+
+    for line in text.splitlines():
+        heading = _ARTICLE_HEADING.match(line)
+        if heading:
+            current = {
+                'title': heading.group('title').strip(),
+                'summary': None,
+                'publisher': None,
+                'published_at': None,
+                'url': None,
+                'content_type': 'VIDEO' if '🎥' in line[:12] else 'STORY',
+            }
+            articles.append(current)
+            in_summary = False
+            continue
+        if current is None:
+            continue
+
+        field = _FIELD_LINE.match(line)
+        if field:
+            name, value = field.group('name'), field.group('value')
+            in_summary = name == '摘要'
+            if name == '來源':
+                current['publisher'] = value if value != 'N/A' else None
+            elif name == '發布時間':
+                current['published_at'] = parse_published_at(value)
+            elif name == '連結':
+                link = _LINK_VALUE.match(value)
+                url = link.group('target') if link else value
+                current['url'] = url if url and url != '#' else None
+            continue
+
+        if line.strip() == '---':
+            in_summary = False
+        elif in_summary and line.strip():
+            summary = line.strip()
+            if summary != 'N/A':
+                current['summary'] = f"{current['summary']} {summary}" if current['summary'] else summary
+
+    return articles
+
+
+def news_file_key(path: Path) -> Optional[Tuple[str, str]]:
+    """
+    由新聞檔名取得代碼與日期
+
+    Returns:
+        Optional[Tuple[str, str]]: (代碼, 日期)，不是新聞檔時為 None
+    """
+    match = _NEWS_FILENAME.match(path.name)
+    return (match.group('symbol'), match.group('day')) if match else None
+
+
+def parse_news_file(path: Path) -> Tuple[str, str, List[Dict[str, Any]]]:
+    """
+    解析單一新聞檔
+
+    Args:
+        path: SYMBOL-YYYY-MM-DD.md 或 .json
+
+    Returns:
+        Tuple[str, str, List[Dict[str, Any]]]: (代碼, 日期, 文章)
+
+    Raises:
+        ScraperError: 檔名不符或內容無法解析
+    """
+    match = _NEWS_FILENAME.match(path.name)
+    if not match:
+        raise ScraperError(f"不是新聞檔: {path.name}")
+
+    text = path.read_text(encoding='utf-8')
+    if match.group('ext') == 'json':
+        try:
+            articles = json.loads(text)
+        except ValueError as e:
+            raise ScraperError(f"無法解析 {path.name}: {e}")
+        if not isinstance(articles, list):
+            raise ScraperError(f"無法解析 {path.name}: 不是文章列表")
+    else:
+        articles = parse_news_markdown(text)
+    return match.group('symbol'), match.group('day'), articles
+
+
+def article_key(article: Dict[str, Any]) -> str:
+    """
+    取得索引中的文章鍵
+
+    以連結（沒有連結時以標題）為準，Markdown 與 JSON 輸出中的同一篇文章
+    會得到相同的鍵（Markdown 中沒有 Yahoo 的 content.id）。
+    """
+    key = article.get('url') or article.get('title') or ''
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def find_news_files(root: Optional[Path] = None) -> List[Path]:
+    """
+    列出所有年份的逐代碼新聞檔
+
+    Args:
+        root: market-data 目錄，None 表示使用預設目錄
+
+    Returns:
+        List[Path]: 依路徑排序的新聞檔
+    """
+    root = root or get_market_data_root()
+    return sorted(
+        path for path in root.glob("*/News/*")
+        if path.is_file() and _NEWS_FILENAME.match(path.name)
+    )
+
+
+class NewsIndex:
+    """
+    新聞全文索引
+
+    articles 每篇文章一列（文章鍵為連結的雜湊），articles_fts 為其 FTS5
+    外部內容索引（以觸發器同步）；mentions 記錄文章出現在哪個檔案、代碼
+    與日期；files 記錄已索引檔案的修改時間與大小。可跨執行緒使用。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_news_index_path()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != NEWS_INDEX_VERSION:
+                for table in ('articles_fts', 'mentions', 'files', 'articles'):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                " rowid INTEGER PRIMARY KEY,"
+                " key TEXT NOT NULL UNIQUE,"
+                " title TEXT, summary TEXT, publisher TEXT,"
+                " published_at TEXT, day TEXT NOT NULL,"
+                " url TEXT, content_type TEXT);"
+                "CREATE INDEX IF NOT EXISTS idx_articles_day ON articles (day);"
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+                " title, summary, publisher,"
+                " content='articles', content_rowid='rowid', tokenize='porter unicode61');"
+                "CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN"
+                " INSERT INTO articles_fts (rowid, title, summary, publisher)"
+                " VALUES (new.rowid, new.title, new.summary, new.publisher); END;"
+                "CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN"
+                " INSERT INTO articles_fts (articles_fts, rowid, title, summary, publisher)"
+                " VALUES ('delete', old.rowid, old.title, old.summary, old.publisher); END;"
+                "CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN"
+                " INSERT INTO articles_fts (articles_fts, rowid, title, summary, publisher)"
+                " VALUES ('delete', old.rowid, old.title, old.summary, old.publisher);"
+                " INSERT INTO articles_fts (rowid, title, summary, publisher)"
+                " VALUES (new.rowid, new.title, new.summary, new.publisher); END;"
+                "CREATE TABLE IF NOT EXISTS mentions ("
+                " article_key TEXT NOT NULL,"
+                " symbol TEXT NOT NULL,"
+                " day TEXT NOT NULL,"
+                " file TEXT NOT NULL,"
+                " PRIMARY KEY (article_key, symbol, day, file));"
+                "CREATE INDEX IF NOT EXISTS idx_mentions_symbol ON mentions (symbol, article_key);"
+                "CREATE INDEX IF NOT EXISTS idx_mentions_file ON mentions (file);"
+                "CREATE TABLE IF NOT EXISTS files ("
+                " file TEXT PRIMARY KEY,"
+                " mtime_ns INTEGER NOT NULL,"
+                " size INTEGER NOT NULL);"
+            )
+            conn.execute(f"PRAGMA user_version = {NEWS_INDEX_VERSION}")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def update(self, root: Optional[Path] = None, rebuild: bool = False) -> Dict[str, int]:
+        """
+        將新增或變更的新聞檔載入索引，並移除已刪除檔案的紀錄
+
+        Args:
+            root: market-data 目錄，None 表示使用預設目錄
+            rebuild: 是否清除索引後全部重新解析
+
+        Returns:
+            Dict[str, int]: {'indexed', 'unchanged', 'removed', 'failed', 'articles'}
+
+        Raises:
+            ScraperError: 資料庫錯誤
+        """
+        root = root or get_market_data_root()
+        stats = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0, 'articles': 0}
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                if rebuild:
+                    conn.execute("DELETE FROM mentions")
+                    conn.execute("DELETE FROM files")
+                    conn.execute("DELETE FROM articles")
+
+                known = {
+                    file: (mtime_ns, size)
+                    for file, mtime_ns, size in conn.execute("SELECT file, mtime_ns, size FROM files")
+                }
+                present = set()
+                for path in find_news_files(root):
+                    file = path.relative_to(root).as_posix()
+                    present.add(file)
+                    stat = path.stat()
+                    if known.get(file) == (stat.st_mtime_ns, stat.st_size):
+                        stats['unchanged'] += 1
+                        continue
+                    try:
+                        symbol, day, articles = parse_news_file(path)
+                    except (ScraperError, OSError, UnicodeDecodeError) as e:
+                        print_warning(f"無法索引 {file}: {e}")
+                        stats['failed'] += 1
+                        continue
+                    conn.execute("DELETE FROM mentions WHERE file = ?", (file,))
+                    self._index_articles(conn, file, symbol, day, articles)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO files (file, mtime_ns, size) VALUES (?, ?, ?)",
+                        (file, stat.st_mtime_ns, stat.st_size),
+                    )
+                    stats['indexed'] += 1
+
+                # 封存的分片（news_archive.py）：以分片檔的修改時間與大小判斷
+                from news_archive import ArchiveShard, find_archive_shards
+
+                for index_path in find_archive_shards(root):
+                    try:
+                        shard = ArchiveShard(index_path.parent, index_path.name[len("news-"):-len(".index.json")])
+                    except ScraperError as e:
+                        print_warning(str(e))
+                        stats['failed'] += 1
+                        continue
+                    if not shard.path.is_file():
+                        continue
+                    file = shard.path.relative_to(root).as_posix()
+                    present.add(file)
+                    stat = shard.path.stat()
+                    if known.get(file) == (stat.st_mtime_ns, stat.st_size):
+                        stats['unchanged'] += 1
+                        continue
+                    try:
+                        groups = shard.groups()
+                    except ScraperError as e:
+                        print_warning(f"無法索引 {file}: {e}")
+                        stats['failed'] += 1
+                        continue
+                    conn.execute("DELETE FROM mentions WHERE file = ?", (file,))
+                    for (symbol, day), articles in sorted(groups.items()):
+                        self._index_articles(conn, file, symbol, day, articles)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO files (file, mtime_ns, size) VALUES (?, ?, ?)",
+                        (file, stat.st_mtime_ns, stat.st_size),
+                    )
+                    stats['indexed'] += 1
+
+                for file in set(known) - present:
+                    conn.execute("DELETE FROM mentions WHERE file = ?", (file,))
+                    conn.execute("DELETE FROM files WHERE file = ?", (file,))
+                    stats['removed'] += 1
+
+                if stats['removed'] or stats['indexed']:
+                    conn.execute(
+                        "DELETE FROM articles WHERE key NOT IN (SELECT article_key FROM mentions)"
+                    )
+                conn.commit()
+                stats['articles'] = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            except sqlite3.Error as e:
+                raise ScraperError(f"更新新聞索引失敗: {e}")
+        return stats
+
+    @staticmethod
+    def _index_articles(
+        conn: sqlite3.Connection, file: str, symbol: str, day: str, articles: Iterable[Dict[str, Any]]
+    ) -> None:
+        """將代碼某天的文章載入索引，並記錄來源檔案"""
+        for article in articles:
+            if not article.get('title') and not article.get('url'):
+                continue
+            key = article_key(article)
+            published_at = article.get('published_at')
+            article_day = published_at[:10] if published_at and re.match(r'\d{4}-\d{2}-\d{2}', published_at) else day
+            conn.execute(
+                "INSERT INTO articles (key, title, summary, publisher, published_at, day, url, content_type)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET title = excluded.title, summary = excluded.summary,"
+                " publisher = excluded.publisher, published_at = excluded.published_at,"
+                " day = excluded.day, content_type = excluded.content_type"
+                " WHERE excluded.title IS NOT articles.title OR excluded.summary IS NOT articles.summary"
+                " OR excluded.publisher IS NOT articles.publisher"
+                " OR excluded.published_at IS NOT articles.published_at",
+                (
+                    key, article.get('title'), article.get('summary'), article.get('publisher'),
+                    published_at, article_day, article.get('url'), article.get('content_type'),
+                ),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO mentions (article_key, symbol, day, file) VALUES (?, ?, ?, ?)",
+                (key, symbol, day, file),
+            )
+
+    def search(
+        self,
+        query: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        symbols: Optional[Iterable[str]] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        以 BM25 排序搜尋新聞
+
+        Args:
+            query: FTS5 查詢（多個詞為 AND；支援 OR、NOT、"片語" 與 prefix*）
+            start: 發布日期下限 YYYY-MM-DD（含），None 表示不限制
+            end: 發布日期上限 YYYY-MM-DD（含），None 表示不限制
+            symbols: 只列出出現在這些代碼下的文章，None 表示不限制
+            limit: 最多返回的文章數
+
+        Returns:
+            List[Dict[str, Any]]: 文章（含 'symbols' 與 'score'，score 越小越相關）
+
+        Raises:
+            ScraperError: 查詢語法錯誤或資料庫錯誤
+        """
+        conditions = ["articles_fts MATCH ?"]
+        params: List[Any] = [query]
+        if start:
+            conditions.append("a.day >= ?")
+            params.append(start)
+        if end:
+            conditions.append("a.day <= ?")
+            params.append(end)
+        symbols = list(symbols or [])
+        if symbols:
+            conditions.append(
+                "a.key IN (SELECT article_key FROM mentions WHERE symbol IN (%s))" % ', '.join('?' * len(symbols))
+            )
+            params.extend(symbols)
+
+        weights = ', '.join(str(weight) for weight in NEWS_INDEX_WEIGHTS)
+        sql = (
+            f"SELECT a.key, a.title, a.summary, a.publisher, a.published_at, a.url, a.content_type,"
+            f" bm25(articles_fts, {weights}) AS score,"
+            f" (SELECT group_concat(DISTINCT m.symbol) FROM mentions m WHERE m.article_key = a.key)"
+            f" FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid"
+            f" WHERE {' AND '.join(conditions)} ORDER BY score, a.published_at DESC LIMIT ?"
+        )
+        params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self._connect().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                raise ScraperError(f"搜尋新聞失敗: {e}")
+
+        results = []
+        for key, title, summary, publisher, published_at, url, content_type, score, found_in in rows:
+            results.append({
+                'id': key,
+                'title': title,
+                'summary': summary,
+                'publisher': publisher,
+                'published_at': published_at,
+                'url': url,
+                'content_type': content_type,
+                'symbols': sorted(found_in.split(',')) if found_in else [],
+                'score': round(score, 4),
+            })
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_news_index: Optional[NewsIndex] = None
+_news_index_lock = threading.Lock()
+
+
+def get_news_index() -> NewsIndex:
+    """
+    取得共用的新聞全文索引（第一次呼叫時建立）
+
+    Returns:
+        NewsIndex: 共用實例
+    """
+    global _news_index
+    with _news_index_lock:
+        if _news_index is None:
+            _news_index = NewsIndex()
+        return _news_index
+
+
+def search_news(
+    query: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    symbols: Optional[Iterable[str]] = None,
+    limit: int = 20,
+    update: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    搜尋新聞（先將新的新聞檔載入索引）
+
+    參數見 NewsIndex.search；update 為 False 時不檢查新檔案。
+    """
+    index = get_news_index()
+    if update:
+        index.update()
+    return index.search(query, start=start, end=end, symbols=symbols, limit=limit)
+
+
+def format_search_results(results: List[Dict[str, Any]], query: str) -> str:
+    """
+    將搜尋結果格式化為 Markdown（與新聞彙整相同的文章區塊，可直接放入分析提示詞）
+
+    Args:
+        results: search_news 的結果
+        query: 查詢字串
+
+    Returns:
+        str: Markdown 內容
+    """
+    from fetch_market_news import format_article_lines
+
+    output_lines = [f"# 新聞搜尋: {query}\n", f"**新聞數量**: {len(results)} 則\n", "---\n"]
+    for i, article in enumerate(results, 1):
+        output_lines.extend(format_article_lines(i, article, article['symbols']))
+    return '\n'.join(output_lines)
+
+
+def main():
+    parser = create_argument_parser(
+        description='以 SQLite FTS5 全文索引搜尋已收集的新聞（依 BM25 排序）',
+        epilog="""
+使用範例:
+  # 搜尋 Intel 晶圓代工相關新聞（多個詞為 AND）
+  python news_index.py "intel foundry"
+
+  # 本季、只看 INTC 與 TSM 的新聞，輸出 Markdown 給分析提示詞使用
+  python news_index.py "foundry OR fab*" -s INTC -s TSM --start 2025-10-01 --format markdown
+
+  # 只更新索引（載入新的新聞檔）
+  python news_index.py --update-only
+
+  # 清除索引後重新解析所有新聞檔
+  python news_index.py --rebuild --update-only
+        """
+    )
+
+    parser.add_argument(
+        'query',
+        nargs='?',
+        help='FTS5 查詢：多個詞為 AND，支援 OR、NOT、"片語" 與 prefix*'
+    )
+    parser.add_argument(
+        '-s', '--symbol',
+        action='append',
+        default=[],
+        help='只列出這個代碼的新聞（可重複指定）'
+    )
+    parser.add_argument('--start', type=str, help='發布日期下限 YYYY-MM-DD（含）')
+    parser.add_argument('--end', type=str, help='發布日期上限 YYYY-MM-DD（含）')
+    parser.add_argument(
+        '-n', '--limit',
+        type=int,
+        default=20,
+        help='最多列出的新聞數 (預設: 20)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['table', 'json', 'markdown'],
+        default='table',
+        help='輸出格式 (預設: table)'
+    )
+    parser.add_argument(
+        '--update-only',
+        action='store_true',
+        help='只更新索引，不搜尋'
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='清除索引後重新解析所有新聞檔'
+    )
+    parser.add_argument(
+        '--no-update',
+        action='store_true',
+        help='搜尋前不檢查新的新聞檔'
+    )
+
+    args = parser.parse_args()
+
+    if not args.query and not args.update_only:
+        parser.error("請指定查詢字串，或使用 --update-only")
+    try:
+        validate_positive_int(args.limit, "新聞數")
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    index = get_news_index()
+    try:
+        if args.rebuild or not args.no_update:
+            started = datetime.now()
+            stats = index.update(rebuild=args.rebuild)
+            elapsed = (datetime.now() - started).total_seconds()
+            print_status(
+                f"索引更新: 新增/變更 {stats['indexed']} 個檔案，未變更 {stats['unchanged']}，"
+                f"移除 {stats['removed']}，失敗 {stats['failed']}；共 {stats['articles']} 篇文章（{elapsed:.2f}s）"
+            )
+        if args.update_only:
+            safe_exit(True)
+
+        started = datetime.now()
+        results = index.search(args.query, start=args.start, end=args.end, symbols=args.symbol, limit=args.limit)
+        elapsed = (datetime.now() - started).total_seconds() * 1000
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    if args.format == 'json':
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    elif args.format == 'markdown':
+        print(format_search_results(results, args.query))
+    else:
+        for article in results:
+            day = (article['published_at'] or '')[:10] or '-'
+            print(f"{article['score']:>8.2f}  {day}  {','.join(article['symbols']):<16}  {article['title']}")
+    print_status(f"{len(results)} 則新聞（{elapsed:.1f} ms）")
+    safe_exit(True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+新聞資料庫（以文章 id 為鍵）
+
+同一篇 Yahoo 新聞（相同 content.id）常同時出現在多個代碼與指數下。
+文章本身只存一份（articles），各代碼每天取得的新聞只記錄指向文章的
+索引（symbol_news）；逐代碼的 Markdown / JSON 與每日彙整都由索引產生，
+儲存空間與提示詞長度隨不重複的文章數成長，而不是代碼數 × 文章數。
+
+增量模式下每個代碼記錄看過的最新文章（發布時間與 id，watermarks），
+只有比它新的文章會加入當天的紀錄。
+
+資料存於 market-data/News/news-store.sqlite。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from common import ScraperError, get_market_data_root
+
+
+# 正規化後的文章欄位（與 fetch_market_news --json 的輸出相同）
+NEWS_FIELDS = ('id', 'title', 'summary', 'publisher', 'published_at', 'url', 'content_type')
+
+
+def get_news_store_path() -> Path:
+    """取得新聞資料庫路徑"""
+    return get_market_data_root() / "News" / "news-store.sqlite"
+
+
+def get_article_id(content: Dict[str, Any]) -> str:
+    """
+    取得文章的唯一 id
+
+    Yahoo 新聞都有 content.id；缺少時以連結（或標題）的雜湊代替，
+    同一篇文章仍會得到相同的 id。
+
+    Args:
+        content: 新聞的 content 欄位或正規化後的文章
+
+    Returns:
+        str: 文章 id
+    """
+    if content.get('id'):
+        return str(content['id'])
+    url = content.get('url') or (content.get('canonicalUrl') or {}).get('url')
+    key = url or content.get('title') or json.dumps(content, sort_keys=True, default=str)
+    return "sha1:" + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def normalize_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    將 yfinance 的新聞項目轉為固定欄位的文章
+
+    Args:
+        article: ticker.news 的項目，或已正規化的文章（原樣返回副本）
+
+    Returns:
+        Dict[str, Any]: 含 NEWS_FIELDS 的文章，缺少的欄位為 None
+    """
+    if 'content' not in article:
+        record = {field: article.get(field) for field in NEWS_FIELDS}
+        record['id'] = get_article_id(article)
+        return record
+
+    content = article.get('content') or {}
+    return {
+        'id': get_article_id(content),
+        'title': content.get('title'),
+        'summary': content.get('summary'),
+        'publisher': (content.get('provider') or {}).get('displayName'),
+        'published_at': content.get('pubDate'),
+        'url': (content.get('canonicalUrl') or {}).get('url'),
+        'content_type': content.get('contentType'),
+    }
+
+
+def _today() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+class NewsStore:
+    """
+    以文章 id 為鍵的新聞資料庫
+
+    articles 每篇文章一列；symbol_news 記錄各代碼在某天取得的文章與順序；
+    watermarks 記錄各代碼看過的最新文章。可跨執行緒使用。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_news_store_path()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                " id TEXT PRIMARY KEY,"
+                " published_at TEXT,"
+                " first_seen TEXT NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS symbol_news ("
+                " symbol TEXT NOT NULL,"
+                " day TEXT NOT NULL,"
+                " article_id TEXT NOT NULL,"
+                " rank INTEGER NOT NULL,"
+                " PRIMARY KEY (symbol, day, article_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_symbol_news_day ON symbol_news (day, article_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks ("
+                " symbol TEXT PRIMARY KEY,"
+                " published_at TEXT,"
+                " article_id TEXT NOT NULL,"
+                " updated TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def add(
+        self,
+        symbol: str,
+        news: Iterable[Dict[str, Any]],
+        day: Optional[str] = None,
+        incremental: bool = False,
+    ) -> List[str]:
+        """
+        儲存代碼在某天取得的新聞
+
+        一般模式取代該代碼當天原有的索引；增量模式只將比 watermark 新、
+        且該代碼尚未收錄的文章加到當天紀錄的最前面。文章已存在時以新內容
+        更新（保留第一次看到的時間）。兩種模式都會更新 watermark。
+
+        Args:
+            symbol: 代碼
+            news: ticker.news 的項目或正規化後的文章，依顯示順序（新到舊）
+            day: 日期 YYYY-MM-DD，None 表示今天
+            incremental: 是否為增量模式
+
+        Returns:
+            List[str]: 一般模式為依順序的所有文章 id（已去除重複），
+                       增量模式為新加入的文章 id
+
+        Raises:
+            ScraperError: 資料庫錯誤
+        """
+        day = day or _today()
+        records: Dict[str, Dict[str, Any]] = {}
+        for article in news:
+            record = normalize_article(article)
+            records.setdefault(record['id'], record)
+
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            try:
+                conn = self._connect()
+                if incremental:
+                    added = self._new_article_ids(conn, symbol, list(records.values()))
+                    row = conn.execute(
+                        "SELECT MIN(rank) FROM symbol_news WHERE symbol = ? AND day = ?", (symbol, day)
+                    ).fetchone()
+                    first_rank = (row[0] if row[0] is not None else 0) - len(added)
+                else:
+                    added = list(records)
+                    first_rank = 0
+                    conn.execute("DELETE FROM symbol_news WHERE symbol = ? AND day = ?", (symbol, day))
+
+                conn.executemany(
+                    "INSERT INTO articles (id, published_at, first_seen, data) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(id) DO UPDATE SET published_at = excluded.published_at, data = excluded.data",
+                    [
+                        (article_id, record['published_at'], now, json.dumps(record, ensure_ascii=False))
+                        for article_id, record in records.items()
+                    ],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO symbol_news (symbol, day, article_id, rank) VALUES (?, ?, ?, ?)",
+                    [(symbol, day, article_id, first_rank + rank) for rank, article_id in enumerate(added)],
+                )
+                self._update_watermark(conn, symbol, list(records.values()), now)
+                conn.commit()
+            except sqlite3.Error as e:
+                raise ScraperError(f"寫入新聞資料庫失敗: {e}")
+        return added
+
+    @staticmethod
+    def _new_article_ids(conn: sqlite3.Connection, symbol: str, records: List[Dict[str, Any]]) -> List[str]:
+        """找出比 watermark 新且該代碼尚未收錄的文章"""
+        mark = conn.execute(
+            "SELECT published_at FROM watermarks WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        mark_time = mark[0] if mark else None
+
+        added = []
+        for record in records:
+            published_at = record['published_at']
+            # 發布時間早於 watermark 的文章已看過（或已被更新的文章取代）
+            if mark_time and published_at and published_at < mark_time:
+                continue
+            seen = conn.execute(
+                "SELECT 1 FROM symbol_news WHERE symbol = ? AND article_id = ? LIMIT 1", (symbol, record['id'])
+            ).fetchone()
+            if seen is None:
+                added.append(record['id'])
+        return added
+
+    @staticmethod
+    def _update_watermark(conn: sqlite3.Connection, symbol: str, records: List[Dict[str, Any]], now: str) -> None:
+        """將 watermark 前移到這批文章中最新的一篇"""
+        dated = [record for record in records if record['published_at']]
+        if not dated:
+            return
+        latest = max(dated, key=lambda record: (record['published_at'], record['id']))
+        conn.execute(
+            "INSERT INTO watermarks (symbol, published_at, article_id, updated) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(symbol) DO UPDATE SET published_at = excluded.published_at,"
+            " article_id = excluded.article_id, updated = excluded.updated"
+            " WHERE excluded.published_at >= watermarks.published_at",
+            (symbol, latest['published_at'], latest['id'], now),
+        )
+
+    def watermark(self, symbol: str) -> Optional[Dict[str, str]]:
+        """
+        取得代碼的 watermark
+
+        Returns:
+            Optional[Dict[str, str]]: {'published_at', 'article_id', 'updated'}，沒有紀錄時為 None
+        """
+        rows = self._query(
+            "SELECT published_at, article_id, updated FROM watermarks WHERE symbol = ?", (symbol,)
+        )
+        if not rows:
+            return None
+        return dict(zip(('published_at', 'article_id', 'updated'), rows[0]))
+
+    def articles_for(self, symbol: str, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        取得代碼在某天的新聞（依取得時的順序）
+
+        Args:
+            symbol: 代碼
+            day: 日期 YYYY-MM-DD，None 表示今天
+
+        Returns:
+            List[Dict[str, Any]]: 正規化後的文章
+        """
+        rows = self._query(
+            "SELECT a.data FROM symbol_news s JOIN articles a ON a.id = s.article_id"
+            " WHERE s.symbol = ? AND s.day = ? ORDER BY s.rank",
+            (symbol, day or _today()),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def day_articles(self, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        取得某天所有代碼的新聞，每篇文章只出現一次
+
+        Args:
+            day: 日期 YYYY-MM-DD，None 表示今天
+
+        Returns:
+            List[Dict[str, Any]]: 依發布時間由新到舊的文章，'symbols' 為出現過的代碼（已排序）
+        """
+        rows = self._query(
+            "SELECT a.data, group_concat(s.symbol, char(31)) FROM symbol_news s"
+            " JOIN articles a ON a.id = s.article_id WHERE s.day = ?"
+            " GROUP BY a.id ORDER BY a.published_at DESC, a.id",
+            (day or _today(),),
+        )
+        articles = []
+        for data, symbols in rows:
+            record = json.loads(data)
+            record['symbols'] = sorted(symbols.split('\x1f'))
+            articles.append(record)
+        return articles
+
+    def symbols_for_day(self, day: Optional[str] = None) -> List[str]:
+        """列出某天有新聞的代碼"""
+        rows = self._query(
+            "SELECT DISTINCT symbol FROM symbol_news WHERE day = ? ORDER BY symbol", (day or _today(),)
+        )
+        return [row[0] for row in rows]
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        with self._lock:
+            try:
+                return self._connect().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                raise ScraperError(f"讀取新聞資料庫失敗: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_news_store: Optional[NewsStore] = None
+_news_store_lock = threading.Lock()
+
+
+def get_news_store() -> NewsStore:
+    """
+    取得共用的新聞資料庫（第一次呼叫時建立）
+
+    Returns:
+        NewsStore: 共用實例
+    """
+    global _news_store
+    with _news_store_lock:
+        if _news_store is None:
+            _news_store = NewsStore()
+        return _news_store
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+欄式價格資料庫（Parquet）
+
+每個代碼的日K線存成一組 Parquet 檔，依年份分區，與其他資料相同放在
+market-data/{YEAR}/Prices/{SYMBOL}.parquet。爬蟲將資料寫入此處，
+Markdown 報表再由這裡的資料產生，後續分析可直接讀取而不需重新爬取
+或解析文字表格。
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from common import (
+    ScraperError,
+    get_data_directory,
+    get_market_data_root,
+)
+
+
+# 價格資料庫保存的欄位
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _require_parquet() -> None:
+    """確認 Parquet 引擎可用"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ScraperError("需要安裝 pyarrow 套件才能使用價格資料庫。請執行 `pip install pyarrow` 後再試一次。")
+
+
+def get_price_path(symbol: str, year: int) -> Path:
+    """
+    取得代碼在指定年份的 Parquet 檔路徑
+
+    Args:
+        symbol: 股票代碼或指數代碼
+        year: 年份
+
+    Returns:
+        Path: market-data/{YEAR}/Prices/{SYMBOL}.parquet
+    """
+    return get_data_directory(year, "Prices") / f"{symbol}.parquet"
+
+
+def list_price_years(symbol: str) -> List[int]:
+    """
+    列出代碼已有資料的年份
+
+    Args:
+        symbol: 股票代碼或指數代碼
+
+    Returns:
+        List[int]: 由小到大排序的年份
+    """
+    root = get_market_data_root()
+    if not root.exists():
+        return []
+
+    years = []
+    for path in root.glob(f"*/Prices/{symbol}.parquet"):
+        year_dir = path.parent.parent.name
+        if year_dir.isdigit():
+            years.append(int(year_dir))
+    return sorted(years)
+
+
+def normalize_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    將 yfinance 歷史資料整理為以交易日（無時區）為索引的 OHLCV 表
+
+    Args:
+        df: ticker.history 的結果或相同欄位的 DataFrame
+
+    Returns:
+        pd.DataFrame: 只含 PRICE_COLUMNS、索引名稱為 Date 的資料
+    """
+    df = df.reindex(columns=PRICE_COLUMNS).astype('float64')
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize()
+    df.index.name = 'Date'
+    return df
+
+
+def load_prices(
+    symbol: str,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """
+    讀取代碼的日K線
+
+    只讀取與區間重疊的年份分區。
+
+    Args:
+        symbol: 股票代碼或指數代碼
+        start: 起始日期（含），None 表示不限制
+        end: 結束日期（不含），None 表示不限制
+
+    Returns:
+        pd.DataFrame: 依日期排序的資料，沒有資料時為空表
+    """
+    years = list_price_years(symbol)
+    if start is not None:
+        years = [y for y in years if y >= pd.Timestamp(start).year]
+    if end is not None:
+        years = [y for y in years if y <= pd.Timestamp(end).year]
+
+    if not years:
+        return normalize_prices(pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([])))
+
+    _require_parquet()
+    df = pd.concat([pd.read_parquet(get_price_path(symbol, y)) for y in years]).sort_index()
+
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index < pd.Timestamp(end)]
+    return df
+
+
+def load_many(
+    symbols: Iterable[str],
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    一次讀取多個代碼的日K線
+
+    Returns:
+        Dict[str, pd.DataFrame]: {symbol: 資料}，沒有資料的代碼不會出現
+    """
+    result = {}
+    for symbol in symbols:
+        df = load_prices(symbol, start, end)
+        if not df.empty:
+            result[symbol] = df
+    return result
+
+
+def save_prices(symbol: str, df: pd.DataFrame) -> int:
+    """
+    將日K線寫入價格資料庫
+
+    相同日期以新資料為準；只重寫有變動的年份分區，並以暫存檔
+    改名的方式寫入，讀取端不會看到寫到一半的檔案。
+
+    Args:
+        symbol: 股票代碼或指數代碼
+        df: 要寫入的資料（會先經過 normalize_prices）
+
+    Returns:
+        int: 寫入的筆數
+    """
+    if df is None or df.empty:
+        return 0
+
+    _require_parquet()
+    df = normalize_prices(df)
+
+    for year, rows in df.groupby(df.index.year):
+        path = get_price_path(symbol, int(year))
+        if path.exists():
+            rows = pd.concat([pd.read_parquet(path), rows])
+        rows = rows[~rows.index.duplicated(keep='last')].sort_index()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        rows.to_parquet(tmp_path)
+        tmp_path.replace(path)
+
+    return len(df)
+
+
+def save_snapshot_bars(records: Iterable[dict], price_key: str = 'close') -> int:
+    """
+    將各爬蟲的當日快照（含 date/open/high/low/收盤/volume）寫入價格資料庫
+
+    Args:
+        records: 含 symbol、date、open、high、low、volume 與收盤欄位的字典
+        price_key: 收盤價欄位名稱 (fetch_global_indices 為 'close'，
+                   fetch_holdings_prices 為 'current_price')
+
+    Returns:
+        int: 寫入的代碼數
+    """
+    count = 0
+    for record in records:
+        if not record or record.get('date') is None:
+            continue
+        bar = pd.DataFrame(
+            {
+                'Open': [record['open']],
+                'High': [record['high']],
+                'Low': [record['low']],
+                'Close': [record[price_key]],
+                'Volume': [record['volume']],
+            },
+            index=pd.DatetimeIndex([record['date']]),
+        )
+        save_prices(record['symbol'], bar)
+        count += 1
+    return count
+
+
+def get_sync_state_path(symbol: str) -> Path:
+    """取得代碼增量同步狀態檔的路徑"""
+    return get_market_data_root() / "Prices" / f"{symbol}.json"
+
+
+def load_sync_state(symbol: str) -> dict:
+    """
+    讀取增量同步狀態
+
+    Returns:
+        dict: 包含 covered_from、synced_at 的字典，沒有時為空字典
+    """
+    path = get_sync_state_path(symbol)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_sync_state(symbol: str, state: dict) -> None:
+    """儲存增量同步狀態"""
+    path = get_sync_state_path(symbol)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
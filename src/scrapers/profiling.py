@@ -0,0 +1,342 @@
+"""
+執行效能分析
+
+提供所有爬蟲與工具共用的 --profile 選項：以 cProfile 記錄函數呼叫統計，
+並將執行時間依階段（匯入、網路、格式化、寫入）拆解，程式結束時輸出到
+帶時間戳記的檔案，不需修改程式碼即可分析正式執行。
+
+只使用標準函式庫，供 src/scripts/tools 下的獨立工具直接匯入。
+"""
+
+import argparse
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# 拆解的階段：名稱 → 顯示名稱（未歸入任何階段的時間列為「其他」）
+PROFILE_PHASES = {
+    'import': '匯入',
+    'network': '網路',
+    'format': '格式化',
+    'write': '寫入',
+}
+
+# 報告中列出的函數數量（依累計時間排序）
+PROFILE_TOP_FUNCTIONS = 40
+
+
+def get_profile_directory() -> Path:
+    """
+    取得效能分析的預設輸出目錄
+
+    Returns:
+        Path: 環境變數 PROFILE_DIR 指定的目錄，預設為 market-data/Profiles
+    """
+    profile_dir = os.environ.get('PROFILE_DIR')
+    if profile_dir:
+        return Path(profile_dir)
+
+    from common import get_market_data_root
+    return get_market_data_root() / "Profiles"
+
+
+def process_start_time() -> Optional[float]:
+    """
+    取得目前行程的啟動時間（Unix 時間）
+
+    Returns:
+        Optional[float]: 啟動時間，無法取得（非 Linux）時為 None
+    """
+    try:
+        with open('/proc/self/stat', encoding='utf-8') as f:
+            # comm 欄位可能含空白，從最後一個 ')' 之後開始算：starttime 為第 22 欄
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/stat', encoding='utf-8') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+def _union_length(intervals: Iterable[Tuple[float, float]]) -> float:
+    """計算多個時間區間聯集的長度（並行執行的重疊只算一次）"""
+    total = 0.0
+    covered_until = float('-inf')
+    for start, end in sorted(intervals):
+        if end <= covered_until:
+            continue
+        total += end - max(start, covered_until)
+        covered_until = end
+    return total
+
+
+class RunProfiler:
+    """
+    單次執行的效能分析
+
+    主執行緒以 cProfile 記錄，run_bounded 的工作執行緒各自記錄後合併
+    （Python 3.12 起 cProfile 已涵蓋所有執行緒）。階段時間以區間記錄：
+    同一執行緒內巢狀的階段只算最內層，不同執行緒重疊的部分只算一次。
+    """
+
+    def __init__(self, job: Optional[str] = None, directory: Optional[Path] = None):
+        self.job = job or Path(sys.argv[0]).stem.lstrip('-') or 'python'
+        self.directory = directory
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        process_start = process_start_time()
+        self.import_time = max(0.0, self.started_at - process_start) if process_start else None
+        self.intervals: Dict[str, List[Tuple[float, float]]] = {}
+        self.profile = cProfile.Profile()
+        self.thread_profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, start: float, end: float) -> None:
+        if end > start:
+            with self._lock:
+                self.intervals.setdefault(name, []).append((start, end))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """將區塊內的時間歸入指定階段（巢狀時只歸入最內層）"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        now = time.perf_counter()
+        if stack:
+            outer, outer_start = stack[-1]
+            self._record(outer, outer_start, now)
+        stack.append((name, now))
+        try:
+            yield
+        finally:
+            _, start = stack.pop()
+            now = time.perf_counter()
+            self._record(name, start, now)
+            if stack:
+                stack[-1] = (stack[-1][0], now)
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """在工作執行緒中記錄 cProfile，結束時合併"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他分析器（Python 3.12+ 的 cProfile 已涵蓋所有執行緒）
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.thread_profiles.append(profile)
+
+    def breakdown(self, end: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """
+        各階段的 wall-clock 秒數
+
+        Returns:
+            Dict[str, Optional[float]]: PROFILE_PHASES 各階段，加上 'other' 與 'total'（不含匯入）
+        """
+        end = end if end is not None else time.perf_counter()
+        with self._lock:
+            intervals = {name: list(values) for name, values in self.intervals.items()}
+
+        result: Dict[str, Optional[float]] = {'import': self.import_time}
+        for name in PROFILE_PHASES:
+            if name != 'import':
+                result[name] = _union_length(intervals.get(name, []))
+        covered = _union_length(interval for values in intervals.values() for interval in values)
+        result['total'] = end - self.start
+        result['other'] = max(0.0, result['total'] - covered)
+        return result
+
+    def format_report(self, stats: pstats.Stats, breakdown: Dict[str, Optional[float]]) -> str:
+        """產生文字報告：階段拆解與累計時間最高的函數"""
+        total = breakdown['total'] or 0.0
+        lines = [
+            f"# {self.job} 效能分析",
+            "",
+            f"開始時間: {datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds')}",
+            f"命令: {' '.join(sys.argv)}",
+            "",
+            "## 時間拆解（wall clock）",
+            "",
+        ]
+        if breakdown['import'] is None:
+            lines.append(f"{PROFILE_PHASES['import']}: 無法取得")
+        else:
+            lines.append(f"{PROFILE_PHASES['import']}: {breakdown['import']:.3f} 秒（行程啟動到開始分析）")
+        for name, label in list(PROFILE_PHASES.items())[1:] + [('other', '其他')]:
+            seconds = breakdown[name] or 0.0
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"{label}: {seconds:.3f} 秒 ({share:.1f}%)")
+        lines += [
+            f"合計: {total:.3f} 秒（不含匯入；並行執行時各階段可能重疊，加總可能超過合計）",
+            "",
+            f"## cProfile（依累計時間前 {PROFILE_TOP_FUNCTIONS} 名）",
+            "",
+        ]
+
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        lines.append(buffer.getvalue().strip('\n'))
+        return '\n'.join(lines) + '\n'
+
+    def finish(self) -> Tuple[Path, Path]:
+        """
+        停止分析並輸出 pstats 檔與文字報告
+
+        Returns:
+            Tuple[Path, Path]: (pstats 路徑, 文字報告路徑)
+        """
+        self.profile.disable()
+        breakdown = self.breakdown()
+
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        with self._lock:
+            thread_profiles = list(self.thread_profiles)
+        for profile in thread_profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 沒有任何呼叫紀錄的執行緒
+                pass
+
+        directory = self.directory or get_profile_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at).strftime('%Y%m%d-%H%M%S')
+        stats_path = directory / f"{self.job}-{stamp}.pstats"
+        report_path = directory / f"{self.job}-{stamp}.txt"
+
+        stats.dump_stats(str(stats_path))
+        report_path.write_text(self.format_report(stats, breakdown), encoding='utf-8')
+        return stats_path, report_path
+
+
+_profiler: Optional[RunProfiler] = None
+
+
+def start_profiling(directory: Optional[Path] = None, job: Optional[str] = None) -> RunProfiler:
+    """
+    開始效能分析，程式結束時自動輸出結果
+
+    Args:
+        directory: 輸出目錄，None 表示使用 get_profile_directory()
+        job: 輸出檔名前綴，None 表示使用程式名稱
+
+    Returns:
+        RunProfiler: 目前的分析器
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = RunProfiler(job, directory)
+        _profiler.profile.enable()
+        atexit.register(stop_profiling)
+    return _profiler
+
+
+def stop_profiling() -> Optional[Tuple[Path, Path]]:
+    """
+    停止效能分析並輸出結果
+
+    Returns:
+        Optional[Tuple[Path, Path]]: (pstats 路徑, 文字報告路徑)，未在分析或寫入失敗時為 None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+
+    try:
+        stats_path, report_path = profiler.finish()
+    except OSError as e:
+        print(f"❌ 無法寫入效能分析結果: {e}", file=sys.stderr)
+        return None
+
+    print(f"效能分析: {report_path}（cProfile: {stats_path}）", file=sys.stderr)
+    return stats_path, report_path
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """
+    將區塊內的時間歸入指定階段，未啟用分析時不做任何事
+
+    也可作為裝飾器使用，例如 @profile_phase('write')。
+
+    Args:
+        name: PROFILE_PHASES 其中之一
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
+
+
+def profile_iter(name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+    """
+    逐項取值時將產生每一項的時間歸入指定階段（用於串流輸出的產生器）
+
+    Args:
+        name: 階段名稱
+        iterable: 要包裝的可迭代物件
+    """
+    iterator = iter(iterable)
+    while True:
+        with profile_phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """在工作執行緒中記錄 cProfile，未啟用分析時不做任何事"""
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.thread():
+        yield
+
+
+class ProfileAction(argparse.Action):
+    """解析到 --profile 時立即開始分析，涵蓋之後的所有執行"""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, values or True)
+        start_profiling(Path(values) if values else None)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    加入 --profile 參數
+
+    Args:
+        parser: ArgumentParser 實例
+    """
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        metavar='DIR',
+        action=ProfileAction,
+        help='輸出效能分析（cProfile 與匯入/網路/格式化/寫入時間拆解）到 DIR '
+             '(預設: 環境變數 PROFILE_DIR 或 market-data/Profiles)'
+    )
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+既有 Markdown 報告的解析器
+
+將 output/market-data/{YEAR}/Daily/ 中由 format_all_market_data 產生的
+global-indices-*.md 與由 format_markdown_table 產生的 holdings-prices-*.md
+解析回有型別的資料（去除 🔺/🔻/🟢/🔴/⚪、$、B 與千分位），欄位與
+--json 結構化輸出相同。
+
+解析結果依檔案內容的雜湊快取於 .cache/report-parse-cache.sqlite，
+重新讀取一整年的報告時只需計算雜湊，不需重新解析。
+"""
+
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_cache_directory,
+    get_market_data_root,
+    print_error,
+    print_status,
+    print_warning,
+    safe_exit,
+    to_json_value,
+)
+
+
+# 解析器版本，解析規則變更時遞增以捨棄舊快取
+REPORT_PARSER_VERSION = 1
+
+# 報告種類 → 欄位（與結構化輸出的 schema 相同）
+REPORT_COLUMNS = {
+    'global-indices': [
+        'region', 'name', 'symbol', 'date', 'close', 'open', 'high', 'low',
+        'volume', 'change', 'change_pct',
+    ],
+    'holdings-prices': [
+        'symbol', 'name', 'date', 'close', 'previous_close', 'open', 'high', 'low',
+        'volume', 'change', 'change_pct', 'market_cap', 'pe_ratio', 'currency',
+    ],
+}
+
+# 報告表格的表頭（用來確認是我們產生的格式）
+REPORT_HEADERS = {
+    'global-indices': ['國家/地區', '指數名稱', '收盤價', '開盤', '最高', '最低', '成交量', '漲跌', '漲跌幅'],
+    'holdings-prices': ['代碼', '名稱', '當前價格', '漲跌', '漲跌幅', '開盤', '最高', '最低', '成交量', '市值'],
+}
+
+# 數值欄位中需要移除的裝飾
+_DECORATIONS = re.compile(r'[🔺🔻🟢🔴⚪$,%\s]')
+_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+_cache_lock = threading.Lock()
+
+
+def parse_number(cell: str) -> Optional[float]:
+    """
+    將表格中的數值文字轉為浮點數
+
+    支援 emoji 漲跌標記、$、%、千分位與 B（十億）後綴，"—" 視為沒有資料。
+
+    Args:
+        cell: 表格儲存格文字，例如 "🔻 -1,234.56"、"-$1.23"、"$12.34B"
+
+    Returns:
+        Optional[float]: 數值，沒有資料時為 None
+
+    Raises:
+        ValueError: 無法解析的文字
+    """
+    text = _DECORATIONS.sub('', cell)
+    if text in ('', '—', '-'):
+        return None
+
+    scale = 1.0
+    if text.endswith('B'):
+        scale = 1_000_000_000
+        text = text[:-1]
+    return float(text) * scale
+
+
+def detect_report_kind(path: Path) -> str:
+    """
+    依檔名判斷報告種類
+
+    Args:
+        path: 報告路徑
+
+    Returns:
+        str: 'global-indices' 或 'holdings-prices'
+
+    Raises:
+        ScraperError: 不支援的檔名
+    """
+    for kind in REPORT_COLUMNS:
+        if Path(path).name.startswith(f"{kind}-"):
+            return kind
+    raise ScraperError(f"不支援的報告檔名: {path}")
+
+
+def _iter_table_rows(text: str, header: List[str]):
+    """逐一產生表頭符合 header 的 Markdown 表格資料列"""
+    in_table = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith('|'):
+            in_table = False
+            continue
+
+        cells = [cell.strip() for cell in line.strip('|').split('|')]
+        if cells == header:
+            in_table = True
+        elif in_table and not set(''.join(cells)) <= set('-: '):
+            yield cells
+
+
+def _report_date(text: str, path: Optional[Path]) -> Optional[pd.Timestamp]:
+    """取得報告日期：優先使用檔名，其次是內文中第一個日期"""
+    for source in (Path(path).name if path else '', text):
+        match = _DATE_PATTERN.search(source)
+        if match:
+            return pd.Timestamp(match.group(1))
+    return None
+
+
+def parse_global_indices(text: str, path: Optional[Path] = None) -> List[dict]:
+    """
+    解析 global-indices-*.md
+
+    Markdown 中沒有代碼欄位，symbol 為 None，由 load_report 依 indices.yaml 補上。
+
+    Args:
+        text: 報告內容
+        path: 報告路徑（用於取得日期）
+
+    Returns:
+        List[dict]: global-indices 格式的記錄
+    """
+    date = _report_date(text, path)
+    records = []
+    for cells in _iter_table_rows(text, REPORT_HEADERS['global-indices']):
+        region, name, close, open_val, high, low, volume, change, change_pct = cells
+        records.append({
+            'region': region,
+            'name': name,
+            'symbol': None,
+            'date': date,
+            'close': parse_number(close),
+            'open': parse_number(open_val),
+            'high': parse_number(high),
+            'low': parse_number(low),
+            'volume': parse_number(volume) or 0.0,
+            'change': parse_number(change),
+            'change_pct': parse_number(change_pct),
+        })
+    return records
+
+
+def parse_holdings_prices(text: str, path: Optional[Path] = None) -> List[dict]:
+    """
+    解析 holdings-prices-*.md
+
+    previous_close 由收盤價與漲跌推算；名稱超過 30 字時報告中已被截斷。
+    Markdown 中沒有本益比與幣別，這兩個欄位為 None。
+
+    Args:
+        text: 報告內容
+        path: 報告路徑（用於取得日期）
+
+    Returns:
+        List[dict]: holdings-prices 格式的記錄
+    """
+    date = _report_date(text, path)
+    records = []
+    for cells in _iter_table_rows(text, REPORT_HEADERS['holdings-prices']):
+        symbol, name, price, change, change_pct, open_val, high, low, volume, market_cap = cells
+        close = parse_number(price)
+        change_value = parse_number(change)
+        records.append({
+            'symbol': symbol,
+            'name': name,
+            'date': date,
+            'close': close,
+            'previous_close': close - change_value if close is not None and change_value is not None else None,
+            'open': parse_number(open_val),
+            'high': parse_number(high),
+            'low': parse_number(low),
+            'volume': parse_number(volume) or 0.0,
+            'change': change_value,
+            'change_pct': parse_number(change_pct),
+            'market_cap': parse_number(market_cap),
+            'pe_ratio': None,
+            'currency': None,
+        })
+    return records
+
+
+PARSERS = {
+    'global-indices': parse_global_indices,
+    'holdings-prices': parse_holdings_prices,
+}
+
+
+class ParseCache:
+    """
+    以檔案內容雜湊為鍵的解析結果快取（SQLite）
+
+    內容相同的檔案（包含改名或搬移後）都會命中；解析器版本不同時視為未命中。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_cache_directory() / "report-parse-cache.sqlite"
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed ("
+                " digest TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " value BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, digest: str, kind: str) -> Optional[List[dict]]:
+        """讀取快取，未命中時返回 None"""
+        with _cache_lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT value FROM parsed WHERE digest = ? AND kind = ? AND version = ?",
+                    (digest, kind, REPORT_PARSER_VERSION),
+                ).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    return pickle.loads(row[0])
+            except (sqlite3.Error, pickle.PickleError, EOFError) as e:
+                print_warning(f"讀取解析快取失敗: {e}")
+            self.misses += 1
+            return None
+
+    def set(self, digest: str, kind: str, records: List[dict]) -> None:
+        """寫入快取"""
+        with _cache_lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO parsed (digest, kind, version, value) VALUES (?, ?, ?, ?)",
+                    (digest, kind, REPORT_PARSER_VERSION, pickle.dumps(records)),
+                )
+                conn.commit()
+            except (sqlite3.Error, pickle.PickleError) as e:
+                print_warning(f"寫入解析快取失敗: {e}")
+
+    def close(self) -> None:
+        with _cache_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_parse_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> ParseCache:
+    """取得共用的解析快取（第一次呼叫時建立）"""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParseCache()
+    return _parse_cache
+
+
+def _index_symbols() -> Dict[tuple, str]:
+    """從 indices.yaml 取得 (區域, 指數名稱) → 代碼，設定檔不存在時為空"""
+    from config_service import get_indices
+
+    try:
+        return {(index['region'], index['name']): index['symbol'] for index in get_indices()}
+    except ScraperError:
+        return {}
+
+
+def parse_report(path: Path, use_cache: bool = True) -> List[dict]:
+    """
+    解析單一報告
+
+    Args:
+        path: 報告路徑
+        use_cache: 是否使用解析快取
+
+    Returns:
+        List[dict]: 記錄（欄位見 REPORT_COLUMNS）
+    """
+    path = Path(path)
+    kind = detect_report_kind(path)
+    data = path.read_bytes()
+
+    digest = hashlib.sha256(data).hexdigest()
+    cache = get_parse_cache() if use_cache else None
+    if cache is not None:
+        records = cache.get(digest, kind)
+        if records is not None:
+            return records
+
+    records = PARSERS[kind](data.decode('utf-8'), path)
+    if cache is not None:
+        cache.set(digest, kind, records)
+    return records
+
+
+def records_to_frame(records: List[dict], kind: str) -> pd.DataFrame:
+    """
+    將記錄轉為有型別的 DataFrame
+
+    Args:
+        records: parse_report 的結果
+        kind: 報告種類
+
+    Returns:
+        pd.DataFrame: date 為 datetime64、數值欄位為 float64、文字欄位為 object
+    """
+    columns = REPORT_COLUMNS[kind]
+    df = pd.DataFrame.from_records(records, columns=columns)
+    text_columns = {'region', 'name', 'symbol', 'currency'}
+    for column in columns:
+        if column == 'date':
+            df[column] = pd.to_datetime(df[column])
+        elif column not in text_columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return df
+
+
+def find_reports(kind: str, start=None, end=None, root: Optional[Path] = None) -> List[Path]:
+    """
+    列出市場資料目錄中指定種類的報告
+
+    Args:
+        kind: 'global-indices' 或 'holdings-prices'
+        start: 起始日期（含），None 表示不限制
+        end: 結束日期（含），None 表示不限制
+        root: market-data 目錄，None 表示使用預設目錄
+
+    Returns:
+        List[Path]: 依日期排序的報告路徑
+    """
+    if kind not in REPORT_COLUMNS:
+        raise ScraperError(f"未知的報告種類: {kind}")
+
+    root = root or get_market_data_root()
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    reports = []
+    for path in root.glob(f"*/Daily/{kind}-*.md"):
+        match = _DATE_PATTERN.search(path.name)
+        if not match:
+            continue
+        date = pd.Timestamp(match.group(1))
+        if (start is not None and date < start) or (end is not None and date > end):
+            continue
+        reports.append((date, path))
+    return [path for _, path in sorted(reports)]
+
+
+def load_reports(kind: str, start=None, end=None, root: Optional[Path] = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    讀取區間內所有指定種類的報告並合併為單一 DataFrame
+
+    Args:
+        kind: 'global-indices' 或 'holdings-prices'
+        start: 起始日期（含），None 表示不限制
+        end: 結束日期（含），None 表示不限制
+        root: market-data 目錄，None 表示使用預設目錄
+        use_cache: 是否使用解析快取
+
+    Returns:
+        pd.DataFrame: 依日期排序的資料，欄位見 REPORT_COLUMNS
+    """
+    records = []
+    for path in find_reports(kind, start, end, root):
+        try:
+            records.extend(parse_report(path, use_cache=use_cache))
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            print_warning(f"無法解析 {path}: {e}")
+
+    df = records_to_frame(records, kind)
+    if kind == 'global-indices' and not df.empty:
+        symbols = _index_symbols()
+        df['symbol'] = [symbols.get(key) for key in zip(df['region'], df['name'])]
+    return df
+
+
+def main():
+    parser = create_argument_parser(
+        description='將既有的 global-indices / holdings-prices Markdown 報告解析為結構化資料',
+        epilog="""
+使用範例:
+  # 今年所有全球指數報告，輸出 CSV
+  python report_parser.py global-indices --start 2025-01-01 --format csv
+
+  # 解析單一檔案為 JSON
+  python report_parser.py output/market-data/2025/Daily/holdings-prices-2025-12-02.md --format json
+        """
+    )
+
+    parser.add_argument(
+        'source',
+        help="報告種類（global-indices、holdings-prices）或單一報告檔案路徑"
+    )
+
+    parser.add_argument('--start', type=str, help='起始日期 YYYY-MM-DD（含）')
+    parser.add_argument('--end', type=str, help='結束日期 YYYY-MM-DD（含）')
+
+    parser.add_argument(
+        '--format',
+        choices=['table', 'csv', 'json'],
+        default='table',
+        help='輸出格式 (預設: table)'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不使用解析快取'
+    )
+
+    args = parser.parse_args()
+
+    started = datetime.now()
+    try:
+        if args.source in REPORT_COLUMNS:
+            kind = args.source
+            df = load_reports(kind, args.start, args.end, use_cache=not args.no_cache)
+        else:
+            kind = detect_report_kind(Path(args.source))
+            df = records_to_frame(parse_report(Path(args.source), use_cache=not args.no_cache), kind)
+    except (ScraperError, OSError) as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    if args.format == 'csv':
+        print(df.to_csv(index=False), end='')
+    elif args.format == 'json':
+        rows = [{key: to_json_value(value) for key, value in row.items()} for row in df.to_dict('records')]
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print(df.to_string(index=False))
+
+    cache = get_parse_cache()
+    elapsed = (datetime.now() - started).total_seconds()
+    print_status(f"{len(df)} 筆記錄，{elapsed:.2f}s（解析快取命中 {cache.hits}，未命中 {cache.misses}）")
+
+
+if __name__ == '__main__':
+    main()
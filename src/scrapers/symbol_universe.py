@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+代碼總表（symbol universe）
+
+一次解析 config/holdings.yaml 與 config/indices.yaml，將持倉、觀察清單
+與指數中的代碼合併去重，讓每個代碼每次執行只需爬取一次。
+設定檔透過 config_service 載入；合併結果依設定檔的修改時間快取於
+.cache/symbol-universe.json，設定檔未變動時不需重新解析與合併。
+
+也可作為命令列工具，供 shell 腳本查詢代碼列表：
+  python symbol_universe.py -t stock watchlist --fetch-news
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from common import (
+    ScraperError,
+    create_argument_parser,
+    get_cache_directory,
+    get_project_root,
+    print_error,
+    print_warning,
+    safe_exit,
+)
+from config_service import load_config
+
+
+# 代碼類型，依合併時的優先順序排列
+SYMBOL_TYPES = ('stock', 'watchlist', 'index')
+
+# 快取格式版本，格式變更時遞增以捨棄舊快取
+UNIVERSE_CACHE_VERSION = 1
+
+# 同一行程內已載入的結果，鍵為 (設定檔路徑, 修改時間)
+_loaded: Dict[tuple, List[dict]] = {}
+
+
+def get_default_config_paths() -> Dict[str, Path]:
+    """
+    取得預設設定檔路徑
+
+    Returns:
+        Dict[str, Path]: {'holdings': ..., 'indices': ...}
+    """
+    config_dir = get_project_root() / 'config'
+    return {
+        'holdings': config_dir / 'holdings.yaml',
+        'indices': config_dir / 'indices.yaml',
+    }
+
+
+def _iter_group_entries(groups, symbol_type: str, group_key: str):
+    """逐一產生 {group: {name: data}} 結構中的項目"""
+    for group_name, entries in (groups or {}).items():
+        # 檢查群組是否為空
+        if entries is None:
+            continue
+        for name, data in entries.items():
+            # 支援舊格式: 名稱: '^GSPC'
+            if not isinstance(data, dict):
+                data = {'symbol': data}
+            symbol = data.get('symbol')
+            if not symbol:
+                continue
+
+            if symbol_type == 'index':
+                enabled = True
+            else:
+                enabled = bool(data.get('enabled', True))
+
+            yield {
+                'symbol': symbol,
+                'name': name,
+                'type': symbol_type,
+                group_key: group_name,
+                'enabled': enabled,
+                'fetch_news': enabled and bool(data.get('fetch_news', False)),
+            }
+
+
+def parse_config_entries(holdings_config: Optional[dict], indices_config: Optional[dict]) -> List[dict]:
+    """
+    將設定檔內容轉為未合併的項目列表
+
+    Args:
+        holdings_config: holdings.yaml 的內容
+        indices_config: indices.yaml 的內容
+
+    Returns:
+        List[dict]: 每個設定項目一筆，依設定檔順序
+    """
+    entries = []
+    if holdings_config:
+        entries.extend(_iter_group_entries(holdings_config.get('holdings'), 'stock', 'group'))
+        entries.extend(_iter_group_entries(holdings_config.get('watchlist'), 'watchlist', 'group'))
+    if indices_config:
+        entries.extend(_iter_group_entries(indices_config.get('global_indices'), 'index', 'region'))
+    return entries
+
+
+def merge_entries(entries: Sequence[dict]) -> List[dict]:
+    """
+    依代碼合併重複的項目
+
+    名稱、類型與群組取第一次出現的項目；任一項目啟用即視為啟用，
+    任一啟用的項目要求爬取新聞即爬取新聞。types 記錄代碼出現過的
+    所有類型。
+
+    Args:
+        entries: parse_config_entries 的結果
+
+    Returns:
+        List[dict]: 每個代碼一筆，依第一次出現的順序
+    """
+    merged: Dict[str, dict] = {}
+    for entry in entries:
+        symbol = entry['symbol']
+        if symbol not in merged:
+            merged[symbol] = dict(entry, types=[entry['type']])
+            continue
+
+        current = merged[symbol]
+        current['enabled'] = current['enabled'] or entry['enabled']
+        current['fetch_news'] = current['fetch_news'] or entry['fetch_news']
+        if entry['type'] not in current['types']:
+            current['types'].append(entry['type'])
+    return list(merged.values())
+
+
+def _file_signature(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_universe(
+    holdings_file: Optional[Path] = None,
+    indices_file: Optional[Path] = None,
+    use_cache: bool = True,
+) -> List[dict]:
+    """
+    載入合併去重後的代碼總表
+
+    設定檔修改時間未變時直接使用快取，不需解析 YAML；不存在的
+    設定檔會被略過。
+
+    Args:
+        holdings_file: holdings.yaml 路徑，None 表示使用預設路徑
+        indices_file: indices.yaml 路徑，None 表示使用預設路徑
+        use_cache: 是否使用 .cache 中的解析結果
+
+    Returns:
+        List[dict]: 代碼項目列表（symbol, name, type, types, enabled, fetch_news, group/region）
+
+    Raises:
+        ScraperError: 兩個設定檔都不存在或 YAML 格式錯誤
+    """
+    defaults = get_default_config_paths()
+    paths = {
+        'holdings': Path(holdings_file) if holdings_file else defaults['holdings'],
+        'indices': Path(indices_file) if indices_file else defaults['indices'],
+    }
+    signature = {key: [str(path.resolve()), _file_signature(path)] for key, path in paths.items()}
+    memo_key = tuple(tuple(value) for value in signature.values())
+
+    if memo_key in _loaded:
+        return _loaded[memo_key]
+
+    if all(mtime is None for _, mtime in signature.values()):
+        raise ScraperError(f"找不到設定檔: {paths['holdings']}、{paths['indices']}")
+
+    cache_path = get_cache_directory() / "symbol-universe.json"
+    if use_cache and cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding='utf-8'))
+            if cached.get('version') == UNIVERSE_CACHE_VERSION and cached.get('files') == signature:
+                _loaded[memo_key] = cached['symbols']
+                return cached['symbols']
+        except (OSError, ValueError):
+            pass
+
+    configs = {}
+    for key, path in paths.items():
+        if signature[key][1] is None:
+            print_warning(f"找不到設定檔 {path}，略過")
+            configs[key] = None
+        else:
+            configs[key] = load_config(key, path)
+
+    symbols = merge_entries(parse_config_entries(configs['holdings'], configs['indices']))
+
+    if use_cache:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(
+                json.dumps(
+                    {'version': UNIVERSE_CACHE_VERSION, 'files': signature, 'symbols': symbols},
+                    ensure_ascii=False,
+                ),
+                encoding='utf-8',
+            )
+        except OSError as e:
+            print_warning(f"無法寫入代碼總表快取: {e}")
+
+    _loaded[memo_key] = symbols
+    return symbols
+
+
+def query_symbols(
+    universe: Sequence[dict],
+    types: Optional[Sequence[str]] = None,
+    enabled_only: bool = True,
+    fetch_news: Optional[bool] = None,
+) -> List[dict]:
+    """
+    篩選代碼總表
+
+    Args:
+        universe: load_universe 的結果
+        types: 只保留出現在這些類型中的代碼，None 表示全部
+        enabled_only: 是否只保留啟用的代碼
+        fetch_news: True/False 依是否爬取新聞篩選，None 表示不篩選
+
+    Returns:
+        List[dict]: 符合條件的代碼項目
+    """
+    result = []
+    for entry in universe:
+        if types and not any(t in types for t in entry['types']):
+            continue
+        if enabled_only and not entry['enabled']:
+            continue
+        if fetch_news is not None and entry['fetch_news'] != fetch_news:
+            continue
+        result.append(entry)
+    return result
+
+
+def main():
+    parser = create_argument_parser(
+        description='查詢 holdings.yaml 與 indices.yaml 合併去重後的代碼列表',
+        epilog="""
+使用範例:
+  # 所有啟用的代碼（每行一個）
+  python symbol_universe.py
+
+  # 需要爬取新聞的持股與觀察清單
+  python symbol_universe.py -t stock watchlist --fetch-news
+
+  # 以 JSON 輸出所有指數（含詳細欄位）
+  python symbol_universe.py -t index --format json
+        """
+    )
+
+    parser.add_argument(
+        '-t', '--types',
+        nargs='+',
+        choices=SYMBOL_TYPES,
+        help='只列出這些類型的代碼（可多選）'
+    )
+
+    parser.add_argument(
+        '--fetch-news',
+        action='store_true',
+        help='只列出 fetch_news: true 的代碼'
+    )
+
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='包含 enabled: false 的代碼'
+    )
+
+    parser.add_argument(
+        '--format',
+        choices=['lines', 'json'],
+        default='lines',
+        help='輸出格式 (預設: lines，每行一個代碼)'
+    )
+
+    parser.add_argument(
+        '--holdings',
+        type=str,
+        help='holdings.yaml 路徑 (預設: config/holdings.yaml)'
+    )
+
+    parser.add_argument(
+        '--indices',
+        type=str,
+        help='indices.yaml 路徑 (預設: config/indices.yaml)'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        universe = load_universe(args.holdings, args.indices)
+    except ScraperError as e:
+        print_error(str(e))
+        safe_exit(False)
+
+    entries = query_symbols(
+        universe,
+        types=args.types,
+        enabled_only=not args.all,
+        fetch_news=True if args.fetch_news else None,
+    )
+
+    if args.format == 'json':
+        print(json.dumps(entries, ensure_ascii=False, indent=2))
+    else:
+        for entry in entries:
+            print(entry['symbol'])
+
+
+if __name__ == '__main__':
+    main()
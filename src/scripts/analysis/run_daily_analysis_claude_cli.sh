@@ -59,9 +59,16 @@ NEWS_DIR="${OUTPUT_DIR}/News"
 REPORTS_DIR="${PROJECT_ROOT}/reports/markdown"
 CONFIG_DIR="${PROJECT_ROOT}/config"
 
+# Python 直譯器 (優先使用專案虛擬環境)
+PYTHON_BIN="${PROJECT_ROOT}/.venv/bin/python"
+if [[ ! -x "${PYTHON_BIN}" ]]; then
+    PYTHON_BIN="python3"
+fi
+
 # 輸入檔案
 GLOBAL_INDICES="${DAILY_DIR}/global-indices-${TODAY}.md"
 PRICES="${DAILY_DIR}/holdings-prices-${TODAY}.md"
+NEWS_DIGEST="${DAILY_DIR}/news-digest-${TODAY}.md"
 HOLDINGS_CONFIG="${CONFIG_DIR}/holdings.yaml"
 PORTFOLIO_SUMMARY="${CONFIG_DIR}/portfolio_summary.yaml"
 PORTFOLIO_HOLDINGS="${PROJECT_ROOT}/../financial-analysis-system/portfolio/${YEAR}/holdings.md"
@@ -151,45 +158,17 @@ collect_news_files() {
     printf '%s\n' "${news_files[@]}"
 }
 
-# 從 holdings.yaml 中提取啟用的股票代碼
+# 從 holdings.yaml 中提取啟用且需要爬取新聞的股票代碼（含觀察清單）
 get_enabled_holdings() {
     if [[ ! -f "${HOLDINGS_CONFIG}" ]]; then
         echo "" >&2
         return 1
     fi
 
-    # 提取所有 symbol 且 enabled: true 和 fetch_news: true 的股票
-    # 策略：遇到 symbol 時記錄，遇到股票名稱行時檢查並輸出
-    awk '
-        # 遇到股票名稱行（4個空格縮排，以冒號結尾）
-        /^    [^ ].*:$/ {
-            # 如果上一個股票符合條件，輸出
-            if (symbol && fetch_news && enabled) {
-                print symbol
-            }
-            # 重置變數
-            symbol=""; fetch_news=0; enabled=0
-        }
-        # 遇到 symbol 行
-        /symbol:/ {
-            gsub(/"/, "", $2);
-            symbol=$2
-        }
-        # 遇到 fetch_news: true
-        /fetch_news: true/ {
-            fetch_news=1
-        }
-        # 遇到 enabled: true
-        /enabled: true/ {
-            enabled=1
-        }
-        # 文件結尾處理最後一個股票
-        END {
-            if (symbol && fetch_news && enabled) {
-                print symbol
-            }
-        }
-    ' "${HOLDINGS_CONFIG}" | sort -u
+    "${PYTHON_BIN}" "${PROJECT_ROOT}/src/scrapers/symbol_universe.py" \
+        --holdings "${HOLDINGS_CONFIG}" \
+        -t stock watchlist \
+        --fetch-news | sort -u
 }
 
 # 清理臨時檔案
@@ -243,6 +222,7 @@ generate_stock_analysis_files() {
     local count=0
     local skipped_no_news=0
     local skipped_old_news=0
+    local skipped_unchanged=0
     local skipped_not_holding=0
 
     # 遍歷啟用的持股
@@ -263,6 +243,15 @@ generate_stock_analysis_files() {
             continue
         fi
 
+        # 今天已有報告且之後新聞檔案沒有更新（增量爬取沒有新文章時不會重寫）
+        local latest_report
+        latest_report=$(ls -t "${REPORTS_DIR}/stock-${symbol}-${TODAY}-"*.md 2>/dev/null | head -n 1 || true)
+        if [[ -n "${latest_report}" && ! "${news_file}" -nt "${latest_report}" ]]; then
+            echo -e "${YELLOW}   ⏭️  跳過 ${symbol} (新聞無更新，已有今日報告)${NC}"
+            skipped_unchanged=$((skipped_unchanged + 1))
+            continue
+        fi
+
         local stock_analysis_file="${REPORTS_DIR}/stock-${symbol}-${TODAY}-${TIME_SUFFIX}.md"
         local stock_prompt_file="/tmp/stock-${symbol}-prompt-${TODAY}-${TIME_SUFFIX}.txt"
 
@@ -395,7 +384,7 @@ EOF
     echo -e "${GREEN}   ✅ 個股分析完成!${NC}"
     echo -e "${GREEN}      生成: ${count} 檔${NC}"
 
-    local total_skipped=$((skipped_no_news + skipped_old_news))
+    local total_skipped=$((skipped_no_news + skipped_old_news + skipped_unchanged))
     if [[ ${total_skipped} -gt 0 ]]; then
         echo -e "${YELLOW}      跳過: ${total_skipped} 檔${NC}"
         if [[ ${skipped_no_news} -gt 0 ]]; then
@@ -404,6 +393,9 @@ EOF
         if [[ ${skipped_old_news} -gt 0 ]]; then
             echo -e "${YELLOW}        - 無近期新聞: ${skipped_old_news} 檔${NC}"
         fi
+        if [[ ${skipped_unchanged} -gt 0 ]]; then
+            echo -e "${YELLOW}        - 新聞無更新: ${skipped_unchanged} 檔${NC}"
+        fi
     fi
     echo ""
 }
@@ -420,28 +412,40 @@ generate_market_analysis_prompt() {
     local indices_data
     indices_data=$(<"${GLOBAL_INDICES}")
 
-    # 收集所有新聞並整合
+    # 收集所有新聞並整合（優先使用新聞彙整：同一篇文章只列一次、相似報導合併，並標示相關代碼）
     local news_data=""
-    local news_files
-    news_files=()
-    while IFS= read -r line; do
-        news_files+=("$line")
-    done < <(collect_news_files)
-
-    for news_file in "${news_files[@]}"; do
-        if [[ -f "${news_file}" ]]; then
-            local symbol
-            symbol=$(basename "${news_file}" | sed "s/-${TODAY}.md//")
-            local news_content
-            news_content=$(<"${news_file}")
-            news_data="${news_data}
+    local news_count=0
+    if [[ ! -f "${NEWS_DIGEST}" ]]; then
+        # 沒有新聞彙整時由當天的新聞檔產生（合併相似報導）
+        if ! OUTPUT_DIR="${PROJECT_ROOT}/output" "${PYTHON_BIN}" "${PROJECT_ROOT}/src/scrapers/news_dedup.py" --day "${TODAY}" >/dev/null; then
+            echo -e "${YELLOW}⚠️  無法產生新聞彙整，改用當天的新聞檔${NC}" >&2
+        fi
+    fi
+    if [[ -f "${NEWS_DIGEST}" ]]; then
+        news_data=$(<"${NEWS_DIGEST}")
+        news_count=$(grep -c '^## [0-9]' "${NEWS_DIGEST}" || true)
+    else
+        local news_files
+        news_files=()
+        while IFS= read -r line; do
+            news_files+=("$line")
+        done < <(collect_news_files)
+
+        for news_file in "${news_files[@]}"; do
+            if [[ -f "${news_file}" ]]; then
+                local symbol
+                symbol=$(basename "${news_file}" | sed "s/-${TODAY}.md//")
+                local news_content
+                news_content=$(<"${news_file}")
+                news_data="${news_data}
 
 ### ${symbol} 新聞
 ${news_content}"
-        fi
-    done
+            fi
+        done
 
-    local news_count=${#news_files[@]}
+        news_count=${#news_files[@]}
+    fi
 
     # 生成市場分析 Prompt
     cat > "${MARKET_PROMPT_FILE}" <<'EOF'
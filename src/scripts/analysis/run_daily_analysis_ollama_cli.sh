@@ -49,9 +49,16 @@ NEWS_DIR="${OUTPUT_DIR}/News"
 REPORTS_DIR="${PROJECT_ROOT}/reports/markdown"
 CONFIG_DIR="${PROJECT_ROOT}/config"
 
+# Python 直譯器 (優先使用專案虛擬環境)
+PYTHON_BIN="${PROJECT_ROOT}/.venv/bin/python"
+if [[ ! -x "${PYTHON_BIN}" ]]; then
+    PYTHON_BIN="python3"
+fi
+
 # 檔案路徑
 GLOBAL_INDICES="${DAILY_DIR}/global-indices-${TODAY}.md"
 PRICES="${DAILY_DIR}/holdings-prices-${TODAY}.md"
+NEWS_DIGEST="${DAILY_DIR}/news-digest-${TODAY}.md"
 HOLDINGS_CONFIG="${CONFIG_DIR}/holdings.yaml"
 PORTFOLIO_HOLDINGS="${PROJECT_ROOT}/../financial-analysis-system/portfolio/${YEAR}/holdings.md"
 MARKET_ANALYSIS_OUTPUT="${REPORTS_DIR}/market-analysis-ollama-${TODAY}-${TIME_SUFFIX}.md"
@@ -139,29 +146,41 @@ generate_market_analysis_prompt() {
     local indices_data
     indices_data=$(<"${GLOBAL_INDICES}")
 
-    # 讀取新聞數據
+    # 讀取新聞數據（優先使用新聞彙整：同一篇文章只列一次、相似報導合併，並標示相關代碼）
     local news_data=""
-    local news_files
-    # 相容 bash 3.x (macOS 默認版本)
-    news_files=()
-    while IFS= read -r line; do
-        news_files+=("$line")
-    done < <(collect_news_files)
-
-    for news_file in "${news_files[@]}"; do
-        if [[ -f "${news_file}" ]]; then
-            local symbol
-            symbol=$(basename "${news_file}" | sed "s/-${TODAY}.md//")
-            local news_content
-            news_content=$(<"${news_file}")
-            news_data="${news_data}
+    local news_count=0
+    if [[ ! -f "${NEWS_DIGEST}" ]]; then
+        # 沒有新聞彙整時由當天的新聞檔產生（合併相似報導）
+        if ! OUTPUT_DIR="${PROJECT_ROOT}/output" "${PYTHON_BIN}" "${PROJECT_ROOT}/src/scrapers/news_dedup.py" --day "${TODAY}" >/dev/null; then
+            echo -e "${YELLOW}⚠️  無法產生新聞彙整，改用當天的新聞檔${NC}" >&2
+        fi
+    fi
+    if [[ -f "${NEWS_DIGEST}" ]]; then
+        news_data=$(<"${NEWS_DIGEST}")
+        news_count=$(grep -c '^## [0-9]' "${NEWS_DIGEST}" || true)
+    else
+        local news_files
+        # 相容 bash 3.x (macOS 默認版本)
+        news_files=()
+        while IFS= read -r line; do
+            news_files+=("$line")
+        done < <(collect_news_files)
+
+        for news_file in "${news_files[@]}"; do
+            if [[ -f "${news_file}" ]]; then
+                local symbol
+                symbol=$(basename "${news_file}" | sed "s/-${TODAY}.md//")
+                local news_content
+                news_content=$(<"${news_file}")
+                news_data="${news_data}
 
 ### ${symbol} 新聞
 ${news_content}"
-        fi
-    done
+            fi
+        done
 
-    local news_count=${#news_files[@]}
+        news_count=${#news_files[@]}
+    fi
 
     # 生成市場分析 Prompt（與 Claude 版本相同）
     cat > "${MARKET_PROMPT_FILE}" <<'EOF'
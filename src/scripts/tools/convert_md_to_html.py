@@ -27,6 +27,10 @@ except ImportError:  # pragma: no cover - runtime dependency check
     )
     sys.exit(1)
 
+# 共用的效能分析模組（只使用標準函式庫）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scrapers"))
+from profiling import add_profile_argument, profile_phase  # noqa: E402
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -41,6 +45,7 @@ def parse_args() -> argparse.Namespace:
         choices=["market", "holdings", "home", "stock"],
         help="用於設定導航高亮, 預設 market",
     )
+    add_profile_argument(parser)
     return parser.parse_args()
 
 
@@ -374,12 +379,14 @@ def main() -> None:
     print(f"Converting {input_file} → {output_file} ({page_type})")
 
     md_content = read_file(input_file)
-    title, date, stock_symbol = extract_title_and_date(md_content, input_file)
-    content_html = markdown_to_html(md_content)
-    html_page = create_html_page(title, date, content_html, page_type, stock_symbol)
-
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    output_file.write_text(html_page, encoding="utf-8")
+    with profile_phase("format"):
+        title, date, stock_symbol = extract_title_and_date(md_content, input_file)
+        content_html = markdown_to_html(md_content)
+        html_page = create_html_page(title, date, content_html, page_type, stock_symbol)
+
+    with profile_phase("write"):
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        output_file.write_text(html_page, encoding="utf-8")
 
     print(f"✅ Conversion complete: {output_file}")
     print(f"   Title: {title}")
@@ -11,6 +11,7 @@
 
 from __future__ import annotations
 
+import argparse
 import json
 import shutil
 import subprocess
@@ -26,6 +27,18 @@ DOCS_DIR = PROJECT_ROOT / "docs"
 STOCKS_DIR = DOCS_DIR / "stocks"
 CONVERTER_SCRIPT = PROJECT_ROOT / "src" / "scripts" / "tools" / "convert_md_to_html.py"
 
+# 共用的效能分析模組（只使用標準函式庫）
+sys.path.insert(0, str(PROJECT_ROOT / "src" / "scrapers"))
+from profiling import add_profile_argument, profile_phase  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="將最新的 markdown 報告轉為 GitHub Pages 網站內容 (docs/)",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args()
+
 
 def find_latest_reports() -> Dict[str, Path]:
     """找到最新的市場分析、持股分析和個股報告"""
@@ -70,7 +83,7 @@ def find_latest_reports() -> Dict[str, Path]:
 
 
 def convert_markdown_to_html(md_file: Path, output_file: Path, page_type: str) -> bool:
-    """呼叫轉換腳本將 markdown 轉為 HTML"""
+    """呼叫轉換腳本將 markdown 轉為 HTML（效能分析時整段歸入格式化）"""
 
     try:
         cmd = [
@@ -81,12 +94,13 @@ def convert_markdown_to_html(md_file: Path, output_file: Path, page_type: str) -
             page_type
         ]
 
-        result = subprocess.run(
-            cmd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        with profile_phase("format"):
+            result = subprocess.run(
+                cmd,
+                check=True,
+                capture_output=True,
+                text=True
+            )
 
         print(result.stdout.strip())
         return True
@@ -168,11 +182,13 @@ def update_stocks_index_html(stocks_data: List[Dict]) -> None:
 
     new_content = re.sub(pattern, replacement, content, flags=re.DOTALL)
 
-    index_file.write_text(new_content, encoding="utf-8")
+    with profile_phase("write"):
+        index_file.write_text(new_content, encoding="utf-8")
     print(f"✅ 更新了個股列表資料 ({len(stocks_data)} 檔個股)")
 
 
 def main() -> None:
+    parse_args()
     print("🚀 開始生成 GitHub Pages 內容...\n")
 
     # 確保目錄存在
@@ -25,3 +25,14 @@ def sample_date():
     """提供固定的測試日期"""
     from datetime import datetime
     return datetime(2025, 11, 20)
+
+
+@pytest.fixture
+def circuit_breaker(tmp_path, monkeypatch):
+    """以臨時目錄的斷路器取代共用斷路器"""
+    import common
+
+    breaker = common.CircuitBreaker(path=tmp_path / "circuit-breaker.sqlite")
+    monkeypatch.setattr(common, "_circuit_breaker", breaker)
+    yield breaker
+    breaker.close()
@@ -0,0 +1,169 @@
+"""
+backfill.py 單元測試
+"""
+
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import backfill as backfill_module
+from backfill import BackfillCheckpoint, backfill, chunk_key, split_date_range
+from price_store import load_prices, load_sync_state
+
+
+@pytest.fixture
+def market_data(tmp_path, monkeypatch):
+    """將價格資料庫導向臨時目錄"""
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+    return tmp_path
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    """以假資料取代下載，記錄每次呼叫"""
+    calls = []
+
+    def download(symbol, start, end):
+        calls.append((symbol, chunk_key((start, end))))
+        dates = pd.bdate_range(start, end, inclusive='left')
+        return pd.DataFrame(
+            {'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': 1.5, 'Volume': 100.0},
+            index=pd.DatetimeIndex(dates, name='Date'),
+        )
+
+    monkeypatch.setattr(backfill_module, "download_chunk", download)
+    return calls
+
+
+class TestSplitDateRange:
+    """測試 split_date_range 函數"""
+
+    def test_aligned_to_years(self):
+        """預設應對齊年初"""
+        chunks = split_date_range(datetime(2020, 6, 15), datetime(2022, 3, 1))
+        assert [chunk_key(c) for c in chunks] == [
+            "2020-06-15/2021-01-01",
+            "2021-01-01/2022-01-01",
+            "2022-01-01/2022-03-01",
+        ]
+
+    def test_months(self):
+        """應支援較小的分段"""
+        chunks = split_date_range(datetime(2020, 2, 1), datetime(2020, 12, 1), months=6)
+        assert [chunk_key(c) for c in chunks] == ["2020-02-01/2020-07-01", "2020-07-01/2020-12-01"]
+
+    def test_empty_range(self):
+        """起始日期不早於結束日期時應為空"""
+        assert split_date_range(datetime(2020, 1, 1), datetime(2020, 1, 1)) == []
+
+
+class TestBackfill:
+    """測試 backfill 函數"""
+
+    def test_writes_price_store(self, market_data, fake_download):
+        """應將所有區段寫入價格資料庫並更新同步狀態"""
+        checkpoint = market_data / "checkpoint.json"
+        assert backfill(["AAA", "BBB"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+
+        assert len(fake_download) == 4
+        assert len(load_prices("AAA")) == len(pd.bdate_range("2020-01-01", "2021-12-31"))
+        assert load_sync_state("AAA")['covered_from'] == "2020-01-01"
+
+        done = json.loads(checkpoint.read_text(encoding="utf-8"))['done']
+        assert sorted(done["BBB"]) == ["2020-01-01/2021-01-01", "2021-01-01/2022-01-01"]
+
+    def test_resume_skips_finished_chunks(self, market_data, fake_download, monkeypatch):
+        """中斷後重新執行不應重新下載已完成的區段"""
+        checkpoint = market_data / "checkpoint.json"
+        real_download = backfill_module.download_chunk
+
+        def failing(symbol, start, end):
+            if start.year == 2021:
+                raise ConnectionError("interrupted")
+            return real_download(symbol, start, end)
+
+        monkeypatch.setattr(backfill_module, "download_chunk", failing)
+        assert not backfill(["AAA"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+        assert load_sync_state("AAA") == {}
+
+        monkeypatch.setattr(backfill_module, "download_chunk", real_download)
+        fake_download.clear()
+        assert backfill(["AAA"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+        assert fake_download == [("AAA", "2021-01-01/2022-01-01")]
+
+    def test_empty_chunk_downloaded_again(self, market_data, fake_download, monkeypatch):
+        """上市後的區段回傳空資料（例如被限流）時不記錄完成，下次執行重新下載"""
+        checkpoint = market_data / "checkpoint.json"
+        real_download = backfill_module.download_chunk
+        empty = ["2021-01-01/2022-01-01"]
+
+        def flaky(symbol, start, end):
+            df = real_download(symbol, start, end)
+            if chunk_key((start, end)) in empty:
+                empty.clear()
+                return df.iloc[:0]
+            return df
+
+        monkeypatch.setattr(backfill_module, "download_chunk", flaky)
+        monkeypatch.setattr(backfill_module, "get_first_trade_date", lambda symbol: datetime(2015, 1, 2))
+        assert not backfill(["AAA"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+
+        fake_download.clear()
+        assert backfill(["AAA"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+        assert fake_download == [("AAA", "2021-01-01/2022-01-01")]
+        assert len(load_prices("AAA")) == len(pd.bdate_range("2020-01-01", "2021-12-31"))
+
+    def test_empty_chunk_before_listing_done(self, market_data, monkeypatch):
+        """整段在第一個交易日之前的空區段應記錄為完成"""
+        checkpoint = market_data / "checkpoint.json"
+        calls = []
+
+        def download(symbol, start, end):
+            calls.append(chunk_key((start, end)))
+            dates = pd.bdate_range(max(start, datetime(2021, 3, 1)), end, inclusive='left')
+            return pd.DataFrame(
+                {'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': 1.5, 'Volume': 100.0},
+                index=pd.DatetimeIndex(dates, name='Date'),
+            )
+
+        monkeypatch.setattr(backfill_module, "download_chunk", download)
+        monkeypatch.setattr(backfill_module, "get_first_trade_date", lambda symbol: datetime(2021, 3, 1))
+        assert backfill(["AAA"], datetime(2020, 1, 1), datetime(2022, 1, 1), checkpoint_path=checkpoint)
+        done = json.loads(checkpoint.read_text(encoding="utf-8"))['done']["AAA"]
+        assert done["2020-01-01/2021-01-01"] == 0
+
+    def test_empty_chunk_without_first_trade_date(self, market_data, fake_download, monkeypatch):
+        """無法取得第一個交易日時，空區段不記錄為完成"""
+        checkpoint = market_data / "checkpoint.json"
+        monkeypatch.setattr(backfill_module, "download_chunk", lambda symbol, start, end: pd.DataFrame())
+        monkeypatch.setattr(backfill_module, "get_first_trade_date", lambda symbol: None)
+        assert not backfill(["AAA"], datetime(2020, 1, 1), datetime(2021, 1, 1), checkpoint_path=checkpoint)
+        assert not BackfillCheckpoint(checkpoint).is_done("AAA", "2020-01-01/2021-01-01")
+
+    def test_restart_ignores_checkpoint(self, market_data, fake_download):
+        """--restart 應重新下載所有區段"""
+        checkpoint = market_data / "checkpoint.json"
+        backfill(["AAA"], datetime(2020, 1, 1), datetime(2021, 1, 1), checkpoint_path=checkpoint)
+        backfill(["AAA"], datetime(2020, 1, 1), datetime(2021, 1, 1), checkpoint_path=checkpoint, restart=True)
+        assert len(fake_download) == 2
+
+    def test_checkpoint_persists(self, market_data):
+        """進度應可由新的實例讀回"""
+        path = market_data / "checkpoint.json"
+        BackfillCheckpoint(path).mark_done("AAA", "2020-01-01/2021-01-01", 252)
+        assert BackfillCheckpoint(path).is_done("AAA", "2020-01-01/2021-01-01")
+
+
+class TestFirstTradeDate:
+    """測試 get_first_trade_date 函數"""
+
+    def test_formats(self, monkeypatch):
+        """應接受時區化的 Timestamp，沒有資料時為 None"""
+        metadata = {'firstTradeDate': pd.Timestamp("2021-03-01 09:30", tz="America/New_York")}
+        monkeypatch.setattr(backfill_module, "rate_limited_call", lambda endpoint, func, symbol=None: metadata)
+        assert backfill_module.get_first_trade_date("AAA") == datetime(2021, 3, 1, 9, 30)
+
+        metadata.clear()
+        assert backfill_module.get_first_trade_date("AAA") is None
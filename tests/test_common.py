@@ -2,7 +2,10 @@
 common.py 單元測試
 """
 
+import json
+import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from io import StringIO
@@ -16,12 +19,31 @@ from common import (
     create_argument_parser,
     setup_output_path,
     write_output,
+    write_output_if_changed,
     print_status,
     print_error,
     print_success,
     print_warning,
     validate_positive_int,
     generate_dated_filename,
+    run_bounded,
+    ResponseCache,
+    RateLimiter,
+    CircuitBreaker,
+    TokenBucket,
+    backoff_delay,
+    classify_error,
+    is_no_data_error,
+    parse_rate_limits,
+    format_sidecar,
+    write_sidecar,
+    load_sidecar,
+    to_json_value,
+    SIDECAR_SCHEMA_VERSION,
+    RunMetrics,
+    format_prometheus_metrics,
+    percentile,
+    write_run_metrics,
 )
 
 
@@ -171,6 +193,66 @@ class TestWriteOutput:
         assert result is True
         assert output_path.exists()
 
+    def test_write_chunks_to_file(self, temp_output_dir):
+        """文字片段應依序寫入檔案"""
+        output_path = temp_output_dir / "chunks.md"
+        result = write_output(iter(["a", "\nb", "\nc"]), output_path)
+
+        assert result is True
+        assert output_path.read_text() == "a\nb\nc"
+
+    def test_write_chunks_to_stdout(self, capsys):
+        """文字片段輸出到 stdout 時應與單一字串相同"""
+        write_output(iter(["a", "\nb"]), None)
+        assert capsys.readouterr().out == "a\nb\n"
+
+    def test_unchanged_content_not_rewritten(self, temp_output_dir):
+        """內容未變動時不應重寫檔案"""
+        output_path = temp_output_dir / "same.md"
+        assert write_output_if_changed("Content", output_path) is True
+        stat = output_path.stat()
+        os.utime(output_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10_000_000_000))
+        mtime = output_path.stat().st_mtime_ns
+
+        assert write_output_if_changed(iter(["Con", "tent"]), output_path) is False
+        assert output_path.stat().st_mtime_ns == mtime
+        assert write_output("Content", output_path) is True
+
+    def test_timestamp_only_change_skipped(self, temp_output_dir):
+        """只有更新時間或產生時間不同時應視為未變動"""
+        output_path = temp_output_dir / "report.md"
+        write_output("# 報告\n**更新時間**: 2025-11-20 09:00:00\n| a | 1 |", output_path)
+
+        assert write_output_if_changed("# 報告\n**更新時間**: 2025-11-20 10:30:00\n| a | 1 |", output_path) is False
+        assert "09:00:00" in output_path.read_text()
+        assert write_output_if_changed("# 報告\n**更新時間**: 2025-11-20 10:30:00\n| a | 2 |", output_path) is True
+
+        sidecar = temp_output_dir / "report.json"
+        write_output('{"generated_at": "2025-11-20T09:00:00", "records": []}', sidecar)
+        assert write_output_if_changed('{"generated_at": "2025-11-20T10:30:00", "records": []}', sidecar) is False
+
+    def test_changed_content_replaced(self, temp_output_dir):
+        """內容變動時應取代檔案且不留下暫存檔"""
+        output_path = temp_output_dir / "changed.md"
+        write_output("old", output_path)
+
+        assert write_output_if_changed("new", output_path) is True
+        assert output_path.read_text() == "new"
+        assert [p.name for p in temp_output_dir.iterdir()] == ["changed.md"]
+
+    def test_failed_write_keeps_original(self, temp_output_dir):
+        """寫入中途失敗時應保留原檔並清除暫存檔"""
+        output_path = temp_output_dir / "keep.md"
+        write_output("original", output_path)
+
+        def broken_chunks():
+            yield "partial"
+            raise IOError("disk full")
+
+        assert write_output_if_changed(broken_chunks(), output_path) is None
+        assert output_path.read_text() == "original"
+        assert [p.name for p in temp_output_dir.iterdir()] == ["keep.md"]
+
     def test_returns_false_on_error(self, temp_output_dir):
         """發生錯誤時應該返回 False"""
         # 嘗試寫入不存在的根目錄
@@ -263,3 +345,470 @@ class TestGenerateDatedFilename:
         # 檢查格式：prefix-YYYY-MM-DD.extension
         parts = result.split("-")
         assert len(parts) == 4  # AAPL, 2025, 11, 20.md
+
+
+class TestRunBounded:
+    """測試 run_bounded 函數"""
+
+    def test_preserves_input_order(self):
+        """結果應該依照輸入順序返回"""
+        def slow_square(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+
+        result = run_bounded(slow_square, [1, 2, 3, 4], workers=4)
+        assert result == [1, 4, 9, 16]
+
+    def test_exception_becomes_none(self, capsys):
+        """拋出例外的項目結果應為 None"""
+        def fail_on_two(n):
+            if n == 2:
+                raise ValueError("boom")
+            return n
+
+        result = run_bounded(fail_on_two, [1, 2, 3], workers=2)
+        assert result == [1, None, 3]
+        assert "boom" in capsys.readouterr().err
+
+    def test_timeout_does_not_block_others(self):
+        """卡住的項目逾時後不應拖住其他項目"""
+        reports = []
+
+        def maybe_hang(n):
+            if n == 0:
+                time.sleep(5)
+            return n
+
+        start = time.monotonic()
+        result = run_bounded(
+            maybe_hang, [0, 1, 2, 3], workers=1, timeout=0.2,
+            on_result=lambda i, item, value, timed_out: reports.append((item, timed_out)),
+        )
+
+        assert time.monotonic() - start < 2
+        assert result == [None, 1, 2, 3]
+        assert (0, True) in reports
+
+    def test_empty_items(self):
+        """空列表應返回空結果"""
+        assert run_bounded(lambda n: n, [], workers=3) == []
+
+
+class TestResponseCache:
+    """測試 ResponseCache 類別"""
+
+    def test_miss_then_hit(self, tmp_path):
+        """第二次請求應該命中快取"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {'price': 1.0}
+
+        assert cache.fetch("AAPL", "info", fetch) == {'price': 1.0}
+        assert cache.fetch("AAPL", "info", fetch) == {'price': 1.0}
+        assert len(calls) == 1
+        assert cache.stats["info"] == [1, 1]
+
+    def test_params_are_part_of_key(self, tmp_path):
+        """不同參數應該分開快取"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        cache.fetch("AAPL", "history", lambda: [1], period="1d")
+        cache.fetch("AAPL", "history", lambda: [2], period="2d")
+        assert cache.fetch("AAPL", "history", lambda: [3], period="1d") == [1]
+
+    def test_expired_entry_is_refetched(self, tmp_path):
+        """超過有效期限應重新請求"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite", ttl={"news": 0})
+        cache.fetch("AAPL", "news", lambda: ["old"])
+        time.sleep(0.01)
+        assert cache.fetch("AAPL", "news", lambda: ["new"]) == ["new"]
+
+    def test_empty_response_not_cached(self, tmp_path):
+        """空回應不應寫入快取"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        cache.fetch("AAPL", "news", lambda: [])
+        assert cache.fetch("AAPL", "news", lambda: ["a"]) == ["a"]
+
+    def test_lru_eviction(self, tmp_path):
+        """超過筆數上限時淘汰最久未使用的項目"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite", max_entries=2)
+        cache.fetch("A", "info", lambda: 1)
+        time.sleep(0.01)
+        cache.fetch("B", "info", lambda: 2)
+        time.sleep(0.01)
+        cache.fetch("A", "info", lambda: 0)  # 更新 A 的使用時間
+        time.sleep(0.01)
+        cache.fetch("C", "info", lambda: 3)
+
+        assert cache.get("A", "info", {}) == (True, 1)
+        assert cache.get("B", "info", {}) == (False, None)
+
+    def test_refresh_mode_skips_read(self, tmp_path):
+        """refresh 模式應忽略既有快取但更新內容"""
+        path = tmp_path / "cache.sqlite"
+        ResponseCache(path=path).fetch("AAPL", "info", lambda: "old")
+
+        refresh = ResponseCache(path=path, mode="refresh")
+        assert refresh.fetch("AAPL", "info", lambda: "new") == "new"
+        assert ResponseCache(path=path).get("AAPL", "info", {}) == (True, "new")
+
+    def test_off_mode_does_not_write(self, tmp_path):
+        """off 模式不應建立快取檔"""
+        path = tmp_path / "cache.sqlite"
+        ResponseCache(path=path, mode="off").fetch("AAPL", "info", lambda: 1)
+        assert not path.exists()
+
+    def test_invalid_mode_raises(self, tmp_path):
+        """未知模式應拋出錯誤"""
+        with pytest.raises(ScraperError):
+            ResponseCache(path=tmp_path / "cache.sqlite", mode="bogus")
+
+    def test_summary_reports_counts(self, tmp_path):
+        """統計文字應包含命中與未命中數"""
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        cache.fetch("AAPL", "info", lambda: 1)
+        cache.fetch("AAPL", "info", lambda: 1)
+        assert "命中 1" in cache.summary()
+        assert "未命中 1" in cache.summary()
+
+
+class TestRateLimiter:
+    """測試 RateLimiter 與相關函數"""
+
+    @pytest.fixture(autouse=True)
+    def no_backoff(self, monkeypatch):
+        """重試時不實際等待"""
+        import common
+        monkeypatch.setattr(common, "backoff_delay", lambda attempt: 0)
+
+    def test_retries_throttled_request(self):
+        """被限流的請求應重試直到成功"""
+        limiter = RateLimiter({'history': (1000, 10)})
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("429 Too Many Requests")
+            return "ok"
+
+        assert limiter.call('history', flaky) == "ok"
+        assert len(calls) == 3
+        assert limiter.stats['history']['throttled'] == 2
+        assert limiter.buckets['history'].rate == 250
+
+    def test_non_retryable_error_raised(self):
+        """不可重試的錯誤應立即拋出"""
+        limiter = RateLimiter()
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise KeyError("regularMarketPrice")
+
+        with pytest.raises(KeyError):
+            limiter.call('info', broken)
+        assert len(calls) == 1
+
+    def test_gives_up_after_attempts(self):
+        """重試次數用盡後應拋出最後的錯誤"""
+        limiter = RateLimiter({'news': (1000, 10)}, attempts=2)
+
+        def down():
+            raise ConnectionError("reset")
+
+        with pytest.raises(ConnectionError):
+            limiter.call('news', down)
+        assert limiter.stats['news']['requests'] == 3
+        assert limiter.stats['news']['failed'] == 1
+
+    def test_bucket_limits_rate(self):
+        """token 用完後應等待補充"""
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.03
+
+    def test_rate_recovers_after_success(self):
+        """錯誤率低時速率應逐步回升"""
+        bucket = TokenBucket(rate=10, capacity=1)
+        bucket.record(False, throttled=True)
+        assert bucket.rate == 5
+        bucket.outcomes.clear()
+        for _ in range(20):
+            bucket.record(True)
+        assert bucket.rate == 10
+
+    def test_classify_error(self):
+        """應區分限流、暫時性錯誤與其他錯誤"""
+        assert classify_error(Exception("Too Many Requests. Rate limited.")) == (True, True)
+        assert classify_error(TimeoutError()) == (True, False)
+        assert classify_error(ValueError("bad symbol")) == (False, False)
+
+    def test_is_no_data_error(self):
+        """只有確定沒有資料的錯誤才計入斷路器"""
+        assert is_no_data_error(Exception("$DEAD: possibly delisted; no price data found"))
+        assert not is_no_data_error(Exception("Too Many Requests. Rate limited."))
+        assert not is_no_data_error(TimeoutError("timed out"))
+        assert not is_no_data_error(ValueError("bad symbol"))
+
+    def test_backoff_delay_bounded(self):
+        """退避秒數應在上限內"""
+        for attempt in range(10):
+            assert 0 <= backoff_delay(attempt, base=1, maximum=5) <= 5
+
+    def test_parse_rate_limits(self):
+        """應解析速率與突發容量"""
+        assert parse_rate_limits("history=8, info=1.5:3") == {'history': (8.0, 16.0), 'info': (1.5, 3.0)}
+        with pytest.raises(ScraperError):
+            parse_rate_limits("history=fast")
+
+
+class TestCircuitBreaker:
+    """測試 CircuitBreaker 類別"""
+
+    @pytest.fixture
+    def breaker(self, tmp_path):
+        breaker = CircuitBreaker(
+            path=tmp_path / "breaker.sqlite",
+            threshold=2,
+            negative_ttl=60,
+            base_cooldown=3600,
+            max_cooldown=4 * 3600,
+        )
+        yield breaker
+        breaker.close()
+
+    def test_unknown_symbol_allowed(self, breaker):
+        """沒有失敗紀錄的代碼應放行"""
+        assert breaker.allow("AAPL")
+
+    def test_failure_negative_cached(self, breaker):
+        """失敗後應在負向快取期間略過"""
+        breaker.record_failure("^TPX", "無法取得資料")
+        assert not breaker.allow("^TPX")
+        assert breaker.skipped == ["^TPX"]
+
+    def test_cooldown_grows_and_caps(self, breaker):
+        """斷路後冷卻時間應倍增並有上限"""
+        assert breaker.cooldown(1) == 60
+        assert breaker.cooldown(2) == 3600
+        assert breaker.cooldown(3) == 7200
+        assert breaker.cooldown(10) == 4 * 3600
+
+    def test_probe_after_cooldown(self, breaker):
+        """冷卻結束後應放行探測，成功則清除紀錄"""
+        breaker.record_failure("DEAD", "無法取得資料")
+        breaker._connect().execute("UPDATE failures SET blocked_until = 0")
+        assert breaker.allow("DEAD")
+
+        breaker.record_success("DEAD")
+        assert breaker.cooling_down() == []
+
+    def test_persists_across_instances(self, breaker, tmp_path):
+        """失敗紀錄應跨執行保留"""
+        breaker.record_failure("DEAD", "無法取得資料")
+        breaker.record_failure("DEAD", "無法取得資料")
+        other = CircuitBreaker(path=tmp_path / "breaker.sqlite", threshold=2)
+        entries = other.cooling_down()
+        other.close()
+        assert [(e['symbol'], e['failures']) for e in entries] == [("DEAD", 2)]
+
+    def test_bypass(self, breaker):
+        """bypass 時應一律放行"""
+        breaker.record_failure("DEAD", "無法取得資料")
+        breaker.bypass = True
+        assert breaker.allow("DEAD")
+
+    def test_report(self, breaker):
+        """報告應列出冷卻中的代碼與原因"""
+        assert breaker.report() == "冷卻中的代碼: 無"
+        breaker.record_failure("^TPX", "無法取得資料")
+        breaker.record_failure("^TPX", "無法取得資料")
+        report = breaker.report()
+        assert "^TPX" in report
+        assert "斷路" in report
+
+
+class TestSidecar:
+    """測試結構化輸出"""
+
+    RECORDS = [
+        {'symbol': "^GSPC", 'close': 5000.5, 'change_pct': 0.25, 'date': datetime(2025, 11, 20)},
+        {'symbol': "^N225", 'close': 38000.0, 'change_pct': float('nan'), 'date': None},
+        {'symbol': "^TWII", 'close': 22000.0, 'change_pct': float('inf'), 'date': None},
+    ]
+
+    def test_to_json_value(self):
+        """應轉換時間、numpy 純量、NaN 與無限大"""
+        np = pytest.importorskip("numpy")
+        assert to_json_value(np.float64(1.5)) == 1.5
+        assert to_json_value(np.int64(3)) == 3
+        assert to_json_value(float('nan')) is None
+        assert to_json_value(np.float64('-inf')) is None
+        assert to_json_value(datetime(2025, 11, 20)) == "2025-11-20T00:00:00"
+
+    def test_json_round_trip(self, temp_output_dir):
+        """JSON 輸出應可讀回相同的記錄"""
+        report = temp_output_dir / "global-indices-2025-11-20.md"
+        assert write_sidecar(self.RECORDS, report, "global-indices", "json")
+
+        records = load_sidecar(temp_output_dir / "global-indices-2025-11-20.json", schema="global-indices")
+        assert records[0] == {'symbol': "^GSPC", 'close': 5000.5, 'change_pct': 0.25, 'date': "2025-11-20T00:00:00"}
+        assert records[1]['change_pct'] is None
+        assert records[2]['change_pct'] is None
+
+    def test_strict_json_with_generated_at(self):
+        """輸出應為嚴格的 JSON，並在格式版本旁帶有產生時間"""
+        text = format_sidecar(self.RECORDS, "global-indices", generated_at="2025-11-20T10:00:00")
+        assert "NaN" not in text and "Infinity" not in text
+        document = json.loads(text, parse_constant=lambda name: pytest.fail(f"非標準的 JSON 常數 {name}"))
+        assert document['generated_at'] == "2025-11-20T10:00:00"
+        assert list(document)[:3] == ['schema', 'schema_version', 'generated_at']
+
+    def test_generated_at_only_change_not_rewritten(self, temp_output_dir):
+        """只有產生時間不同時不重寫檔案"""
+        report = temp_output_dir / "report.md"
+        path = temp_output_dir / "report.json"
+        path.write_text(format_sidecar(self.RECORDS, "global-indices", generated_at="2025-11-20T09:00:00"), encoding="utf-8")
+        assert write_sidecar(self.RECORDS, report, "global-indices")
+        assert '"generated_at": "2025-11-20T09:00:00"' in path.read_text(encoding="utf-8")
+
+    def test_ndjson_one_record_per_line(self, temp_output_dir):
+        """NDJSON 每行應為一筆帶格式版本的記錄"""
+        text = format_sidecar(self.RECORDS, "global-indices", "ndjson")
+        lines = text.splitlines()
+        assert len(lines) == 3
+        assert f'"schema_version": {SIDECAR_SCHEMA_VERSION}' in lines[0]
+        assert '"generated_at": ' in lines[0]
+
+        report = temp_output_dir / "report.md"
+        write_sidecar(self.RECORDS, report, "global-indices", "ndjson")
+        records = load_sidecar(temp_output_dir / "report.ndjson")
+        assert [r['symbol'] for r in records] == ["^GSPC", "^N225", "^TWII"]
+        assert 'schema' not in records[0] and 'generated_at' not in records[0]
+
+    def test_output_is_deterministic(self):
+        """相同記錄與產生時間應產生相同內容"""
+        generated_at = "2025-11-20T10:00:00"
+        assert format_sidecar(self.RECORDS, "x", generated_at=generated_at) == format_sidecar(self.RECORDS, "x", generated_at=generated_at)
+
+    def test_schema_mismatch_raises(self, temp_output_dir):
+        """格式名稱或版本不符時應拋出錯誤"""
+        path = temp_output_dir / "data.json"
+        path.write_text('{"schema": "global-indices", "schema_version": 999, "records": []}')
+        with pytest.raises(ScraperError):
+            load_sidecar(path)
+
+        write_sidecar(self.RECORDS, temp_output_dir / "data.md", "global-indices")
+        with pytest.raises(ScraperError):
+            load_sidecar(path, schema="holdings-prices")
+
+
+class TestRunMetrics:
+    """測試 RunMetrics 與指標輸出"""
+
+    @pytest.fixture
+    def metrics(self, monkeypatch):
+        """以新的指標實例取代共用實例"""
+        import common
+        metrics = RunMetrics(job="test-job")
+        monkeypatch.setattr(common, "_run_metrics", metrics)
+        monkeypatch.setattr(common, "backoff_delay", lambda attempt: 0)
+        return metrics
+
+    def test_percentile(self):
+        """應以最近排名法計算百分位數"""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile([3.0], 99) == 3.0
+
+    def test_rate_limiter_records_outcomes(self, metrics):
+        """請求的結果與重試次數應依代碼與端點記錄"""
+        limiter = RateLimiter({'history': (1000, 10)}, attempts=1)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise Exception("503 Service Unavailable")
+            return "ok"
+
+        limiter.call('history', flaky, symbol="AAPL")
+        with pytest.raises(KeyError):
+            limiter.call('history', lambda: {}["x"], symbol="TSLA")
+
+        snapshot = metrics.snapshot()
+        assert snapshot['symbols']["AAPL"]['history']['ok'] == 1
+        assert snapshot['symbols']["AAPL"]['history']['retries'] == 1
+        assert snapshot['symbols']["TSLA"]['history']['error'] == 1
+        assert snapshot['endpoints']['history']['latency']['count'] == 2
+
+    def test_cache_hit_recorded(self, metrics, tmp_path, monkeypatch):
+        """cached_fetch 命中快取時應記錄為 cache_hit，不計入延遲分佈"""
+        import common
+        monkeypatch.setattr(common, "_response_cache", ResponseCache(path=tmp_path / "cache.sqlite"))
+        common.cached_fetch("AAPL", "info", lambda: {'price': 1.0})
+        common.cached_fetch("AAPL", "info", lambda: {'price': 1.0})
+
+        stats = metrics.snapshot()['symbols']["AAPL"]['info']
+        assert (stats['ok'], stats['cache_hit']) == (1, 1)
+        assert stats['latency']['count'] == 1
+
+    def test_cached_lookup_records_hit(self, metrics, tmp_path, monkeypatch):
+        """cached_lookup 只查快取，命中時記錄為 cache_hit，未命中時不記錄"""
+        import common
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        monkeypatch.setattr(common, "_response_cache", cache)
+        assert common.cached_lookup("AAPL", "history", period='2d') == (False, None)
+        cache.set("AAPL", "history", {'period': '2d'}, {'close': 1.0})
+        assert common.cached_lookup("AAPL", "history", period='2d') == (True, {'close': 1.0})
+
+        stats = metrics.snapshot()['symbols']["AAPL"]['history']
+        assert (stats['calls'], stats['cache_hit']) == (1, 1)
+
+    def test_prometheus_histogram(self, metrics):
+        """textfile 應含累計直方圖與百分位數"""
+        for seconds in (0.01, 0.2, 3.0):
+            metrics.record("^GSPC", "history", "ok", seconds)
+        metrics.record(None, "download", "error", 0.3)
+        text = format_prometheus_metrics(metrics.snapshot())
+
+        assert 'scraper_request_duration_seconds_bucket{scraper="test-job",endpoint="history",le="0.05"} 1' in text
+        assert 'scraper_request_duration_seconds_bucket{scraper="test-job",endpoint="history",le="5.0"} 3' in text
+        assert 'scraper_request_duration_seconds_bucket{scraper="test-job",endpoint="history",le="+Inf"} 3' in text
+        assert 'scraper_request_duration_quantile_seconds{scraper="test-job",endpoint="history",quantile="0.5"} 0.2' in text
+        assert 'scraper_symbol_requests_total{scraper="test-job",symbol="*",endpoint="download",outcome="error"} 1' in text
+        assert text.endswith("\n")
+
+    def test_write_run_metrics(self, metrics, tmp_path):
+        """應輸出 JSON 與 Prometheus textfile，沒有請求時不輸出"""
+        assert write_run_metrics(directory=tmp_path) is None
+
+        metrics.record("AAPL", "info", "ok", 0.5)
+        json_path, prom_path = write_run_metrics(directory=tmp_path)
+        assert json_path.name.startswith("test-job-")
+        assert prom_path.name == "test-job.prom"
+
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        assert data['schema'] == "scraper-metrics"
+        assert data['total']['ok'] == 1
+        assert data['symbols']["AAPL"]['info']['latency']['p99'] == 0.5
+
+    def test_old_metrics_pruned(self, metrics, tmp_path):
+        """輸出時應刪除超過保留天數的 JSON 檔，保留 textfile 與其他檔案"""
+        old = tmp_path / "fetch_all-20200101-000000.json"
+        recent = tmp_path / f"fetch_all-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        other = tmp_path / "notes.json"
+        for path in (old, recent, other):
+            path.write_text("{}", encoding="utf-8")
+
+        metrics.record("AAPL", "info", "ok", 0.5)
+        json_path, prom_path = write_run_metrics(directory=tmp_path)
+        assert not old.exists()
+        assert recent.exists() and other.exists()
+        assert json_path.exists() and prom_path.exists()
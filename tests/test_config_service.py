@@ -0,0 +1,156 @@
+"""
+config_service.py 單元測試
+"""
+
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import config_service
+from common import ScraperError
+from config_service import (
+    get_global_indices,
+    get_holdings_groups,
+    get_indices,
+    get_regions,
+    load_config,
+)
+
+
+INDICES_YAML = """
+global_indices:
+  日本:
+    日經225:
+      symbol: "^N225"
+      fetch_news: true
+  美國:
+    S&P 500:
+      symbol: "^GSPC"
+    Russell 2000: "^RUT"
+"""
+
+HOLDINGS_YAML = """
+holdings:
+  核心持倉:
+    Tesla:
+      symbol: "TSLA"
+      enabled: true
+  空群組:
+watchlist:
+"""
+
+
+@pytest.fixture
+def indices_file(tmp_path, monkeypatch):
+    """建立測試用 indices.yaml 並將快取導向臨時目錄"""
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "indices.yaml"
+    path.write_text(INDICES_YAML, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def holdings_file(tmp_path, monkeypatch):
+    """建立測試用 holdings.yaml 並將快取導向臨時目錄"""
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "holdings.yaml"
+    path.write_text(HOLDINGS_YAML, encoding="utf-8")
+    return path
+
+
+class TestLoadConfig:
+    """測試 load_config 函數"""
+
+    def test_parsed_once_per_process(self, indices_file):
+        """相同檔案應回傳同一份結果"""
+        assert load_config('indices', indices_file) is load_config('indices', indices_file)
+
+    def test_binary_cache_reused(self, indices_file, tmp_path, monkeypatch):
+        """行程內快取清除後應從 pickle 快取載入"""
+        load_config('indices', indices_file)
+        cache_files = list((tmp_path / "cache" / "config").glob("*.pickle"))
+        assert len(cache_files) == 1
+
+        monkeypatch.setattr(config_service, "_configs", {})
+        monkeypatch.setitem(sys.modules, "yaml", None)  # 若重新解析 YAML 會失敗
+        assert 'global_indices' in load_config('indices', indices_file)
+
+    def test_reloads_when_file_changes(self, indices_file):
+        """設定檔修改後應重新解析"""
+        load_config('indices', indices_file)
+
+        indices_file.write_text("global_indices:\n  歐洲:\n    DAX: '^GDAXI'\n", encoding="utf-8")
+        stat = indices_file.stat()
+        os.utime(indices_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert get_regions(indices_file) == ["歐洲"]
+
+    def test_missing_file_raises(self, tmp_path):
+        """設定檔不存在時應拋出錯誤"""
+        with pytest.raises(ScraperError):
+            load_config('indices', tmp_path / "missing.yaml")
+
+    def test_invalid_schema_raises(self, indices_file):
+        """缺少 symbol 的項目應拋出錯誤"""
+        indices_file.write_text("global_indices:\n  美國:\n    S&P 500:\n      fetch_news: true\n", encoding="utf-8")
+        with pytest.raises(ScraperError):
+            load_config('indices', indices_file)
+
+    def test_corrupt_cache_ignored(self, indices_file, tmp_path, monkeypatch):
+        """損毀的快取檔應被忽略並重新解析"""
+        load_config('indices', indices_file)
+        for cache_file in (tmp_path / "cache" / "config").glob("*.pickle"):
+            cache_file.write_bytes(b"not a pickle")
+
+        monkeypatch.setattr(config_service, "_configs", {})
+        config = load_config('indices', indices_file)
+        assert 'global_indices' in config
+
+        cache_file = next((tmp_path / "cache" / "config").glob("*.pickle"))
+        assert pickle.loads(cache_file.read_bytes())['config'] == config
+
+
+class TestViews:
+    """測試設定檔的各種檢視"""
+
+    def test_global_indices_normalized(self, indices_file):
+        """舊格式應轉為 {'symbol': ...}"""
+        indices = get_global_indices(indices_file)
+        assert list(indices) == ["日本", "美國"]
+        assert indices["美國"]["Russell 2000"] == {'symbol': "^RUT"}
+
+    def test_get_indices(self, indices_file):
+        """應列出指數並可依區域篩選"""
+        assert [i['symbol'] for i in get_indices(path=indices_file)] == ["^N225", "^GSPC", "^RUT"]
+        us = get_indices("美國", indices_file)
+        assert [i['name'] for i in us] == ["S&P 500", "Russell 2000"]
+        assert us[0]['fetch_news'] is False
+
+    def test_holdings_groups(self, holdings_file):
+        """空群組應為空字典"""
+        groups = get_holdings_groups(path=holdings_file)
+        assert groups == {"核心持倉": {"Tesla": {'symbol': "TSLA", 'enabled': True}}, "空群組": {}}
+        assert get_holdings_groups('watchlist', holdings_file) == {}
+
+
+def test_import_does_not_read_config(tmp_path):
+    """匯入爬蟲模組不應讀取設定檔或建立快取"""
+    scrapers_dir = Path(__file__).parent.parent / "src" / "scrapers"
+    code = (
+        "import builtins, sys\n"
+        "opened = []\n"
+        "real_open = builtins.open\n"
+        "def tracking_open(file, *args, **kwargs):\n"
+        "    opened.append(str(file))\n"
+        "    return real_open(file, *args, **kwargs)\n"
+        "builtins.open = tracking_open\n"
+        "import fetch_global_indices, fetch_holdings_prices, fetch_all_news, fetch_all\n"
+        "assert not [f for f in opened if f.endswith('.yaml') or 'config' in f], opened\n"
+    )
+    env = dict(os.environ, CACHE_DIR=str(tmp_path / "cache"))
+    subprocess.run([sys.executable, "-c", code], cwd=scrapers_dir, env=env, check=True)
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,87 @@
+"""
+fetch_all.py 單元測試
+"""
+
+import sys
+import time
+
+import pytest
+
+import fetch_all
+from fetch_all import fetch_all as run_fetch_all, run_stage
+
+
+def fail(message):
+    """拋出一般例外的階段"""
+    raise RuntimeError(message)
+
+
+class TestRunStage:
+    """測試 run_stage 函數"""
+
+    @pytest.mark.parametrize("result, success", [(True, True), (False, True), (None, False)])
+    def test_result(self, result, success):
+        """只有 None 視為失敗，False 只表示內容未變動"""
+        assert run_stage('global', lambda: result)[:2] == ('global', success)
+
+    @pytest.mark.parametrize("code, success", [(0, True), (None, True), (1, False), (True, False)])
+    def test_safe_exit(self, code, success):
+        """階段內呼叫 sys.exit 時依結束碼判斷，不結束整個行程"""
+        assert run_stage('holdings', lambda: sys.exit(code))[1] is success
+
+    def test_exception(self, capsys):
+        """例外只視為該階段失敗"""
+        name, success, seconds = run_stage('news', lambda: fail("boom"))
+        assert (name, success) == ('news', False)
+        assert seconds >= 0
+        assert "市場新聞 階段發生錯誤: boom" in capsys.readouterr().err
+
+
+class TestFetchAll:
+    """測試 fetch_all 函數"""
+
+    @pytest.fixture
+    def stages(self, monkeypatch):
+        """以假的階段函數取代三個爬蟲，behavior[name] 為階段要執行的函數"""
+        behavior = {
+            'global': lambda: True,
+            'holdings': lambda: True,
+            'news': lambda: True,
+        }
+        calls = []
+
+        def stage(name):
+            def run(**kwargs):
+                calls.append(name)
+                return behavior[name]()
+            return run
+
+        monkeypatch.setattr(fetch_all, "get_shared_session", lambda: None)
+        monkeypatch.setattr(fetch_all, "fetch_global_indices", stage('global'))
+        monkeypatch.setattr(fetch_all, "fetch_holdings_prices", stage('holdings'))
+        monkeypatch.setattr(fetch_all, "fetch_all_news", stage('news'))
+        behavior['calls'] = calls
+        return behavior
+
+    def test_failure_does_not_abort_others(self, stages):
+        """單一階段拋出例外或 safe_exit(False) 時其他階段仍執行"""
+        stages['global'] = lambda: fail("boom")
+        stages['holdings'] = lambda: sys.exit(1)
+        results = run_fetch_all()
+        assert [(name, success) for name, success, _ in results] == [
+            ('global', False), ('holdings', False), ('news', True),
+        ]
+
+    def test_results_in_stage_order(self, stages):
+        """並行執行時結果仍依 STAGES 的順序，與完成順序無關"""
+        stages['global'] = lambda: time.sleep(0.1) or False
+        stages['holdings'] = lambda: time.sleep(0.05) or True
+        results = run_fetch_all()
+        assert [name for name, _, _ in results] == list(fetch_all.STAGES)
+        assert all(success for _, success, _ in results)
+
+    def test_selected_stages_sequential(self, stages):
+        """只執行指定的階段，依 STAGES 的順序"""
+        results = run_fetch_all(stages=['news', 'global'], sequential=True)
+        assert [name for name, _, _ in results] == ['global', 'news']
+        assert stages['calls'] == ['global', 'news']
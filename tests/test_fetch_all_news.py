@@ -0,0 +1,118 @@
+"""
+fetch_all_news.py 單元測試
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import fetch_all_news
+from fetch_all_news import fetch_all_news as run_fetch_all_news, ingest_all_news
+
+
+def make_record(article_id, title, pub_date="2025-11-20T10:00:00Z"):
+    """產生正規化後的文章"""
+    return {
+        'id': article_id, 'title': title, 'summary': f"{title} summary", 'publisher': "Reuters",
+        'published_at': pub_date, 'url': f"https://example.com/{article_id}", 'content_type': "STORY",
+    }
+
+
+def make_items(*symbols):
+    """產生 symbol_universe 格式的代碼項目"""
+    return [{'symbol': symbol, 'name': f"{symbol} Inc.", 'type': 'stock'} for symbol in symbols]
+
+
+@pytest.fixture
+def news(tmp_path, monkeypatch):
+    """
+    以假的新聞來源取代 get_news / store_news
+
+    failures 中的代碼會拋出例外，new_counts[symbol] 為 store_news 回報的新文章數（預設 1），
+    active / peak 記錄同時進行的請求數。
+    """
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setattr(fetch_all_news, "get_shared_session", lambda: None)
+    source = {'failures': set(), 'new_counts': {}, 'delay': 0.0, 'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def get_news(symbol, limit, session=None):
+        with lock:
+            source['active'] += 1
+            source['peak'] = max(source['peak'], source['active'])
+        try:
+            time.sleep(source['delay'])
+            if symbol in source['failures']:
+                raise ConnectionError(f"{symbol}: connection reset")
+            return [{'id': f"{symbol}-1"}]
+        finally:
+            with lock:
+                source['active'] -= 1
+
+    def store_news(symbol, raw, day=None, incremental=False):
+        return [make_record(f"{symbol}-1", f"{symbol} earnings")], source['new_counts'].get(symbol, 1)
+
+    monkeypatch.setattr(fetch_all_news, "get_news", get_news)
+    monkeypatch.setattr(fetch_all_news, "store_news", store_news)
+    source['news_dir'] = fetch_all_news.get_data_directory(subdir="News")
+    return source
+
+
+class TestIngestAllNews:
+    """測試 ingest_all_news / ingest_news_item"""
+
+    def test_semaphore_limits_concurrency(self, news):
+        """同時進行的請求數不應超過 concurrency"""
+        news['delay'] = 0.05
+        result = asyncio.run(ingest_all_news(make_items("A", "B", "C", "D", "E", "F"), concurrency=2))
+        assert result == (6, 0, 6, 0)
+        assert news['peak'] == 2
+
+    def test_failure_does_not_cancel_others(self, news):
+        """單一項目失敗不應中斷其他項目"""
+        news['failures'] = {"BAD"}
+        success, failed, new_total, unchanged = asyncio.run(ingest_all_news(make_items("AAA", "BAD", "CCC")))
+        assert (success, failed) == (2, 1)
+        written = sorted(path.name.split("-")[0] for path in news['news_dir'].iterdir())
+        assert written == ["AAA", "CCC"]
+
+    def test_incremental_skips_write(self, news):
+        """增量模式下沒有新文章的項目不寫檔"""
+        news['new_counts'] = {"AAA": 0}
+        result = asyncio.run(ingest_all_news(make_items("AAA", "BBB"), incremental=True))
+        assert result == (2, 0, 1, 1)
+        assert [path.name.split("-")[0] for path in news['news_dir'].iterdir()] == ["BBB"]
+
+
+class FakeIndex:
+    """不做任何事的新聞索引"""
+
+    def update(self):
+        return {'indexed': 0, 'articles': 0}
+
+
+class TestFetchAllNews:
+    """測試 fetch_all_news 的回傳值"""
+
+    @pytest.fixture
+    def universe(self, news, monkeypatch):
+        """以固定的代碼總表執行，略過新聞彙整與索引"""
+        items = make_items("AAA", "BBB")
+        monkeypatch.setattr(fetch_all_news, "load_universe", lambda: {})
+        monkeypatch.setattr(fetch_all_news, "query_symbols", lambda universe, fetch_news: items)
+        monkeypatch.setattr(fetch_all_news, "write_news_digest", lambda verbose=False: False)
+        monkeypatch.setattr(fetch_all_news, "get_news_index", lambda: FakeIndex())
+        return news
+
+    def test_failure_returns_none(self, universe):
+        """有項目失敗時回傳 None"""
+        universe['failures'] = {"BBB"}
+        assert run_fetch_all_news() is None
+
+    def test_unchanged_returns_false(self, universe):
+        """增量模式沒有新文章時回傳 False（不是失敗）"""
+        universe['new_counts'] = {"AAA": 0, "BBB": 0}
+        assert run_fetch_all_news(incremental=True) is False
+        assert run_fetch_all_news() is True
@@ -0,0 +1,152 @@
+"""
+fetch_global_indices.py 單元測試
+"""
+
+import pandas as pd
+import pytest
+
+import common
+import fetch_global_indices
+from common import ResponseCache, RunMetrics, split_batch_history
+from fetch_global_indices import fetch_index_data, fetch_indices_batch
+
+
+def make_history(closes=(100.0, 101.0)):
+    """建立測試用的最近兩天資料"""
+    index = pd.DatetimeIndex(pd.bdate_range("2025-11-19", periods=len(closes)), name='Date')
+    return pd.DataFrame(
+        {'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1000.0},
+        index=index,
+    )
+
+
+@pytest.fixture
+def no_cache(tmp_path, monkeypatch):
+    """不使用回應快取"""
+    cache = ResponseCache(path=tmp_path / "cache.sqlite", mode='off')
+    monkeypatch.setattr(fetch_global_indices, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(common, "_response_cache", cache)
+    yield cache
+    cache.close()
+
+
+def make_batch(frames):
+    """以 {symbol: DataFrame} 組成 yf.download(group_by='ticker') 格式的多層欄位資料"""
+    return pd.concat(frames, axis=1)
+
+
+def stub_single(monkeypatch, responses):
+    """以 responses[symbol]（DataFrame 或例外）取代逐一下載，回傳被請求的代碼"""
+    requested = []
+
+    def fetch(symbol, endpoint, fetch_func, **params):
+        requested.append(symbol)
+        response = responses[symbol]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(fetch_global_indices, "cached_fetch", fetch)
+    return requested
+
+
+class TestSplitBatchHistory:
+    """測試 split_batch_history 函數"""
+
+    def test_multiindex_missing_and_empty(self):
+        """缺少的代碼與全為 NaN 的代碼不應出現在結果中，各代碼的空白列應移除"""
+        gspc = make_history((100.0, 101.0, 102.0))
+        gspc.iloc[1] = float('nan')
+        n225 = make_history((1.0, 2.0, 3.0)) * float('nan')
+        df = make_batch({"^GSPC": gspc, "^N225": n225})
+
+        frames = split_batch_history(df, ["^GSPC", "^N225", "^MISSING"])
+        assert list(frames) == ["^GSPC"]
+        assert frames["^GSPC"]['Close'].tolist() == [100.0, 102.0]
+
+    def test_single_symbol_flat_columns(self):
+        """單一代碼沒有多層欄位時仍應拆出"""
+        frames = split_batch_history(make_history(), ["^GSPC"])
+        assert frames["^GSPC"]['Close'].tolist() == [100.0, 101.0]
+
+    def test_empty(self):
+        """沒有資料時回傳空字典"""
+        assert split_batch_history(pd.DataFrame(), ["^GSPC"]) == {}
+        assert split_batch_history(None, ["^GSPC"]) == {}
+
+
+class TestBatchFallback:
+    """批次下載失敗或缺少代碼時逐一重試"""
+
+    def test_batch_raises_falls_back_per_symbol(self, circuit_breaker, no_cache, monkeypatch):
+        """整批下載拋出例外時，應逐一下載每個代碼"""
+        def download(endpoint, func, symbol=None):
+            raise ConnectionError("connection reset")
+
+        monkeypatch.setattr(fetch_global_indices, "rate_limited_call", download)
+        requested = stub_single(monkeypatch, {"^GSPC": make_history(), "^N225": make_history((200.0, 198.0))})
+
+        records, failed = fetch_indices_batch([("S&P 500", "^GSPC"), ("Nikkei 225", "^N225")])
+        assert requested == ["^GSPC", "^N225"]
+        assert failed == []
+        assert sorted(records) == ["^GSPC", "^N225"]
+
+    def test_only_missing_symbols_refetched(self, circuit_breaker, no_cache, monkeypatch):
+        """整批下載缺少的代碼才逐一重試"""
+        batch = make_batch({"^GSPC": make_history()})
+        monkeypatch.setattr(fetch_global_indices, "rate_limited_call", lambda endpoint, func, symbol=None: batch)
+        requested = stub_single(monkeypatch, {"^N225": make_history((200.0, 198.0))})
+
+        records, failed = fetch_indices_batch([("S&P 500", "^GSPC"), ("Nikkei 225", "^N225")])
+        assert requested == ["^N225"]
+        assert failed == []
+        assert sorted(records) == ["^GSPC", "^N225"]
+
+    def test_cache_hits_recorded(self, circuit_breaker, no_cache, monkeypatch):
+        """從快取取得的代碼應記錄到請求指標，且不重新下載"""
+        metrics = RunMetrics(job="test-job")
+        monkeypatch.setattr(common, "_run_metrics", metrics)
+        no_cache.mode = 'normal'
+        no_cache.set("^GSPC", 'history', {'period': '2d'}, make_history())
+        batch = make_batch({"^N225": make_history((200.0, 198.0))})
+        downloaded = []
+
+        def download(endpoint, func, symbol=None):
+            downloaded.append(endpoint)
+            return batch
+
+        monkeypatch.setattr(fetch_global_indices, "rate_limited_call", download)
+        records, failed = fetch_indices_batch([("S&P 500", "^GSPC"), ("Nikkei 225", "^N225")])
+        assert sorted(records) == ["^GSPC", "^N225"]
+        assert downloaded == ['download']
+        assert metrics.snapshot()['symbols']["^GSPC"]['history']['cache_hit'] == 1
+
+
+class TestNegativeCache:
+    """只有確定沒有資料才計入斷路器"""
+
+    def test_empty_frame_counts(self, circuit_breaker, monkeypatch):
+        """空的歷史資料應計入負向快取"""
+        stub_single(monkeypatch, {"^DEAD": pd.DataFrame()})
+        assert fetch_index_data("^DEAD", "Dead") is None
+        assert not circuit_breaker.allow("^DEAD")
+
+    def test_retryable_error_not_counted(self, circuit_breaker, monkeypatch):
+        """限流等可重試的錯誤不應計入"""
+        stub_single(monkeypatch, {"^GSPC": Exception("Too Many Requests. Rate limited.")})
+        assert fetch_index_data("^GSPC", "S&P 500") is None
+        assert circuit_breaker.allow("^GSPC")
+
+    def test_batch_failure_not_counted(self, circuit_breaker, no_cache, monkeypatch):
+        """整批下載失敗且逐一重試遇到連線錯誤時不應計入"""
+        def download(endpoint, func, symbol=None):
+            raise ConnectionError("connection reset")
+
+        monkeypatch.setattr(fetch_global_indices, "rate_limited_call", download)
+        stub_single(monkeypatch, {"^GSPC": ConnectionError("connection reset"), "^DEAD": pd.DataFrame()})
+
+        records, failed = fetch_indices_batch([("S&P 500", "^GSPC"), ("Dead", "^DEAD")])
+        assert records == {}
+        assert failed == [("S&P 500", "^GSPC"), ("Dead", "^DEAD")]
+        assert circuit_breaker.allow("^GSPC")
+        assert not circuit_breaker.allow("^DEAD")
@@ -0,0 +1,279 @@
+"""
+fetch_holdings_prices.py 單元測試
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import common
+import fetch_holdings_prices
+from common import ResponseCache
+from fetch_holdings_prices import (
+    build_quote,
+    fetch_with_breaker,
+    get_fundamentals,
+    load_fundamentals_snapshot,
+    watch_holdings_prices,
+)
+
+
+class TestFetchWithBreaker:
+    """只有確定沒有資料才計入斷路器"""
+
+    def test_no_data_counts(self, circuit_breaker):
+        """沒有資料時應計入負向快取"""
+        assert fetch_with_breaker("DEAD", lambda symbol: None) is None
+        assert not circuit_breaker.allow("DEAD")
+
+    def test_delisted_error_counts(self, circuit_breaker):
+        """已下市的錯誤應計入"""
+        def fetch(symbol):
+            raise Exception(f"${symbol}: possibly delisted; no price data found")
+
+        assert fetch_with_breaker("DEAD", fetch) is None
+        assert not circuit_breaker.allow("DEAD")
+
+    def test_retryable_error_not_counted(self, circuit_breaker):
+        """限流或逾時不應計入"""
+        def fetch(symbol):
+            raise TimeoutError("timed out")
+
+        assert fetch_with_breaker("AAPL", fetch) is None
+        assert circuit_breaker.allow("AAPL")
+
+    def test_success_clears(self, circuit_breaker):
+        """成功時應清除失敗紀錄"""
+        circuit_breaker.record_failure("AAPL", "無法獲取價格")
+        circuit_breaker._connect().execute("UPDATE failures SET blocked_until = 0")
+        assert fetch_with_breaker("AAPL", lambda symbol: {'symbol': symbol}) == {'symbol': "AAPL"}
+        assert circuit_breaker.cooling_down() == []
+
+
+class TestGetFundamentals:
+    """測試 get_fundamentals 函數"""
+
+    @pytest.fixture
+    def ticker(self, tmp_path, monkeypatch):
+        """以假的 Ticker 取代 yfinance，info 為下一次請求的回應，calls 記錄請求次數"""
+        source = {'info': {'longName': "Apple Inc.", 'marketCap': 100, 'trailingPE': 30.0, 'currency': 'USD'}}
+        source['calls'] = 0
+
+        class Ticker:
+            def __init__(self, symbol, session=None):
+                self.symbol = symbol
+
+            @property
+            def info(self):
+                source['calls'] += 1
+                if source['info'] is None:
+                    raise KeyError("currentTradingPeriod")
+                return dict(source['info'])
+
+        cache = ResponseCache(path=tmp_path / "cache.sqlite")
+        monkeypatch.setattr(common, "get_response_cache", lambda: cache)
+        monkeypatch.setattr(fetch_holdings_prices.yf, "Ticker", Ticker)
+        yield source
+        cache.close()
+
+    def test_fresh_snapshot_skips_request(self, ticker):
+        """快照未超過一天時不發出請求"""
+        updated_at = (datetime.now() - timedelta(hours=1)).isoformat(timespec='seconds')
+        snapshot = {'AAPL': {'name': "Apple", 'market_cap': 1, 'pe_ratio': None, 'currency': 'USD', 'updated_at': updated_at}}
+        assert get_fundamentals("AAPL", snapshot)['name'] == "Apple"
+        assert ticker['calls'] == 0
+
+    def test_stale_snapshot_refreshed(self, ticker):
+        """快照超過一天時重新取得並就地更新"""
+        updated_at = (datetime.now() - timedelta(days=2)).isoformat(timespec='seconds')
+        snapshot = {'AAPL': {'name': "Apple", 'market_cap': 1, 'pe_ratio': None, 'currency': 'USD', 'updated_at': updated_at}}
+        assert get_fundamentals("AAPL", snapshot)['market_cap'] == 100
+        assert snapshot['AAPL']['name'] == "Apple Inc."
+        assert ticker['calls'] == 1
+
+    def test_force_bypasses_response_cache(self, ticker):
+        """強制更新時應略過快照與回應快取"""
+        snapshot = {}
+        get_fundamentals("AAPL", snapshot)
+        ticker['info'] = dict(ticker['info'], marketCap=200)
+
+        assert get_fundamentals("AAPL", snapshot, force=True)['market_cap'] == 200
+        assert ticker['calls'] == 2
+        assert snapshot['AAPL']['market_cap'] == 200
+
+    def test_fallback_without_snapshot(self, ticker):
+        """沒有快照且請求失敗時回傳以代碼為名稱的預設值，不寫入快照"""
+        ticker['info'] = None
+        snapshot = {}
+        assert get_fundamentals("AAPL", snapshot) == {'name': "AAPL", 'market_cap': None, 'pe_ratio': None, 'currency': 'USD'}
+        assert snapshot == {}
+
+    def test_fallback_keeps_stale_snapshot(self, ticker):
+        """請求失敗時沿用過期的快照"""
+        updated_at = (datetime.now() - timedelta(days=2)).isoformat(timespec='seconds')
+        entry = {'name': "Apple", 'market_cap': 1, 'pe_ratio': None, 'currency': 'USD', 'updated_at': updated_at}
+        ticker['info'] = None
+        assert get_fundamentals("AAPL", {'AAPL': entry}, force=True) == entry
+
+
+def make_quote(symbol, price, previous_close=100.0):
+    """產生報價"""
+    hist = pd.DataFrame(
+        {'Open': [previous_close, price], 'High': [price, price], 'Low': [price, price],
+         'Close': [previous_close, price], 'Volume': [1000.0, 1000.0]},
+        index=pd.DatetimeIndex(["2025-11-19", "2025-11-20"]),
+    )
+    fundamentals = {'name': symbol, 'market_cap': None, 'pe_ratio': None, 'currency': 'USD'}
+    return build_quote(symbol, hist, fundamentals)
+
+
+class TestWatch:
+    """測試 watch_holdings_prices 函數"""
+
+    @pytest.fixture
+    def watch(self, tmp_path, monkeypatch):
+        """以假的批次報價執行監看，polls 為每次輪詢的 {symbol: price}（None 表示失敗）"""
+        monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+        monkeypatch.setattr(fetch_holdings_prices, "resolve_holdings_symbols", lambda *args, **kwargs: ["AAA", "BBB"])
+        bars = []
+        monkeypatch.setattr(
+            fetch_holdings_prices, "save_snapshot_bars",
+            lambda records, price_key: bars.append([record['symbol'] for record in records]),
+        )
+        output = tmp_path / "holdings.md"
+
+        refreshes = []
+
+        def run(polls, on_refresh=None, refresh_fundamentals=False):
+            responses = iter(polls)
+
+            def refresh_fundamentals_snapshot(symbols, snapshot, force=False, workers=4):
+                refreshes.append(force)
+                if on_refresh:
+                    on_refresh(snapshot)
+
+            def fetch_quotes_batch(symbols, snapshot):
+                prices = next(responses)
+                return {symbol: make_quote(symbol, price) for symbol, price in (prices or {}).items()}
+
+            monkeypatch.setattr(fetch_holdings_prices, "refresh_fundamentals_snapshot", refresh_fundamentals_snapshot)
+            monkeypatch.setattr(fetch_holdings_prices, "fetch_quotes_batch", fetch_quotes_batch)
+            writes = []
+            real_write = fetch_holdings_prices.write_output
+            monkeypatch.setattr(
+                fetch_holdings_prices, "write_output",
+                lambda content, path, verbose=False: writes.append(content) or real_write(content, path, verbose),
+            )
+            result = watch_holdings_prices(
+                output=str(output), interval=0, max_polls=len(polls), refresh_fundamentals=refresh_fundamentals,
+            )
+            return result, writes, bars
+
+        run.refreshes = refreshes
+
+        return run
+
+    def test_rewrites_only_on_price_change(self, watch, capsys):
+        """價格無變動時不重寫，變動時只寫入變動的股票"""
+        result, writes, bars = watch([{"AAA": 101.0, "BBB": 50.0}, {"AAA": 101.0, "BBB": 50.0}, {"AAA": 102.0, "BBB": 50.0}])
+        assert result
+        assert len(writes) == 2
+        assert bars == [["AAA", "BBB"], ["AAA"]]
+        assert "價格無變動 (2/2)" in capsys.readouterr().err
+
+    def test_partial_poll_keeps_rows(self, watch):
+        """某次輪詢缺少的股票應沿用上次的報價，不從報告中消失"""
+        result, writes, bars = watch([{"AAA": 101.0, "BBB": 50.0}, {"AAA": 102.0}])
+        assert len(writes) == 2
+        assert "BBB" in writes[-1] and "102.00" in writes[-1]
+        assert bars[-1] == ["AAA"]
+
+    def test_failed_poll(self, watch, capsys):
+        """取不到任何報價時應顯示失敗，而不是價格無變動"""
+        result, writes, bars = watch([{"AAA": 101.0, "BBB": 50.0}, None])
+        captured = capsys.readouterr()
+        assert len(writes) == 1
+        assert "輪詢失敗" in captured.err
+        assert "價格無變動" not in captured.err
+
+        assert watch([None])[0] is False
+
+    def test_refreshes_fundamentals_once_before_polling(self, watch):
+        """基本資料應在輪詢前並行更新一次並儲存，不在每次輪詢中請求"""
+        def on_refresh(snapshot):
+            snapshot["AAA"] = {'name': "AAA Corp", 'updated_at': "2025-11-20T10:00:00"}
+
+        watch([{"AAA": 101.0}, {"AAA": 101.0}, {"AAA": 101.0}], on_refresh=on_refresh, refresh_fundamentals=True)
+        assert watch.refreshes == [True]
+        assert load_fundamentals_snapshot()["AAA"]['name'] == "AAA Corp"
+
+
+class TestFetchQuotesBatch:
+    """測試 fetch_quotes_batch 函數"""
+
+    @pytest.fixture
+    def download(self, monkeypatch):
+        """batch 為整批下載的結果（例外則拋出），single[symbol] 為逐一重試的結果"""
+        source = {'batch': None, 'single': {}, 'requested': []}
+
+        def call(endpoint, func, symbol=None):
+            if endpoint == 'download':
+                if isinstance(source['batch'], Exception):
+                    raise source['batch']
+                return source['batch']
+            source['requested'].append(symbol)
+            response = source['single'][symbol]
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        monkeypatch.setattr(fetch_holdings_prices, "rate_limited_call", call)
+        return source
+
+    @staticmethod
+    def history(price):
+        return pd.DataFrame(
+            {'Open': [100.0, price], 'High': [price, price], 'Low': [price, price],
+             'Close': [100.0, price], 'Volume': [1000.0, 1000.0]},
+            index=pd.DatetimeIndex(["2025-11-19", "2025-11-20"]),
+        )
+
+    def test_missing_symbols_retried(self, circuit_breaker, download):
+        """批次缺少的代碼應逐一重試，基本資料取自快照"""
+        download['batch'] = pd.concat({"AAA": self.history(101.0)}, axis=1)
+        download['single'] = {"BBB": self.history(50.0)}
+        snapshot = {"AAA": {'name': "AAA Corp", 'market_cap': None, 'pe_ratio': None, 'currency': 'USD'}}
+
+        quotes = fetch_holdings_prices.fetch_quotes_batch(["AAA", "BBB"], snapshot)
+        assert download['requested'] == ["BBB"]
+        assert quotes["AAA"]['name'] == "AAA Corp"
+        assert quotes["BBB"]['current_price'] == 50.0
+
+    def test_transient_errors_not_counted(self, circuit_breaker, download):
+        """整批失敗且逐一重試被限流時不計入斷路器，確定沒有資料才計入"""
+        download['batch'] = ConnectionError("connection reset")
+        download['single'] = {
+            "AAA": Exception("Too Many Requests. Rate limited."),
+            "DEAD": Exception("$DEAD: possibly delisted; no price data found"),
+            "EMPTY": pd.DataFrame(),
+        }
+
+        assert fetch_holdings_prices.fetch_quotes_batch(["AAA", "DEAD", "EMPTY"], {}) == {}
+        assert circuit_breaker.allow("AAA")
+        assert not circuit_breaker.allow("DEAD")
+        assert not circuit_breaker.allow("EMPTY")
+
+
+class TestMain:
+    """測試命令列參數檢查"""
+
+    @pytest.mark.parametrize("timeout", ["0", "-5"])
+    def test_rejects_non_positive_timeout(self, monkeypatch, timeout):
+        """逾時秒數不是正數時應直接結束，不開始爬取"""
+        monkeypatch.setattr("sys.argv", ["fetch_holdings_prices.py", "--workers", "4", "--timeout", timeout])
+        monkeypatch.setattr(fetch_holdings_prices, "configure_cache", lambda args: None)
+        monkeypatch.setattr(fetch_holdings_prices, "fetch_holdings_prices", lambda **kwargs: pytest.fail("不應開始爬取"))
+        with pytest.raises(SystemExit) as exc_info:
+            fetch_holdings_prices.main()
+        assert exc_info.value.code != 0
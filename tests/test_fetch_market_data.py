@@ -0,0 +1,154 @@
+"""
+fetch_market_data.py 單元測試
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import fetch_market_data
+from fetch_market_data import format_history_table, has_new_actions, iter_history_table, sync_history
+from price_store import load_prices, load_sync_state, save_sync_state
+
+
+@pytest.fixture(autouse=True)
+def market_data(tmp_path, monkeypatch):
+    """將價格資料庫導向臨時目錄"""
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+    return tmp_path
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    """以假資料取代下載；close 為每次下載的收盤價，dividends 為除息日"""
+    source = {'close': 1.0, 'dividends': []}
+    calls = []
+
+    def download(symbol, start, end):
+        calls.append((start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        dates = pd.bdate_range(start, end, inclusive='left')
+        return pd.DataFrame(
+            {
+                'Open': source['close'], 'High': source['close'], 'Low': source['close'],
+                'Close': source['close'], 'Volume': 100.0,
+                'Dividends': [0.5 if d.strftime('%Y-%m-%d') in source['dividends'] else 0.0 for d in dates],
+                'Stock Splits': 0.0,
+            },
+            index=pd.DatetimeIndex(dates, name='Date'),
+        )
+
+    monkeypatch.setattr(fetch_market_data, "download_history", download)
+    source['calls'] = calls
+    return source
+
+
+class TestSyncHistory:
+    """測試 sync_history 函數"""
+
+    def test_downloads_only_after_last_bar(self, fake_download):
+        """已有資料時只從最後一筆開始下載"""
+        sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 13))
+        sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 20))
+        assert fake_download['calls'] == [("2025-01-06", "2025-01-13"), ("2025-01-10", "2025-01-20")]
+        assert len(load_prices("AAA")) == 10
+
+    def test_skips_only_when_stored_bars_reach_end(self, fake_download):
+        """上次同步晚於區間結束，但本地資料未到區間最後一天時仍應下載"""
+        sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 9))
+        save_sync_state("AAA", {'covered_from': "2025-01-06", 'synced_at': "2025-06-01T00:00:00"})
+
+        df = sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 11))
+        assert fake_download['calls'][-1] == ("2025-01-08", "2025-01-11")
+        assert df.index.max() == pd.Timestamp("2025-01-10")
+
+        # 本地資料已到區間最後一天，且在區間結束後同步過
+        sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 11))
+        assert len(fake_download['calls']) == 2
+
+    def test_redownloads_range_after_dividend(self, fake_download):
+        """新資料中有除息時應重新下載整個區間，舊K線改用新的調整價格"""
+        sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 13))
+        fake_download['close'] = 0.9
+        fake_download['dividends'] = ["2025-01-15"]
+
+        df = sync_history("AAA", datetime(2025, 1, 6), datetime(2025, 1, 20))
+        assert fake_download['calls'][-1] == ("2025-01-06", "2025-01-20")
+        assert (df['Close'] == 0.9).all()
+        assert load_sync_state("AAA")['covered_from'] == "2025-01-06"
+
+
+class TestHasNewActions:
+    """測試 has_new_actions 函數"""
+
+    def test_actions_after_date(self):
+        """只計算晚於指定日期的除權息或分割"""
+        df = pd.DataFrame(
+            {'Close': [1.0, 1.0], 'Dividends': [0.5, 0.0], 'Stock Splits': [0.0, 0.0]},
+            index=pd.DatetimeIndex(["2025-01-10", "2025-01-13"]),
+        )
+        assert has_new_actions(df, datetime(2025, 1, 9))
+        assert not has_new_actions(df, datetime(2025, 1, 10))
+
+    def test_without_action_columns(self):
+        """沒有 Dividends / Stock Splits 欄位時視為沒有"""
+        df = pd.DataFrame({'Close': [1.0]}, index=pd.DatetimeIndex(["2025-01-10"]))
+        assert not has_new_actions(df, datetime(2025, 1, 9))
+
+
+class TestHistoryTable:
+    """測試 format_history_table / iter_history_table"""
+
+    @staticmethod
+    def history(rows):
+        """rows 為 (日期, open, high, low, close, volume)"""
+        return pd.DataFrame(
+            [row[1:] for row in rows],
+            columns=['Open', 'High', 'Low', 'Close', 'Volume'],
+            index=pd.DatetimeIndex([row[0] for row in rows], name='Date'),
+        )
+
+    def test_expected_table(self):
+        """應由新到舊排列，NaN 價格與 0 或 NaN 交易量顯示為 —，交易量加上千分位"""
+        nan = float('nan')
+        df = self.history([
+            ("2025-01-02", 1234.5, 1240.0, 1230.125, 1238.0, 1234567.0),
+            ("2025-01-03", nan, 10.0, 9.5, 9.994, 0.0),
+            ("2025-01-06", 0.5, 0.75, 0.25, nan, nan),
+            ("2025-01-07", 100.0, 101.0, 99.0, 100.5, 999.0),
+            ("2025-01-08", 42.0, 43.0, 41.0, 42.5, 1000.0),
+        ])
+        assert format_history_table(df) == (
+            "| Date         | Open   | High   | Low    | Close  | Adj Close | Volume     |\n"
+            "|--------------|--------|--------|--------|--------|-----------|------------|\n"
+            "| Jan 08, 2025 | 42.00  | 43.00  | 41.00  | 42.50  | 42.50     | 1,000      |\n"
+            "| Jan 07, 2025 | 100.00 | 101.00 | 99.00  | 100.50 | 100.50    | 999        |\n"
+            "| Jan 06, 2025 | 0.50   | 0.75   | 0.25   | —      | —         | —          |\n"
+            "| Jan 03, 2025 | —      | 10.00  | 9.50   | 9.99   | 9.99      | —          |\n"
+            "| Jan 02, 2025 | 1234.50 | 1240.00 | 1230.12 | 1238.00 | 1238.00   | 1,234,567  |"
+        )
+
+    def test_empty(self):
+        """沒有資料時只輸出表頭"""
+        df = self.history([]).astype('float64')
+        assert format_history_table(df) == (
+            "| Date         | Open   | High   | Low    | Close  | Adj Close | Volume     |\n"
+            "|--------------|--------|--------|--------|--------|-----------|------------|"
+        )
+
+    def test_chunks_larger_than_chunk_size(self):
+        """超過 chunk_size 的表格應分段產生，串接後與整份表格相同"""
+        dates = pd.bdate_range("2024-01-01", periods=25)
+        df = pd.DataFrame(
+            {'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': [float(i) for i in range(25)], 'Volume': 1500.0},
+            index=pd.DatetimeIndex(dates, name='Date'),
+        )
+        chunks = list(iter_history_table(df, chunk_size=10))
+        assert len(chunks) == 4
+        assert all(chunk.count("\n") == 10 for chunk in chunks[1:3])
+        assert ''.join(chunks) == format_history_table(df)
+
+        lines = ''.join(chunks).split("\n")
+        assert len(lines) == 27
+        assert lines[2] == f"| {dates[-1].strftime('%b %d, %Y')} | 1.00   | 2.00   | 0.50   | 24.00  | 24.00     | 1,500      |"
+
@@ -0,0 +1,162 @@
+"""
+news_archive.py 單元測試
+"""
+
+import json
+
+import pytest
+
+import news_archive
+from common import ScraperError
+from fetch_market_news import format_news
+from news_archive import ArchiveShard, compact_news, get_archive_directory, read_news_archive
+from news_dedup import articles_from_news_files
+from news_index import NewsIndex
+
+
+def make_record(article_id, title, pub_date):
+    """產生正規化後的文章"""
+    return {
+        'id': article_id, 'title': title, 'summary': f"{title} summary", 'publisher': "Reuters",
+        'published_at': pub_date, 'url': f"https://example.com/{article_id}", 'content_type': "STORY",
+    }
+
+
+def write_news(root, symbol, day, records, json_output=False):
+    """以 fetch_market_news 的格式寫入新聞檔"""
+    news_dir = root / day[:4] / "News"
+    news_dir.mkdir(parents=True, exist_ok=True)
+    path = news_dir / f"{symbol}-{day}.{'json' if json_output else 'md'}"
+    path.write_text(format_news(symbol, records, json_output=json_output), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    """market-data 目錄，含 10 月與 11 月的新聞"""
+    root = tmp_path / "market-data"
+    write_news(root, "INTC", "2025-10-14", [make_record("i1", "Intel foundry deal", "2025-10-14T09:00:00Z")])
+    write_news(root, "INTC", "2025-10-15", [make_record("i2", "Intel guidance cut", "2025-10-15T09:00:00Z")])
+    write_news(root, "^GSPC", "2025-10-15", [make_record("m1", "Markets rally", "2025-10-15T08:00:00Z")])
+    write_news(root, "INTC", "2025-11-20", [make_record("i3", "Intel new CEO", "2025-11-20T09:00:00Z")])
+    return root
+
+
+class TestCompact:
+    """測試 compact_news 函數"""
+
+    def test_compacts_closed_days(self, root):
+        """早於指定日期的新聞檔應壓縮到每月分片並刪除原檔"""
+        stats = compact_news(before="2025-11-20", root=root, codec='gzip')
+        assert (stats['files'], stats['months'], stats['articles']) == (3, 1, 3)
+
+        shard_dir = get_archive_directory(root) / "2025"
+        index = json.loads((shard_dir / "news-2025-10.index.json").read_text(encoding="utf-8"))
+        assert index['shard'] == "news-2025-10.1.jsonl.gz"
+        assert (shard_dir / index['shard']).is_file()
+        assert sorted(index['symbols']) == ["INTC", "^GSPC"]
+        assert index['symbols']["INTC"]["2025-10-14"][2] == 1
+
+        remaining = sorted(path.name for path in (root / "2025" / "News").iterdir())
+        assert remaining == ["INTC-2025-11-20.md"]
+
+    def test_merges_into_existing_shard(self, root):
+        """再次封存同一個月時應與既有分片合併，同一代碼同一天以新聞檔為準"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        write_news(root, "INTC", "2025-10-15", [make_record("i9", "Intel guidance revised", "2025-10-15T12:00:00Z")])
+        write_news(root, "TSM", "2025-10-16", [make_record("t1", "TSMC capacity", "2025-10-16T09:00:00Z")], json_output=True)
+        compact_news(before="2025-11-01", root=root)
+
+        records = read_news_archive(start="2025-10-01", end="2025-10-31", root=root)
+        assert [(r['symbol'], r['day'], r['title']) for r in records] == [
+            ("INTC", "2025-10-14", "Intel foundry deal"),
+            ("INTC", "2025-10-15", "Intel guidance revised"),
+            ("TSM", "2025-10-16", "TSMC capacity"),
+            ("^GSPC", "2025-10-15", "Markets rally"),
+        ]
+        assert records[2]['id'] == "t1"
+
+        # 合併後寫入新世代的分片並刪除舊世代
+        shard_dir = get_archive_directory(root) / "2025"
+        assert sorted(path.name for path in shard_dir.glob("news-2025-10.*.jsonl.gz")) == ["news-2025-10.2.jsonl.gz"]
+
+    def test_interrupted_rewrite_keeps_old_shard(self, root, monkeypatch):
+        """索引寫入失敗時，既有索引仍指向完整的舊分片"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        write_news(root, "TSM", "2025-10-16", [make_record("t1", "TSMC capacity", "2025-10-16T09:00:00Z")])
+        monkeypatch.setattr(news_archive, "write_output", lambda content, path: False)
+
+        with pytest.raises(ScraperError):
+            compact_news(before="2025-11-01", root=root)
+
+        shard_dir = get_archive_directory(root) / "2025"
+        assert [path.name for path in shard_dir.glob("news-2025-10.*.jsonl.gz")] == ["news-2025-10.1.jsonl.gz"]
+        assert [r['title'] for r in read_news_archive(start="2025-10-01", end="2025-10-31", root=root)] == [
+            "Intel foundry deal", "Intel guidance cut", "Markets rally",
+        ]
+        assert (root / "2025" / "News" / "TSM-2025-10-16.md").is_file()
+
+    def test_keep_files(self, root):
+        """--keep-files 時應保留原檔"""
+        compact_news(before="2025-11-01", root=root, keep_files=True, codec='gzip')
+        assert len(list((root / "2025" / "News").iterdir())) == 4
+
+    def test_zstd(self, root):
+        """安裝 zstandard 時應支援 zstd 分片"""
+        pytest.importorskip("zstandard")
+        compact_news(before="2025-11-01", root=root, codec='zstd')
+        assert (get_archive_directory(root) / "2025" / "news-2025-10.1.jsonl.zst").is_file()
+        assert len(read_news_archive(["INTC"], root=root)) == 2
+
+
+class TestRead:
+    """測試 read_news_archive / ArchiveShard"""
+
+    def test_symbol_range(self, root):
+        """應只讀取指定代碼與日期區間的記錄"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        assert [r['title'] for r in read_news_archive(["INTC"], start="2025-10-15", root=root)] == ["Intel guidance cut"]
+        assert read_news_archive(["INTC"], start="2025-12-01", root=root) == []
+
+    def test_single_read_per_symbol(self, root, monkeypatch):
+        """同一代碼的日期區間應只解壓縮一段連續的資料"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        calls = []
+        real = news_archive.decompress_blocks
+        monkeypatch.setattr(news_archive, "decompress_blocks", lambda data, codec: calls.append(len(data)) or real(data, codec))
+
+        shard = ArchiveShard(get_archive_directory(root) / "2025", "2025-10")
+        assert len(shard.read("INTC")) == 2
+        assert len(calls) == 1
+
+    def test_size_mismatch(self, root):
+        """分片與索引不一致時應拋出 ScraperError"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        with open(get_archive_directory(root) / "2025" / "news-2025-10.1.jsonl.gz", 'ab') as f:
+            f.write(b"x")
+        with pytest.raises(ScraperError):
+            read_news_archive(["INTC"], root=root)
+
+
+class TestArchiveConsumers:
+    """封存後的新聞仍可被索引與彙整"""
+
+    def test_news_index(self, root, tmp_path):
+        """全文索引應包含分片中的文章"""
+        index = NewsIndex(tmp_path / "index.sqlite")
+        index.update(root)
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        stats = index.update(root)
+        assert (stats['indexed'], stats['removed']) == (1, 3)
+        assert index.search("rally")[0]['symbols'] == ["^GSPC"]
+        assert stats['articles'] == 4
+        index.close()
+
+    def test_articles_from_archive(self, root):
+        """新聞檔已封存時應改由分片取得當天的文章"""
+        compact_news(before="2025-11-01", root=root, codec='gzip')
+        articles = articles_from_news_files("2025-10-15", root)
+        assert [(a['title'], a['symbols']) for a in articles] == [
+            ("Intel guidance cut", ["INTC"]),
+            ("Markets rally", ["^GSPC"]),
+        ]
@@ -0,0 +1,96 @@
+"""
+news_dedup.py 單元測試
+"""
+
+from fetch_market_news import format_news, format_news_digest
+from news_dedup import articles_from_news_files, collapse_near_duplicates, find_near_duplicates, jaccard, shingles
+
+
+SYNDICATED = (
+    "Intel shares jumped after the chipmaker said a major cloud provider agreed to manufacture "
+    "custom AI processors at its foundry, a boost for the turnaround plan led by its chief executive."
+)
+
+
+def make_article(article_id, title, summary, symbols, publisher="Reuters", pub_date="2025-11-20T10:00:00Z"):
+    """產生 day_articles 格式的文章"""
+    return {
+        'id': article_id, 'title': title, 'summary': summary, 'publisher': publisher,
+        'published_at': pub_date, 'url': f"https://example.com/{article_id}",
+        'content_type': "STORY", 'symbols': symbols,
+    }
+
+
+def day_articles():
+    """同一篇稿件以不同標題出現在三個代碼下，另有一篇無關新聞"""
+    return [
+        make_article("r1", "Intel lands foundry deal with cloud giant", SYNDICATED, ["INTC"], "Reuters", "2025-11-20T09:00:00Z"),
+        make_article("y1", "Intel stock soars on foundry customer win", SYNDICATED, ["^GSPC", "^IXIC"], "Yahoo Finance", "2025-11-20T09:30:00Z"),
+        make_article("b1", "Oil prices slide as OPEC+ weighs output hike", "Crude futures fell for a third day.", ["CL=F"], "Bloomberg"),
+    ]
+
+
+class TestShingles:
+    """測試 shingle 與 Jaccard"""
+
+    def test_similar_text(self):
+        """只有標題不同的報導應高度相似，無關新聞則不相似"""
+        first, second, other = day_articles()
+        first_set = shingles(f"{first['title']} {first['summary']}")
+        assert jaccard(first_set, shingles(f"{second['title']} {second['summary']}")) > 0.6
+        assert jaccard(first_set, shingles(f"{other['title']} {other['summary']}")) < 0.1
+
+    def test_empty(self):
+        """空白文字沒有 shingle"""
+        assert shingles("  ") == frozenset()
+
+
+class TestCollapse:
+    """測試 find_near_duplicates / collapse_near_duplicates"""
+
+    def test_clusters(self):
+        """相似報導應分在同一群"""
+        assert find_near_duplicates(day_articles()) == [[0, 1], [2]]
+
+    def test_representative(self):
+        """每群保留一篇代表文章，合併相關代碼並列出同時報導"""
+        collapsed = collapse_near_duplicates(day_articles())
+        assert [article['id'] for article in collapsed] == ["y1", "b1"]
+        assert collapsed[0]['symbols'] == ["INTC", "^GSPC", "^IXIC"]
+        assert collapsed[0]['also_covered_by'] == [
+            {'publisher': "Reuters", 'title': "Intel lands foundry deal with cloud giant", 'url': "https://example.com/r1"},
+        ]
+        assert collapsed[1]['also_covered_by'] == []
+
+    def test_threshold(self):
+        """門檻為 1 時只合併完全相同的文字"""
+        assert len(collapse_near_duplicates(day_articles(), threshold=1.0)) == 3
+
+    def test_digest(self):
+        """新聞彙整應只列代表文章並標示同時報導"""
+        digest = format_news_digest(day_articles(), "2025-11-20")
+        assert digest.count(SYNDICATED) == 1
+        assert "**同時報導**: Reuters「Intel lands foundry deal with cloud giant」" in digest
+        assert "**新聞數量**: 2 則（4 個代碼共 4 則，重複的文章只列一次，合併 1 則相似報導）" in digest
+
+        assert digest.count("**摘要**") == 2
+        assert format_news_digest(day_articles(), "2025-11-20", threshold=None).count(SYNDICATED) == 2
+
+
+class TestNewsFiles:
+    """測試由新聞檔取得文章"""
+
+    def test_articles_from_news_files(self, tmp_path):
+        """應合併相同連結的文章並列出相關代碼"""
+        news_dir = tmp_path / "2025" / "News"
+        news_dir.mkdir(parents=True)
+        first, second, _ = day_articles()
+        (news_dir / "INTC-2025-11-20.md").write_text(format_news("INTC", [first, second]), encoding="utf-8")
+        (news_dir / "^GSPC-2025-11-20.md").write_text(format_news("^GSPC", [second]), encoding="utf-8")
+        (news_dir / "INTC-2025-11-19.md").write_text(format_news("INTC", [first]), encoding="utf-8")
+
+        articles = articles_from_news_files("2025-11-20", tmp_path)
+        assert [(article['title'], article['symbols']) for article in articles] == [
+            ("Intel stock soars on foundry customer win", ["INTC", "^GSPC"]),
+            ("Intel lands foundry deal with cloud giant", ["INTC"]),
+        ]
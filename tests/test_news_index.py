@@ -0,0 +1,125 @@
+"""
+news_index.py 單元測試
+"""
+
+import os
+
+import pytest
+
+from common import ScraperError
+from fetch_market_news import format_news
+from news_index import NewsIndex, find_news_files, parse_news_markdown, parse_published_at
+from news_store import normalize_article
+
+
+def make_record(article_id, title, summary, pub_date="2025-11-20T10:00:00Z", publisher="Reuters"):
+    """產生正規化後的文章"""
+    return {
+        'id': article_id, 'title': title, 'summary': summary, 'publisher': publisher,
+        'published_at': pub_date, 'url': f"https://example.com/{article_id}", 'content_type': "STORY",
+    }
+
+
+def write_news(root, symbol, day, records, json_output=False):
+    """以 fetch_market_news 的格式寫入新聞檔"""
+    news_dir = root / day[:4] / "News"
+    news_dir.mkdir(parents=True, exist_ok=True)
+    path = news_dir / f"{symbol}-{day}.{'json' if json_output else 'md'}"
+    path.write_text(format_news(symbol, records, json_output=json_output), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    """market-data 目錄，含兩天的新聞"""
+    root = tmp_path / "market-data"
+    write_news(root, "INTC", "2025-10-15", [
+        make_record("i1", "Intel wins foundry customer", "Intel Foundry signs a major deal.", "2025-10-15T09:00:00Z"),
+        make_record("m1", "Markets rally on Fed", "Stocks rose broadly.", "2025-10-15T08:00:00Z"),
+    ])
+    write_news(root, "^GSPC", "2025-10-15", [
+        make_record("m1", "Markets rally on Fed", "Stocks rose broadly.", "2025-10-15T08:00:00Z"),
+    ])
+    write_news(root, "TSM", "2025-07-01", [
+        make_record("t1", "TSMC expands capacity", "New foundries planned in Arizona.", "2025-07-01T09:00:00Z"),
+    ], json_output=True)
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    """建立臨時索引"""
+    index = NewsIndex(tmp_path / "index.sqlite")
+    yield index
+    index.close()
+
+
+class TestParse:
+    """測試新聞檔解析"""
+
+    def test_markdown_round_trip(self):
+        """由 format_news 產生的 Markdown 應解析回相同欄位"""
+        record = make_record("a1", "Fed holds rates", "The Fed held rates steady.")
+        parsed = parse_news_markdown(format_news("AAPL", [record]))
+        expected = {key: value for key, value in normalize_article(record).items() if key != 'id'}
+        assert parsed == [expected]
+
+    def test_published_at(self):
+        """format_datetime 的格式應轉回 ISO 8601"""
+        assert parse_published_at("Nov 17, 2025 21:06 UTC") == "2025-11-17T21:06:00Z"
+        assert parse_published_at("N/A") is None
+
+    def test_find_news_files(self, root):
+        """應找出所有年份的新聞檔，代碼可含特殊字元"""
+        names = [path.name for path in find_news_files(root)]
+        assert names == ["INTC-2025-10-15.md", "TSM-2025-07-01.json", "^GSPC-2025-10-15.md"]
+
+
+class TestNewsIndex:
+    """測試 NewsIndex 類別"""
+
+    def test_search_ranked_and_unique(self, index, root):
+        """搜尋結果應依 BM25 排序，重複的文章只出現一次"""
+        stats = index.update(root)
+        assert stats['indexed'] == 3
+        assert stats['articles'] == 3
+
+        results = index.search("foundry", limit=10)
+        assert [article['title'] for article in results][0] == "Intel wins foundry customer"
+        assert "TSMC expands capacity" in [article['title'] for article in results]
+
+        rally = index.search("rally")
+        assert len(rally) == 1
+        assert rally[0]['symbols'] == ["INTC", "^GSPC"]
+
+    def test_filters(self, index, root):
+        """應支援日期與代碼篩選"""
+        index.update(root)
+        assert [a['title'] for a in index.search("foundry", start="2025-10-01")] == ["Intel wins foundry customer"]
+        assert [a['title'] for a in index.search("foundry", end="2025-09-30")] == ["TSMC expands capacity"]
+        assert [a['title'] for a in index.search("foundry OR rally", symbols=["^GSPC"])] == ["Markets rally on Fed"]
+
+    def test_incremental_update(self, index, root):
+        """只重新解析新增或變更的檔案，並移除已刪除檔案的文章"""
+        index.update(root)
+        assert index.update(root)['unchanged'] == 3
+
+        path = write_news(root, "INTC", "2025-10-15", [
+            make_record("i2", "Intel cuts guidance", "Weak outlook.", "2025-10-15T12:00:00Z"),
+        ])
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+        stats = index.update(root)
+        assert (stats['indexed'], stats['unchanged']) == (1, 2)
+        assert index.search("guidance")[0]['symbols'] == ["INTC"]
+        assert index.search("customer") == []
+        assert index.search("rally")[0]['symbols'] == ["^GSPC"]
+
+        (root / "2025" / "News" / "TSM-2025-07-01.json").unlink()
+        assert index.update(root)['removed'] == 1
+        assert index.search("TSMC") == []
+
+    def test_invalid_query(self, index, root):
+        """查詢語法錯誤應拋出 ScraperError"""
+        index.update(root)
+        with pytest.raises(ScraperError):
+            index.search('"unbalanced')
@@ -0,0 +1,184 @@
+"""
+news_store.py 單元測試
+"""
+
+import json
+
+import pytest
+
+import fetch_market_news
+import news_store
+from news_store import NewsStore, get_article_id, normalize_article
+
+
+def make_article(article_id, title, pub_date="2025-11-20T10:00:00Z", provider="Reuters"):
+    """產生 ticker.news 格式的新聞項目"""
+    return {
+        'id': article_id,
+        'content': {
+            'id': article_id,
+            'title': title,
+            'summary': f"{title} summary",
+            'pubDate': pub_date,
+            'provider': {'displayName': provider},
+            'canonicalUrl': {'url': f"https://example.com/{article_id}"},
+            'contentType': "STORY",
+        },
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """建立臨時新聞資料庫"""
+    store = NewsStore(tmp_path / "news.sqlite")
+    yield store
+    store.close()
+
+
+class TestNormalizeArticle:
+    """測試 normalize_article / get_article_id"""
+
+    def test_fields(self):
+        """應轉為固定欄位"""
+        record = normalize_article(make_article("a1", "Fed holds rates"))
+        assert record == {
+            'id': "a1", 'title': "Fed holds rates", 'summary': "Fed holds rates summary",
+            'publisher': "Reuters", 'published_at': "2025-11-20T10:00:00Z",
+            'url': "https://example.com/a1", 'content_type': "STORY",
+        }
+        assert normalize_article(record) == record
+
+    def test_missing_id_uses_url_hash(self):
+        """缺少 id 時同一連結應得到相同 id"""
+        first = {'content': {'title': "A", 'canonicalUrl': {'url': "https://x/1"}}}
+        second = {'content': {'title': "B", 'canonicalUrl': {'url': "https://x/1"}}}
+        assert get_article_id(first['content']) == get_article_id(second['content'])
+        assert get_article_id(first['content']).startswith("sha1:")
+
+
+class TestNewsStore:
+    """測試 NewsStore 類別"""
+
+    def test_shared_article_stored_once(self, store):
+        """多個代碼的相同文章只存一份"""
+        shared = make_article("shared", "Markets rally")
+        store.add("AAPL", [make_article("a1", "Apple earnings"), shared], day="2025-11-20")
+        store.add("^GSPC", [shared], day="2025-11-20")
+
+        count = store._connect().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        assert count == 2
+        assert [a['id'] for a in store.articles_for("AAPL", "2025-11-20")] == ["a1", "shared"]
+        assert [a['id'] for a in store.articles_for("^GSPC", "2025-11-20")] == ["shared"]
+
+    def test_day_articles_unique(self, store):
+        """每日彙整中每篇文章只出現一次，並列出相關代碼"""
+        shared = make_article("shared", "Markets rally", pub_date="2025-11-20T12:00:00Z")
+        store.add("AAPL", [make_article("a1", "Apple earnings"), shared], day="2025-11-20")
+        store.add("^GSPC", [shared], day="2025-11-20")
+
+        articles = store.day_articles("2025-11-20")
+        assert [a['id'] for a in articles] == ["shared", "a1"]
+        assert articles[0]['symbols'] == ["AAPL", "^GSPC"]
+        assert store.symbols_for_day("2025-11-20") == ["AAPL", "^GSPC"]
+
+    def test_add_replaces_symbol_day(self, store):
+        """同一代碼同一天重新儲存時取代原有索引"""
+        store.add("AAPL", [make_article("a1", "Old")], day="2025-11-20")
+        store.add("AAPL", [make_article("a2", "New"), make_article("a2", "New")], day="2025-11-20")
+        assert [a['id'] for a in store.articles_for("AAPL", "2025-11-20")] == ["a2"]
+
+    def test_updated_article_content(self, store):
+        """文章內容更新時應以新內容為準"""
+        store.add("AAPL", [make_article("a1", "Draft")], day="2025-11-20")
+        store.add("MSFT", [make_article("a1", "Final")], day="2025-11-20")
+        assert store.articles_for("AAPL", "2025-11-20")[0]['title'] == "Final"
+
+
+class TestIncremental:
+    """測試增量模式與 watermark"""
+
+    def test_only_new_articles_added(self, store):
+        """只加入比 watermark 新的文章，當天紀錄累積且新的在前"""
+        first = [make_article("a2", "Second", "2025-11-20T10:00:00Z"), make_article("a1", "First", "2025-11-20T09:00:00Z")]
+        assert store.add("AAPL", first, day="2025-11-20", incremental=True) == ["a2", "a1"]
+        assert store.watermark("AAPL")['article_id'] == "a2"
+
+        second = [make_article("a3", "Third", "2025-11-20T11:00:00Z")] + first
+        assert store.add("AAPL", second, day="2025-11-20", incremental=True) == ["a3"]
+        assert store.add("AAPL", second, day="2025-11-20", incremental=True) == []
+        assert [a['id'] for a in store.articles_for("AAPL", "2025-11-20")] == ["a3", "a2", "a1"]
+
+    def test_older_than_watermark_skipped(self, store):
+        """發布時間早於 watermark 的文章不視為新的，即使是隔天才出現"""
+        store.add("AAPL", [make_article("a2", "New", "2025-11-20T10:00:00Z")], day="2025-11-20", incremental=True)
+        late = [make_article("a0", "Old", "2025-11-19T08:00:00Z"), make_article("a2", "New", "2025-11-20T10:00:00Z")]
+        assert store.add("AAPL", late, day="2025-11-21", incremental=True) == []
+        assert store.articles_for("AAPL", "2025-11-21") == []
+
+    def test_same_timestamp_new_id_added(self, store):
+        """發布時間相同但尚未收錄的文章仍視為新的"""
+        store.add("AAPL", [make_article("a1", "A", "2025-11-20T10:00:00Z")], day="2025-11-20", incremental=True)
+        batch = [make_article("b1", "B", "2025-11-20T10:00:00Z"), make_article("a1", "A", "2025-11-20T10:00:00Z")]
+        assert store.add("AAPL", batch, day="2025-11-20", incremental=True) == ["b1"]
+
+    def test_watermarks_per_symbol(self, store):
+        """每個代碼的 watermark 各自獨立"""
+        shared = make_article("shared", "Markets rally")
+        store.add("AAPL", [shared], day="2025-11-20", incremental=True)
+        assert store.add("^GSPC", [shared], day="2025-11-20", incremental=True) == ["shared"]
+
+
+class TestNewsViews:
+    """測試由資料庫產生的新聞輸出"""
+
+    @pytest.fixture
+    def market_data(self, tmp_path, monkeypatch):
+        """將新聞資料庫與輸出導向臨時目錄"""
+        monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+        monkeypatch.setattr(news_store, "_news_store", None)
+        yield tmp_path / "output" / "market-data"
+        if news_store._news_store is not None:
+            news_store._news_store.close()
+
+    def test_format_news_accepts_stored_articles(self):
+        """正規化後的文章與原始新聞應產生相同的 Markdown 區塊"""
+        raw = [make_article("a1", "Apple earnings")]
+        stored = [normalize_article(article) for article in raw]
+        strip = lambda text: text.split("**新聞數量**")[1]
+        assert strip(fetch_market_news.format_news("AAPL", raw)) == strip(fetch_market_news.format_news("AAPL", stored))
+        assert json.loads(fetch_market_news.format_news("AAPL", stored, json_output=True)) == stored
+
+    def test_digest_lists_each_article_once(self, market_data):
+        """新聞彙整中重複的文章只列一次"""
+        shared = make_article("shared", "Markets rally")
+        fetch_market_news.store_news("AAPL", [make_article("a1", "Apple earnings"), shared], day="2025-11-20")
+        fetch_market_news.store_news("^GSPC", [shared], day="2025-11-20")
+
+        assert fetch_market_news.write_news_digest(day="2025-11-20")
+        digest = (market_data / "2025" / "Daily" / "news-digest-2025-11-20.md").read_text(encoding="utf-8")
+        assert digest.count("Markets rally summary") == 1
+        assert "**相關代碼**: AAPL, ^GSPC" in digest
+        assert "**新聞數量**: 2 則（2 個代碼共 3 則" in digest
+
+    def test_incremental_skips_unchanged_symbol(self, market_data, monkeypatch):
+        """增量模式下沒有新文章時不重寫檔案"""
+        monkeypatch.setattr(fetch_market_news, "get_news", lambda symbol, limit: [make_article("a1", "Apple earnings")])
+        output = fetch_market_news.get_news_output_path("AAPL", False)
+
+        assert fetch_market_news.fetch_market_news("AAPL", auto_filename=True, incremental=True)
+        assert "Apple earnings" in output.read_text(encoding="utf-8")
+
+        output.unlink()
+        assert fetch_market_news.fetch_market_news("AAPL", auto_filename=True, incremental=True) is False
+        assert not output.exists()
+
+    def test_explicit_output_not_persisted(self, market_data, monkeypatch):
+        """-o 與 --stdout 不存入新聞資料庫，也不更新新聞彙整"""
+        monkeypatch.setattr(fetch_market_news, "get_news", lambda symbol, limit: [make_article("a1", "Apple earnings")])
+        output = market_data / "AAPL.md"
+
+        assert fetch_market_news.fetch_market_news("AAPL", output_file=output)
+        assert fetch_market_news.fetch_market_news("AAPL")
+        assert "Apple earnings" in output.read_text(encoding="utf-8")
+        assert news_store.get_news_store().articles_for("AAPL") == []
+        assert not fetch_market_news.get_news_digest_path().exists()
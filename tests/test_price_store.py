@@ -0,0 +1,114 @@
+"""
+price_store.py 單元測試
+"""
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from price_store import (
+    PRICE_COLUMNS,
+    get_price_path,
+    list_price_years,
+    load_prices,
+    save_prices,
+    save_snapshot_bars,
+    load_sync_state,
+    save_sync_state,
+)
+
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    """將價格資料庫導向臨時目錄"""
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_bars(dates, close=1.0, tz=None):
+    """建立測試用日K線"""
+    index = pd.DatetimeIndex(pd.to_datetime(dates))
+    if tz:
+        index = index.tz_localize(tz)
+    return pd.DataFrame(
+        {'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 100, 'Dividends': 0.0},
+        index=index,
+    )
+
+
+class TestSavePrices:
+    """測試 save_prices 函數"""
+
+    def test_partitions_by_year(self):
+        """資料應該依年份分區存檔"""
+        save_prices("UPS", make_bars(["2024-12-31", "2025-01-02"]))
+
+        assert get_price_path("UPS", 2024).exists()
+        assert get_price_path("UPS", 2025).exists()
+        assert list_price_years("UPS") == [2024, 2025]
+
+    def test_same_date_is_replaced(self):
+        """相同日期應以新資料為準"""
+        save_prices("UPS", make_bars(["2025-01-02"], close=1.0))
+        save_prices("UPS", make_bars(["2025-01-02"], close=2.0))
+
+        df = load_prices("UPS")
+        assert len(df) == 1
+        assert df["Close"].iloc[0] == 2.0
+
+    def test_timezone_and_extra_columns_dropped(self):
+        """時區與多餘欄位應被移除"""
+        save_prices("UPS", make_bars(["2025-01-02"], tz="America/New_York"))
+
+        df = load_prices("UPS")
+        assert list(df.columns) == PRICE_COLUMNS
+        assert df.index.tz is None
+        assert df.index[0] == pd.Timestamp("2025-01-02")
+
+    def test_empty_frame_writes_nothing(self):
+        """空資料不應建立檔案"""
+        assert save_prices("UPS", make_bars([])) == 0
+        assert list_price_years("UPS") == []
+
+
+class TestLoadPrices:
+    """測試 load_prices 函數"""
+
+    def test_missing_symbol_returns_empty(self):
+        """沒有資料時應返回空表"""
+        df = load_prices("NOPE")
+        assert df.empty
+        assert list(df.columns) == PRICE_COLUMNS
+
+    def test_range_filter(self):
+        """應只返回區間內的資料（結束日不含）"""
+        save_prices("UPS", make_bars(["2024-12-31", "2025-01-02", "2025-01-03"]))
+
+        df = load_prices("UPS", pd.Timestamp("2025-01-01"), pd.Timestamp("2025-01-03"))
+        assert list(df.index) == [pd.Timestamp("2025-01-02")]
+
+
+class TestSnapshotBars:
+    """測試 save_snapshot_bars 函數"""
+
+    def test_writes_one_bar_per_record(self):
+        """每筆快照應寫入一根K線"""
+        records = [
+            {'symbol': 'U', 'date': pd.Timestamp("2025-01-02"), 'open': 1.0, 'high': 2.0,
+             'low': 0.5, 'current_price': 1.5, 'volume': 10},
+            None,
+        ]
+
+        assert save_snapshot_bars(records, price_key='current_price') == 1
+        assert load_prices("U")["Close"].iloc[0] == 1.5
+
+
+class TestSyncState:
+    """測試同步狀態讀寫"""
+
+    def test_roundtrip(self):
+        """寫入後應能讀回"""
+        assert load_sync_state("UPS") == {}
+        save_sync_state("UPS", {'covered_from': '2025-01-01'})
+        assert load_sync_state("UPS") == {'covered_from': '2025-01-01'}
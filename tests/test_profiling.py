@@ -0,0 +1,107 @@
+"""
+profiling.py 單元測試
+"""
+
+import pstats
+import threading
+import time
+
+import pytest
+
+import profiling
+from common import create_argument_parser, run_bounded, write_output
+from profiling import RunProfiler, profile_phase, start_profiling, stop_profiling
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    """開始分析，測試結束時確保停止"""
+    monkeypatch.setattr(profiling, "_profiler", None)
+    profiler = start_profiling(tmp_path, job="test-job")
+    yield profiler
+    stop_profiling()
+
+
+class TestBreakdown:
+    """測試階段時間拆解"""
+
+    def test_nested_phase_counted_once(self):
+        """巢狀階段只歸入最內層"""
+        profiler = RunProfiler(job="x")
+        with profiler.phase('write'):
+            with profiler.phase('format'):
+                time.sleep(0.05)
+
+        breakdown = profiler.breakdown()
+        assert breakdown['format'] >= 0.05
+        assert breakdown['write'] < 0.02
+
+    def test_overlapping_threads_counted_once(self):
+        """不同執行緒重疊的網路時間只算一次"""
+        profiler = RunProfiler(job="x")
+
+        def request():
+            with profiler.phase('network'):
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        breakdown = profiler.breakdown()
+        assert 0.05 <= breakdown['network'] < 0.15
+        assert breakdown['network'] + breakdown['other'] == pytest.approx(breakdown['total'])
+
+    def test_phase_is_noop_without_profiler(self, monkeypatch):
+        """未啟用分析時 profile_phase 不做任何事"""
+        monkeypatch.setattr(profiling, "_profiler", None)
+        with profile_phase('network'):
+            pass
+
+
+class TestProfiling:
+    """測試 start_profiling / stop_profiling"""
+
+    def test_writes_stats_and_report(self, profiler, tmp_path):
+        """應輸出可讀取的 pstats 檔與含階段拆解的報告"""
+        write_output("hello", tmp_path / "out.md")
+        run_bounded(lambda x: sum(range(x)), [1000, 2000], workers=2)
+
+        stats_path, report_path = stop_profiling()
+        assert stats_path.name.startswith("test-job-")
+        assert stats_path.suffix == ".pstats"
+        assert pstats.Stats(str(stats_path)).total_calls > 0
+
+        report = report_path.read_text(encoding="utf-8")
+        for label in ("匯入", "網路", "格式化", "寫入", "其他"):
+            assert label in report
+        assert "write_output_if_changed" in report
+
+    def test_streamed_content_counted_as_format(self, profiler, tmp_path):
+        """串流輸出的產生器時間應歸入格式化"""
+        def chunks():
+            time.sleep(0.05)
+            yield "a"
+
+        write_output(chunks(), tmp_path / "out.md")
+        assert profiler.breakdown()['format'] >= 0.05
+
+    def test_cli_option(self, tmp_path, monkeypatch):
+        """create_argument_parser 建立的解析器應支援 --profile DIR"""
+        monkeypatch.setattr(profiling, "_profiler", None)
+        parser = create_argument_parser(description="test")
+        args = parser.parse_args(["--profile", str(tmp_path / "profiles")])
+        assert args.profile == str(tmp_path / "profiles")
+        assert profiling._profiler is not None
+
+        stats_path, _ = stop_profiling()
+        assert stats_path.parent == tmp_path / "profiles"
+
+    def test_cli_option_absent(self, monkeypatch):
+        """未指定 --profile 時不應開始分析"""
+        monkeypatch.setattr(profiling, "_profiler", None)
+        args = create_argument_parser(description="test").parse_args([])
+        assert args.profile is None
+        assert profiling._profiler is None
@@ -0,0 +1,169 @@
+"""
+report_parser.py 單元測試
+"""
+
+import pandas as pd
+import pytest
+
+import report_parser
+from common import ScraperError
+from report_parser import (
+    ParseCache,
+    detect_report_kind,
+    load_reports,
+    parse_global_indices,
+    parse_holdings_prices,
+    parse_number,
+    parse_report,
+)
+
+
+GLOBAL_INDICES_MD = """# 全球市場大盤指數 - 2025-11-20
+
+**更新時間**: 2025-11-20 08:00:00
+
+| 國家/地區 | 指數名稱 | 收盤價 | 開盤 | 最高 | 最低 | 成交量 | 漲跌 | 漲跌幅 |
+|----------|---------|--------|------|------|------|--------|------|--------|
+| 日本 | 日經225 | 38,123.45 | 38,000.00 | 38,200.00 | 37,900.00 | 1,234,567 | 🔺 +123.45 | 🔺 +0.32% |
+| 美國 | S&P 500 | 5,000.50 | 5,010.00 | 5,020.00 | 4,990.00 | — | 🔻 -10.25 | 🔻 -0.20% |
+
+---
+
+*資料來源: Yahoo Finance*
+"""
+
+HOLDINGS_MD = """# 📊 持倉股票價格分析
+
+> 更新時間: 2025-11-20
+
+---
+
+| 代碼 | 名稱 | 當前價格 | 漲跌 | 漲跌幅 | 開盤 | 最高 | 最低 | 成交量 | 市值 |
+|------|------|----------|------|--------|------|------|------|--------|------|
+| TSLA | Tesla, Inc. | $250.00 | +$5.00 | 🟢 +2.04% | $246.00 | $252.00 | $245.00 | 100,000,000 | $800.00B |
+| INTC | Intel Corporation | $41.41 | -$1.00 | 🔴 -2.36% | $42.00 | $42.50 | $41.00 | 50,000 | — |
+| U | Unity Software | $45.78 | $0.00 | ⚪ 0.00% | $45.78 | $45.78 | $45.78 | — | $18.50B |
+
+---
+
+## 📈 市場概況
+
+- **總股票數**: 3
+"""
+
+
+class TestParseNumber:
+    """測試 parse_number 函數"""
+
+    @pytest.mark.parametrize("cell, expected", [
+        ("38,123.45", 38123.45),
+        ("🔻 -10.25", -10.25),
+        ("🟢 +2.04%", 2.04),
+        ("-$1.00", -1.0),
+        ("$800.00B", 800e9),
+        ("—", None),
+    ])
+    def test_decorations_removed(self, cell, expected):
+        """應去除 emoji、$、%、千分位並處理 B 後綴"""
+        assert parse_number(cell) == expected
+
+    def test_invalid_raises(self):
+        """無法解析的文字應拋出 ValueError"""
+        with pytest.raises(ValueError):
+            parse_number("N/A")
+
+
+class TestParsers:
+    """測試兩種報告的解析"""
+
+    def test_global_indices(self):
+        """全球指數報告應解析為原始數值"""
+        records = parse_global_indices(GLOBAL_INDICES_MD)
+        assert len(records) == 2
+        assert records[0]['region'] == "日本"
+        assert records[0]['date'] == pd.Timestamp("2025-11-20")
+        assert records[0]['volume'] == 1234567
+        assert records[1]['volume'] == 0
+        assert records[1]['change_pct'] == -0.20
+
+    def test_holdings_prices(self):
+        """持倉價格報告應推算前一日收盤價"""
+        records = parse_holdings_prices(HOLDINGS_MD)
+        assert [r['symbol'] for r in records] == ["TSLA", "INTC", "U"]
+        assert records[0]['previous_close'] == 245.0
+        assert records[0]['market_cap'] == 800e9
+        assert records[1]['market_cap'] is None
+        assert records[2]['change'] == 0
+
+    def test_round_trip_with_writer(self):
+        """應能讀回 format_markdown_table 產生的表格"""
+        from fetch_holdings_prices import format_markdown_table
+
+        data = {
+            'symbol': "AAPL", 'name': "Apple Inc.", 'current_price': 190.5, 'open': 189.0,
+            'high': 191.0, 'low': 188.5, 'volume': 1234567, 'previous_close': 188.0,
+            'market_cap': 3.0e12, 'pe_ratio': 30.0, 'currency': "USD",
+            'change': 2.5, 'change_percent': 2.5 / 188.0 * 100,
+        }
+        records = parse_holdings_prices(format_markdown_table([data]))
+        assert records[0]['close'] == 190.5
+        assert records[0]['volume'] == 1234567
+        assert records[0]['change_pct'] == round(data['change_percent'], 2)
+
+
+class TestLoadReports:
+    """測試 parse_report / load_reports"""
+
+    @pytest.fixture
+    def market_data(self, tmp_path, monkeypatch):
+        """建立測試用 market-data 目錄並將快取導向臨時目錄"""
+        monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setattr(report_parser, "_parse_cache", None)
+        monkeypatch.setattr(report_parser, "_index_symbols", lambda: {("美國", "S&P 500"): "^GSPC"})
+        root = tmp_path / "market-data"
+        daily = root / "2025" / "Daily"
+        daily.mkdir(parents=True)
+        (daily / "global-indices-2025-11-20.md").write_text(GLOBAL_INDICES_MD, encoding="utf-8")
+        (daily / "global-indices-2025-11-21.md").write_text(
+            GLOBAL_INDICES_MD.replace("2025-11-20", "2025-11-21"), encoding="utf-8"
+        )
+        (daily / "holdings-prices-2025-11-20.md").write_text(HOLDINGS_MD, encoding="utf-8")
+        return root
+
+    def test_detect_kind(self):
+        """應依檔名判斷報告種類"""
+        assert detect_report_kind("holdings-prices-2025-11-20.md") == "holdings-prices"
+        with pytest.raises(ScraperError):
+            detect_report_kind("news-2025-11-20.md")
+
+    def test_typed_frame(self, market_data):
+        """合併結果應為有型別的 DataFrame"""
+        df = load_reports("global-indices", root=market_data)
+        assert len(df) == 4
+        assert df['date'].dtype.kind == 'M'
+        assert df['close'].dtype == 'float64'
+        assert df['symbol'].isna().iloc[0]
+        assert df['symbol'].iloc[1] == "^GSPC"
+
+    def test_date_range(self, market_data):
+        """應只讀取區間內的報告"""
+        df = load_reports("global-indices", start="2025-11-21", root=market_data)
+        assert set(df['date']) == {pd.Timestamp("2025-11-21")}
+
+    def test_parse_cache(self, market_data):
+        """相同內容第二次讀取應命中快取"""
+        path = market_data / "2025" / "Daily" / "holdings-prices-2025-11-20.md"
+        first = parse_report(path)
+        cache = report_parser.get_parse_cache()
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        assert parse_report(path) == first
+        assert cache.hits == 1
+
+    def test_cache_keyed_by_content(self, tmp_path):
+        """內容不同的檔案不應共用快取"""
+        cache = ParseCache(tmp_path / "parse.sqlite")
+        cache.set("abc", "holdings-prices", [{'symbol': "A"}])
+        assert cache.get("abc", "holdings-prices") == [{'symbol': "A"}]
+        assert cache.get("def", "holdings-prices") is None
+        cache.close()
@@ -0,0 +1,137 @@
+"""
+symbol_universe.py 單元測試
+"""
+
+import os
+
+import pytest
+
+from common import ScraperError
+from symbol_universe import (
+    load_universe,
+    merge_entries,
+    parse_config_entries,
+    query_symbols,
+)
+
+
+HOLDINGS_YAML = """
+holdings:
+  核心持倉:
+    Tesla:
+      symbol: "TSLA"
+      fetch_news: true
+      enabled: true
+    Paused:
+      symbol: "OFF"
+      fetch_news: true
+      enabled: false
+  空群組:
+  選擇權部位:
+    Tesla (TSLA):
+      symbol: "TSLA"
+      options: []
+watchlist:
+  潛在投資標的:
+    NVIDIA:
+      symbol: "NVDA"
+      fetch_news: true
+"""
+
+INDICES_YAML = """
+global_indices:
+  美國:
+    S&P 500:
+      symbol: "^GSPC"
+      fetch_news: true
+    Russell 2000: "^RUT"
+"""
+
+
+@pytest.fixture
+def config_files(tmp_path, monkeypatch):
+    """建立測試用設定檔並將快取導向臨時目錄"""
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    holdings = tmp_path / "holdings.yaml"
+    indices = tmp_path / "indices.yaml"
+    holdings.write_text(HOLDINGS_YAML, encoding="utf-8")
+    indices.write_text(INDICES_YAML, encoding="utf-8")
+    return holdings, indices
+
+
+class TestMergeEntries:
+    """測試 parse_config_entries / merge_entries"""
+
+    def test_duplicates_merged(self):
+        """重複的代碼應合併為一筆，保留第一次出現的名稱"""
+        import yaml
+        entries = parse_config_entries(yaml.safe_load(HOLDINGS_YAML), yaml.safe_load(INDICES_YAML))
+        symbols = merge_entries(entries)
+
+        assert [e['symbol'] for e in symbols] == ["TSLA", "OFF", "NVDA", "^GSPC", "^RUT"]
+        tsla = symbols[0]
+        assert tsla['name'] == "Tesla"
+        assert tsla['fetch_news'] is True
+
+    def test_types_collected(self):
+        """同一代碼出現在多種清單時應記錄所有類型"""
+        entries = [
+            {'symbol': 'X', 'name': 'a', 'type': 'stock', 'enabled': False, 'fetch_news': False},
+            {'symbol': 'X', 'name': 'b', 'type': 'index', 'enabled': True, 'fetch_news': True},
+        ]
+        merged = merge_entries(entries)
+
+        assert merged[0]['types'] == ['stock', 'index']
+        assert merged[0]['enabled'] is True
+        assert merged[0]['fetch_news'] is True
+
+    def test_disabled_entry_does_not_fetch_news(self):
+        """停用的項目不應爬取新聞"""
+        import yaml
+        entries = parse_config_entries(yaml.safe_load(HOLDINGS_YAML), None)
+        off = [e for e in entries if e['symbol'] == "OFF"][0]
+        assert off['enabled'] is False
+        assert off['fetch_news'] is False
+
+
+class TestQuerySymbols:
+    """測試 query_symbols 函數"""
+
+    def test_filters(self, config_files):
+        """應依類型、啟用與新聞設定篩選"""
+        universe = load_universe(*config_files)
+
+        news = [e['symbol'] for e in query_symbols(universe, fetch_news=True)]
+        assert news == ["TSLA", "NVDA", "^GSPC"]
+
+        stocks = [e['symbol'] for e in query_symbols(universe, types=['stock', 'watchlist'])]
+        assert stocks == ["TSLA", "NVDA"]
+
+        everything = query_symbols(universe, enabled_only=False)
+        assert len(everything) == 5
+
+
+class TestLoadUniverse:
+    """測試 load_universe 函數"""
+
+    def test_cache_written_and_reused(self, config_files, tmp_path):
+        """解析結果應寫入快取"""
+        load_universe(*config_files)
+        assert (tmp_path / "cache" / "symbol-universe.json").exists()
+
+    def test_reloads_when_file_changes(self, config_files):
+        """設定檔修改後應重新解析"""
+        holdings, indices = config_files
+        load_universe(holdings, indices)
+
+        holdings.write_text("holdings:\n  g:\n    A:\n      symbol: AAA\n", encoding="utf-8")
+        stat = holdings.stat()
+        os.utime(holdings, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        symbols = [e['symbol'] for e in load_universe(holdings, indices)]
+        assert symbols == ["AAA", "^GSPC", "^RUT"]
+
+    def test_missing_files_raise(self, tmp_path):
+        """兩個設定檔都不存在時應拋出錯誤"""
+        with pytest.raises(ScraperError):
+            load_universe(tmp_path / "a.yaml", tmp_path / "b.yaml")